@@ -0,0 +1,78 @@
+"""
+Validate many Office documents at once.
+
+Usage:
+    python batch_validate.py <path|glob>... [--workers N] [--original <file>] [--author NAME] [--top N]
+
+Each argument can be a .docx/.pptx/.xlsx file, a directory (searched recursively)
+or a glob pattern such as "out/**/*.docx". Documents are validated
+concurrently by N worker processes that share the compiled schemas.
+
+Results are written to stdout as NDJSON, one line per document in completion
+order, followed by a summary line with pass/fail counts, the most frequent
+failing rules and the slowest documents:
+
+    {"type": "file", "path": "...", "valid": false, "wall_time": 0.41, "rules": ["xml"], "findings": [...]}
+    {"type": "summary", "files": 120, "passed": 118, "failed": 2, ...}
+
+Exits with status 1 if any document failed validation.
+"""
+
+import argparse
+import json
+import sys
+
+from validators.batch import BatchSummary, find_documents, validate_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate many Office documents concurrently")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Office files, directories or glob patterns to validate",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--original",
+        default=None,
+        help="Original file every document is compared against (default: report all errors)",
+    )
+    parser.add_argument(
+        "--author",
+        default="Claude",
+        help="Author name for redlining validation with --original (default: Claude)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of failing rules and slowest files in the summary (default: 10)",
+    )
+    args = parser.parse_args()
+
+    documents = find_documents(args.paths)
+    if not documents:
+        print("Error: No .docx, .pptx or .xlsx files found", file=sys.stderr)
+        sys.exit(1)
+
+    summary = BatchSummary(top=args.top)
+    for result in validate_documents(
+        documents, workers=args.workers, original=args.original, author=args.author
+    ):
+        summary.add(result)
+        print(json.dumps(result), flush=True)
+
+    print(json.dumps(summary.to_dict()), flush=True)
+    sys.exit(1 if summary.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
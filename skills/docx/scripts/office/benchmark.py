@@ -0,0 +1,409 @@
+"""
+Benchmark the unpack, pack and validation pipeline on synthetic documents.
+
+Usage:
+    python benchmark.py [--size small|medium|large] [--formats docx,pptx,xlsx] [--repeat N] [--jobs N]
+                        [--json PATH] [--baseline PATH] [--save-baseline PATH] [--threshold F]
+    python benchmark.py --generate DIR [--size ...]
+
+Synthetic documents are generated for each format (see helpers/synthetic.py)
+with the parameters of the chosen size; --paragraphs, --runs, --tracked-changes,
+--comments, --images, --slides, --rows and --columns override them. With
+--generate the documents are written to DIR and nothing is timed.
+
+Each benchmark is run --repeat times and the fastest run is kept:
+- <format>.unpack: the whole unpack, including merge_runs and simplify_redlines
+- docx.simplify_redlines, docx.merge_runs: the helpers on an extracted document
+- <format>.<Validator>.<check>: every validator check on the unpacked document
+- <format>.pack: condensing and zipping the unpacked document
+- <format>.repack: packing the unpacked document with --original, after
+  editing one part, so only that part is condensed and compressed again
+
+With --jobs N, unpack, pack and XSD validation use N worker processes.
+
+Throughput is reported in MB/s of uncompressed XML and XML parts per second.
+
+With --baseline, results are compared against a stored baseline (written by
+--save-baseline) and every benchmark more than --threshold slower (default:
+0.25, i.e. 25%) is flagged as a regression. Benchmarks faster than 10 ms in
+the baseline are not compared, as their timings are mostly noise.
+
+Exits with status 1 if a regression was found or a document failed to
+validate.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from helpers.merge_runs import merge_runs
+from helpers.simplify_redlines import simplify_redlines
+from helpers.synthetic import make_docx, make_pptx, make_xlsx
+from pack import pack
+from unpack import unpack
+from validators import (
+    DOCXSchemaValidator,
+    PPTXSchemaValidator,
+    RedliningValidator,
+    ValidationReport,
+    XLSXSchemaValidator,
+)
+
+BENCHMARK_FORMAT = "office-benchmark/1"
+
+MIN_COMPARED_SECONDS = 0.01
+
+SIZES = {
+    "small": {
+        "paragraphs": 500,
+        "runs": 4,
+        "tracked_changes": 50,
+        "comments": 10,
+        "images": 2,
+        "slides": 10,
+        "rows": 2000,
+        "columns": 10,
+    },
+    "medium": {
+        "paragraphs": 5000,
+        "runs": 6,
+        "tracked_changes": 500,
+        "comments": 50,
+        "images": 5,
+        "slides": 50,
+        "rows": 20000,
+        "columns": 10,
+    },
+    "large": {
+        "paragraphs": 50000,
+        "runs": 8,
+        "tracked_changes": 5000,
+        "comments": 200,
+        "images": 10,
+        "slides": 200,
+        "rows": 200000,
+        "columns": 10,
+    },
+}
+
+# The part edited before <format>.repack: one slide, one sheet, the body.
+EDITED_PARTS = {
+    "docx": "word/document.xml",
+    "pptx": "ppt/slides/slide1.xml",
+    "xlsx": "xl/worksheets/sheet1.xml",
+}
+
+
+def generate(directory, formats, params):
+    directory.mkdir(parents=True, exist_ok=True)
+    documents = {}
+    for fmt in formats:
+        path = directory / f"synthetic.{fmt}"
+        match fmt:
+            case "docx":
+                make_docx(
+                    path,
+                    paragraphs=params["paragraphs"],
+                    runs_per_paragraph=params["runs"],
+                    tracked_changes=params["tracked_changes"],
+                    comments=params["comments"],
+                    images=params["images"],
+                )
+            case "pptx":
+                make_pptx(path, slides=params["slides"], images=params["images"])
+            case "xlsx":
+                make_xlsx(path, rows=params["rows"], columns=params["columns"])
+        documents[fmt] = path
+    return documents
+
+
+def _xml_size(directory):
+    files = [
+        f for f in directory.rglob("*") if f.is_file() and f.name.endswith((".xml", ".rels"))
+    ]
+    return sum(f.stat().st_size for f in files), len(files)
+
+
+def _zip_xml_size(path):
+    with zipfile.ZipFile(path) as zf:
+        infos = [i for i in zf.infolist() if i.filename.endswith((".xml", ".rels"))]
+    return sum(i.file_size for i in infos), len(infos)
+
+
+class Benchmark:
+
+    def __init__(self, workdir, repeat, jobs=1):
+        self.workdir = workdir
+        self.repeat = repeat
+        self.jobs = jobs
+        self.results = {}
+        self.failures = []
+
+    def record(self, name, seconds, size, parts):
+        best = self.results.get(name)
+        if best is not None and best["seconds"] <= seconds:
+            return
+        self.results[name] = {
+            "seconds": round(seconds, 6),
+            "mb_per_s": round(size / 1e6 / seconds, 3) if seconds else None,
+            "parts_per_s": round(parts / seconds, 3) if seconds else None,
+            "bytes": size,
+            "parts": parts,
+        }
+
+    def time(self, name, func, size, parts, setup=None):
+        for _ in range(self.repeat):
+            argument = setup() if setup else None
+            started = time.perf_counter()
+            func(argument)
+            self.record(name, time.perf_counter() - started, size, parts)
+
+    def fresh_dir(self, name):
+        path = self.workdir / name
+        if path.exists():
+            shutil.rmtree(path)
+        return path
+
+    def run(self, fmt, document):
+        size, parts = _zip_xml_size(document)
+
+        def run_unpack(_):
+            _, message = unpack(
+                str(document), str(self.fresh_dir(f"{fmt}-unpacked")), jobs=self.jobs
+            )
+            if message.startswith("Error"):
+                raise RuntimeError(message)
+
+        self.time(f"{fmt}.unpack", run_unpack, size, parts)
+        unpacked = self.workdir / f"{fmt}-unpacked"
+
+        if fmt == "docx":
+            extracted = self.workdir / "docx-extracted"
+            unpack(str(document), str(extracted), merge_runs=False, simplify_redlines=False)
+            body_size = (extracted / "word" / "document.xml").stat().st_size
+
+            def copy_extracted():
+                target = self.fresh_dir("docx-helper")
+                shutil.copytree(extracted, target)
+                return str(target)
+
+            self.time("docx.simplify_redlines", simplify_redlines, body_size, 1, copy_extracted)
+            self.time("docx.merge_runs", merge_runs, body_size, 1, copy_extracted)
+
+        size, parts = _xml_size(unpacked)
+        for _ in range(self.repeat):
+            self.validate(fmt, unpacked, document, size, parts)
+
+        def run_pack(_):
+            _, message = pack(
+                str(unpacked), str(self.workdir / f"packed.{fmt}"), validate=False, jobs=self.jobs
+            )
+            if message.startswith("Error"):
+                raise RuntimeError(message)
+
+        self.time(f"{fmt}.pack", run_pack, size, parts)
+
+        edited = unpacked / EDITED_PARTS[fmt]
+        edited.write_bytes(edited.read_bytes() + b"\n")
+
+        def run_repack(_):
+            _, message = pack(
+                str(unpacked),
+                str(self.workdir / f"repacked.{fmt}"),
+                original_file=str(document),
+                validate=False,
+                jobs=self.jobs,
+            )
+            if message.startswith("Error"):
+                raise RuntimeError(message)
+
+        self.time(f"{fmt}.repack", run_repack, size, parts)
+
+    def validate(self, fmt, unpacked, original, size, parts):
+        report = ValidationReport(echo=False)
+        options = {"manifest": None, "report": report}
+        schema_options = {"jobs": self.jobs, **options}
+        match fmt:
+            case "docx":
+                validators = [
+                    DOCXSchemaValidator(unpacked, original, **schema_options),
+                    RedliningValidator(unpacked, original, author="Benchmark", **options),
+                ]
+            case "pptx":
+                validators = [PPTXSchemaValidator(unpacked, original, **schema_options)]
+            case "xlsx":
+                validators = [XLSXSchemaValidator(unpacked, original, **schema_options)]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            valid = all(v.validate() for v in validators)
+        if not valid and fmt not in self.failures:
+            self.failures.append(fmt)
+
+        for check in report.checks:
+            self.record(
+                f"{fmt}.{check.validator}.{check.name}", check.wall_time, size, parts
+            )
+
+
+def compare(results, baseline, threshold):
+    regressions = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or base["seconds"] < MIN_COMPARED_SECONDS:
+            continue
+        change = result["seconds"] / base["seconds"] - 1
+        if change > threshold:
+            regressions[name] = change
+    return regressions
+
+
+def print_results(results, baseline, regressions):
+    width = max(len(name) for name in results)
+    header = f"{'benchmark':<{width}}  {'seconds':>9}  {'MB/s':>9}  {'parts/s':>10}"
+    if baseline:
+        header += f"  {'change':>8}"
+    print(header)
+
+    for name, result in results.items():
+        mb_per_s = result["mb_per_s"] if result["mb_per_s"] is not None else float("inf")
+        parts_per_s = result["parts_per_s"] if result["parts_per_s"] is not None else float("inf")
+        line = (
+            f"{name:<{width}}  {result['seconds']:>9.4f}  {mb_per_s:>9.2f}  {parts_per_s:>10.1f}"
+        )
+        base = baseline.get(name)
+        if base is not None and base["seconds"]:
+            line += f"  {(result['seconds'] / base['seconds'] - 1) * 100:>+7.1f}%"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Office document pipeline")
+    parser.add_argument(
+        "--size",
+        choices=sorted(SIZES),
+        default="small",
+        help="Size of the synthetic documents (default: small)",
+    )
+    parser.add_argument(
+        "--formats",
+        default="docx,pptx,xlsx",
+        help="Comma-separated formats to benchmark (default: docx,pptx,xlsx)",
+    )
+    for option, help_text in [
+        ("paragraphs", "Paragraphs in the document"),
+        ("runs", "Runs per paragraph, all mergeable"),
+        ("tracked-changes", "Paragraphs with tracked insertions and deletions"),
+        ("comments", "Comments in the document"),
+        ("images", "Images in the document and presentation"),
+        ("slides", "Slides in the presentation"),
+        ("rows", "Rows in the worksheet"),
+        ("columns", "Columns in the worksheet"),
+    ]:
+        parser.add_argument(
+            f"--{option}", type=int, default=None, metavar="N", help=f"{help_text} (default: from --size)"
+        )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        metavar="N",
+        help="Run every benchmark N times and keep the fastest (default: 3)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Worker processes for unpack, pack and XSD validation (default: 1)",
+    )
+    parser.add_argument(
+        "--generate",
+        metavar="DIR",
+        help="Only write the synthetic documents to DIR",
+    )
+    parser.add_argument("--json", metavar="PATH", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against this baseline")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Save the results as a baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Slowdown against the baseline flagged as a regression (default: 0.25)",
+    )
+    args = parser.parse_args()
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    for fmt in formats:
+        if fmt not in ("docx", "pptx", "xlsx"):
+            print(f"Error: Unknown format {fmt}", file=sys.stderr)
+            sys.exit(1)
+
+    params = dict(SIZES[args.size])
+    for key in params:
+        value = getattr(args, key)
+        if value is not None:
+            params[key] = value
+
+    if args.generate:
+        for fmt, path in generate(Path(args.generate), formats, params).items():
+            print(f"Generated {path} ({path.stat().st_size / 1e6:.2f} MB)")
+        return
+
+    baseline = {}
+    if args.baseline:
+        stored = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if stored.get("format") != BENCHMARK_FORMAT:
+            print(f"Error: {args.baseline} is not a {BENCHMARK_FORMAT} baseline", file=sys.stderr)
+            sys.exit(1)
+        if stored.get("params") != params:
+            print(
+                "Warning: baseline was recorded with different document parameters",
+                file=sys.stderr,
+            )
+        baseline = stored["results"]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workdir = Path(temp_dir)
+        documents = generate(workdir / "documents", formats, params)
+        benchmark = Benchmark(workdir, max(1, args.repeat), args.jobs)
+        for fmt, document in documents.items():
+            benchmark.run(fmt, document)
+
+    regressions = compare(benchmark.results, baseline, args.threshold)
+    print_results(benchmark.results, baseline, regressions)
+
+    output = {
+        "format": BENCHMARK_FORMAT,
+        "size": args.size,
+        "params": params,
+        "repeat": args.repeat,
+        "jobs": args.jobs,
+        "python": platform.python_version(),
+        "results": benchmark.results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(output, indent=2) + "\n", encoding="utf-8")
+
+    for fmt in benchmark.failures:
+        print(f"Error: synthetic {fmt} document failed validation", file=sys.stderr)
+    if regressions:
+        print(
+            f"{len(regressions)} regression(s) over {args.threshold:.0%} against {args.baseline}",
+            file=sys.stderr,
+        )
+    sys.exit(1 if regressions or benchmark.failures else 0)
+
+
+if __name__ == "__main__":
+    main()
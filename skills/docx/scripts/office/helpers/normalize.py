@@ -0,0 +1,228 @@
+"""Normalize the story parts of a DOCX in one pass over each part.
+
+Story parts are the parts that hold text: the document body, headers,
+footers, footnotes, endnotes and comments. Each is parsed with lxml and
+walked once, top down; the children of every element are normalized before
+the walk descends into them, so the work is linear in the size of the part.
+
+With simplify_redlines, adjacent <w:ins> elements from the same author in a
+paragraph or table cell are merged into one, and the same for <w:del>. Only
+elements with nothing but whitespace between them are merged; timestamps
+are ignored.
+
+With merge_runs:
+- proofErr elements (spell/grammar markers that block merging) are removed
+- rsid attributes (revision metadata that doesn't affect rendering) are
+  removed from runs
+- adjacent runs with identical <w:rPr> are merged, in paragraphs and inside
+  tracked changes, and the adjacent <w:t> elements of each run joined
+
+Run properties are compared by a canonical signature, independent of
+prefixes, attribute order and layout whitespace, computed at most once per
+run, so a run that absorbs its neighbours is not compared again for each of
+them. Tracked changes are merged before the runs inside them, so runs brought
+together by merging two <w:ins> are merged as well.
+
+Elements are matched by local name, so math runs (<m:r>) are merged like
+text runs.
+"""
+
+import re
+from functools import partial
+from pathlib import Path
+
+import lxml.etree
+
+from .parallel import map_parts
+
+STORY_PART = re.compile(r"word/(document|header\d*|footer\d*|footnotes|endnotes|comments)\.xml")
+
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+_REDLINE_CONTAINERS = {"p", "tc"}
+_REDLINES = {"ins", "del"}
+
+_LOCAL_NAMES = {}
+
+
+def is_story_part(name: str) -> bool:
+    return STORY_PART.fullmatch(name) is not None
+
+
+def story_parts(input_dir) -> list[Path]:
+    root = Path(input_dir)
+    return sorted(
+        f
+        for f in (root / "word").glob("*.xml")
+        if is_story_part(f.relative_to(root).as_posix())
+    )
+
+
+def parse_part(source):
+    parser = lxml.etree.XMLParser(resolve_entities=False, huge_tree=True)
+    if isinstance(source, bytes):
+        return lxml.etree.fromstring(source, parser).getroottree()
+    return lxml.etree.parse(source, parser)
+
+
+def normalize(root, merge_runs: bool = True, simplify_redlines: bool = True) -> tuple[int, int]:
+    simplified = merged = 0
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        name = _local_name(element)
+        # Property elements (rPr, pPr, sectPr, ...) never hold runs.
+        if len(element) == 0 or name.endswith("Pr"):
+            continue
+
+        if simplify_redlines and name in _REDLINE_CONTAINERS:
+            simplified += _merge_redlines(element)
+        if merge_runs:
+            merged += _merge_runs(element)
+
+        stack.extend(child for child in reversed(element) if isinstance(child.tag, str))
+
+    return simplified, merged
+
+
+def normalize_file(path, merge_runs: bool = True, simplify_redlines: bool = True) -> tuple[int, int]:
+    tree = parse_part(str(path))
+    counts = normalize(tree.getroot(), merge_runs, simplify_redlines)
+    tree.write(
+        str(path), xml_declaration=True, encoding="UTF-8", standalone=tree.docinfo.standalone
+    )
+    return counts
+
+
+def normalize_directory(
+    input_dir, merge_runs: bool = True, simplify_redlines: bool = True, jobs: int = 1
+) -> tuple[int, int]:
+    parts = story_parts(input_dir)
+    if jobs > 1 and len(parts) > 1:
+        counts = map_parts(
+            partial(normalize_file, merge_runs=merge_runs, simplify_redlines=simplify_redlines),
+            parts,
+            lambda f: f.stat().st_size,
+            jobs,
+        )
+    else:
+        counts = [normalize_file(f, merge_runs, simplify_redlines) for f in parts]
+    return sum(c[0] for c in counts), sum(c[1] for c in counts)
+
+
+def _local_name(element) -> str:
+    # Documents use few distinct tags, so local names are looked up once each.
+    tag = element.tag
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rpartition("}")[2] if isinstance(tag, str) else ""
+    return name
+
+
+def _merge_redlines(container) -> int:
+    count = 0
+    previous = None
+    for child in list(container):
+        name = _local_name(child)
+        if (
+            previous is not None
+            and name == _local_name(previous)
+            and _author(child) == _author(previous)
+        ):
+            previous.extend(list(child))
+            container.remove(child)
+            count += 1
+        else:
+            previous = child if name in _REDLINES else None
+    return count
+
+
+def _author(element) -> str:
+    for key, value in element.attrib.items():
+        if key == "author" or key.endswith("}author"):
+            return value
+    return ""
+
+
+def _merge_runs(container) -> int:
+    count = 0
+    run = signature = None
+    for child in list(container):
+        name = _local_name(child)
+        if name == "proofErr":
+            container.remove(child)
+            continue
+        if name != "r":
+            # Anything else between two runs, comments included, keeps them apart.
+            if run is not None:
+                _join_text(run)
+            run = None
+            continue
+
+        for key in [key for key in child.attrib if "rsid" in key.lower()]:
+            del child.attrib[key]
+
+        if run is None:
+            run, signature = child, None
+            continue
+
+        # A run's signature is only needed once another run follows it.
+        if signature is None:
+            signature = _signature(run)
+        child_signature = _signature(child)
+        if child_signature == signature:
+            run.extend([c for c in child if _local_name(c) != "rPr"])
+            container.remove(child)
+            count += 1
+            continue
+
+        _join_text(run)
+        run, signature = child, child_signature
+
+    if run is not None:
+        _join_text(run)
+    return count
+
+
+def _signature(run) -> tuple:
+    # Run properties come first, so the rest of the run is not looked at.
+    signature = []
+    for child in run:
+        if _local_name(child) != "rPr":
+            break
+        signature.append(_canonical(child))
+    return tuple(signature)
+
+
+def _canonical(element) -> tuple:
+    # Independent of prefixes, attribute order and layout whitespace.
+    attrib = element.attrib
+    return (
+        element.tag,
+        tuple(sorted(attrib.items())) if attrib else (),
+        tuple(_canonical(child) for child in element if isinstance(child.tag, str)),
+    )
+
+
+def _join_text(run):
+    group = []
+    for child in list(run) + [None]:
+        name = _local_name(child) if child is not None else None
+        if name == "t":
+            group.append(child)
+            continue
+        if name == "proofErr":
+            # Not reached by the walk until after the run's text is joined.
+            run.remove(child)
+            continue
+        if len(group) > 1:
+            first = group[0]
+            text = "".join(t.text or "" for t in group)
+            first.text = text
+            if text.startswith(" ") or text.endswith(" "):
+                first.set(XML_SPACE, "preserve")
+            elif XML_SPACE in first.attrib:
+                del first.attrib[XML_SPACE]
+            for t in group[1:]:
+                run.remove(t)
+        group = []
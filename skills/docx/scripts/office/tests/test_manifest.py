@@ -0,0 +1,36 @@
+"""The validation manifest never leaves files behind in the package."""
+
+import json
+
+import pytest
+
+from validators.manifest import MANIFEST_NAME, ValidationManifest
+
+
+@pytest.fixture
+def package(tmp_path):
+    (tmp_path / "word").mkdir()
+    (tmp_path / "word" / "document.xml").write_bytes(b"<document/>")
+    return tmp_path
+
+
+def test_save_writes_only_the_manifest(package):
+    manifest = ValidationManifest(package)
+    manifest.put(package / "word" / "document.xml", "rule:test", [])
+    manifest.save()
+
+    assert sorted(path.name for path in package.iterdir()) == sorted([MANIFEST_NAME, "word"])
+
+
+def test_failed_save_removes_temp_file(package, monkeypatch):
+    manifest = ValidationManifest(package)
+    manifest.put(package / "word" / "document.xml", "rule:test", [])
+
+    def fail(data, f):
+        raise TypeError("not serializable")
+
+    monkeypatch.setattr(json, "dump", fail)
+    with pytest.raises(TypeError):
+        manifest.save()
+
+    assert [path.name for path in package.iterdir()] == ["word"]
@@ -0,0 +1,121 @@
+"""
+Index of XSD errors already present in the original Office file.
+
+Parts are read straight from the original zip, validated on first use and
+keyed by part path and the SHA-256 of the member's content. The index is
+persisted in the per-user cache directory (see cache.py), so repeated
+pack.py --original runs against the same original reuse it; entries are
+only reused while the validator code and schemas are unchanged.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path, PurePosixPath
+
+from .cache import cache_dir
+from .xsd import code_version
+
+CHUNK_SIZE = 1 << 20
+
+
+class BaselineIndex:
+
+    def __init__(self, original_file, validate_part):
+        self.original_file = Path(original_file).resolve()
+        self.validate_part = validate_part
+
+        self._zip = None
+        self._members = None
+        self._entries = {}
+        self._hashes = {}
+        self._dirty = False
+
+        directory = cache_dir()
+        key = hashlib.sha256(str(self.original_file).encode()).hexdigest()[:16]
+        self.index_path = None if directory is None else directory / f"baseline_{key}.json"
+        self._load()
+
+    def errors_for(self, part_name):
+        part_name = PurePosixPath(part_name).as_posix()
+        if self.content_hash(part_name) is None:
+            return set()
+
+        if not self.has(part_name):
+            _, errors = self.validate_part(
+                PurePosixPath(part_name), self._zip.read(part_name)
+            )
+            self.record(part_name, errors or ())
+
+        return set(self._entries[part_name]["errors"])
+
+    def has(self, part_name):
+        content_hash = self.content_hash(part_name)
+        if content_hash is None:
+            return True
+        entry = self._entries.get(part_name)
+        return entry is not None and entry["hash"] == content_hash
+
+    def record(self, part_name, errors):
+        content_hash = self.content_hash(part_name)
+        if content_hash is None:
+            return
+        self._entries[part_name] = {"hash": content_hash, "errors": sorted(errors)}
+        self._dirty = True
+
+    def content_hash(self, part_name):
+        if self._members is None:
+            try:
+                self._zip = zipfile.ZipFile(self.original_file, "r")
+            except (OSError, zipfile.BadZipFile):
+                self._members = {}
+                return None
+            self._members = {info.filename: info for info in self._zip.infolist()}
+
+        if part_name not in self._members:
+            return None
+        if part_name not in self._hashes:
+            digest = hashlib.sha256()
+            with self._zip.open(part_name) as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            self._hashes[part_name] = digest.hexdigest()
+        return self._hashes[part_name]
+
+    def close(self):
+        if self._dirty:
+            self._save()
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            self._members = None
+            self._hashes = {}
+
+    def _load(self):
+        if self.index_path is None:
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == code_version():
+            self._entries = data.get("parts", {})
+
+    def _save(self):
+        if self.index_path is None:
+            return
+        data = {"version": code_version(), "parts": self._entries}
+        try:
+            fd, temp_name = tempfile.mkstemp(dir=self.index_path.parent, suffix=".json")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_name, self.index_path)
+            self._dirty = False
+        except OSError:
+            Path(temp_name).unlink(missing_ok=True)
@@ -5,6 +5,35 @@ Validator for PowerPoint presentation XML files against XSD schemas.
 import re
 
 from .base import BaseSchemaValidator
+from .fingerprint import PPTX_FEATURES, PPTX_STORY_PATTERNS
+from .rules import ANY_ATTRIBUTE, NamespaceRule, Rule, UniqueIdRule
+
+
+class UuidIdRule(Rule):
+
+    name = "uuid_ids"
+
+    ATTRIBUTES = ANY_ATTRIBUTE
+
+    FAILURE = "FAILED - Found {count} UUID ID validation errors:"
+    SUCCESS = "PASSED - All UUID-like IDs contain valid hex values"
+
+    UUID_PATTERN = re.compile(
+        r"^[\{\(]?[0-9A-Fa-f]{8}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{12}[\}\)]?$"
+    )
+
+    def handles_attribute(self, name):
+        return name.split("}")[-1].lower().endswith("id")
+
+    def attribute(self, elem, name, value):
+        if self.validator._looks_like_uuid(value) and not self.UUID_PATTERN.match(value):
+            self.errors.append(
+                (
+                    self.file,
+                    elem.sourceline,
+                    f"ID '{value}' appears to be a UUID but contains invalid hex characters",
+                )
+            )
 
 
 class PPTXSchemaValidator(BaseSchemaValidator):
@@ -22,91 +51,60 @@ class PPTXSchemaValidator(BaseSchemaValidator):
         "tablestyleid": "tablestyles",
     }
 
-    def validate(self):
-        if not self.validate_xml():
-            return False
-
-        all_valid = True
-        if not self.validate_namespaces():
-            all_valid = False
-
-        if not self.validate_unique_ids():
-            all_valid = False
+    CHECKS = [
+        "validate_namespaces",
+        "validate_unique_ids",
+        "validate_uuid_ids",
+        "validate_file_references",
+        "validate_slide_layout_ids",
+        "validate_content_types",
+        "validate_against_xsd",
+        "validate_notes_slide_references",
+        "validate_all_relationship_ids",
+        "validate_no_duplicate_slide_layouts",
+    ]
 
-        if not self.validate_uuid_ids():
-            all_valid = False
+    REPORTS = ["compare_structure"]
 
-        if not self.validate_file_references():
-            all_valid = False
+    STORY_PATTERNS = PPTX_STORY_PATTERNS
 
-        if not self.validate_slide_layout_ids():
-            all_valid = False
+    STRUCTURE_FEATURES = PPTX_FEATURES
 
-        if not self.validate_content_types():
-            all_valid = False
+    STRUCTURE_SUMMARY = ("Slides", "ppt/slides/*.xml", None)
 
-        if not self.validate_against_xsd():
-            all_valid = False
+    RULES = [NamespaceRule, UniqueIdRule, UuidIdRule]
 
-        if not self.validate_notes_slide_references():
-            all_valid = False
-
-        if not self.validate_all_relationship_ids():
-            all_valid = False
-
-        if not self.validate_no_duplicate_slide_layouts():
-            all_valid = False
-
-        return all_valid
+    CHECK_INPUTS = {
+        **BaseSchemaValidator.CHECK_INPUTS,
+        "validate_slide_layout_ids": "_slide_layout_id_inputs",
+        "validate_notes_slide_references": "_slide_rels_inputs",
+        "validate_no_duplicate_slide_layouts": "_slide_rels_inputs",
+        "compare_structure": "_structure_inputs",
+    }
 
     def validate_uuid_ids(self):
-        import lxml.etree
-
-        errors = []
-        uuid_pattern = re.compile(
-            r"^[\{\(]?[0-9A-Fa-f]{8}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{4}-?[0-9A-Fa-f]{12}[\}\)]?$"
-        )
-
-        for xml_file in self.xml_files:
-            try:
-                root = lxml.etree.parse(str(xml_file)).getroot()
-
-                for elem in root.iter():
-                    for attr, value in elem.attrib.items():
-                        attr_name = attr.split("}")[-1].lower()
-                        if attr_name == "id" or attr_name.endswith("id"):
-                            if self._looks_like_uuid(value):
-                                if not uuid_pattern.match(value):
-                                    errors.append(
-                                        f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                                        f"Line {elem.sourceline}: ID '{value}' appears to be a UUID but contains invalid hex characters"
-                                    )
-
-            except (lxml.etree.XMLSyntaxError, Exception) as e:
-                errors.append(
-                    f"  {xml_file.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
-
-        if errors:
-            print(f"FAILED - Found {len(errors)} UUID ID validation errors:")
-            for error in errors:
-                print(error)
-            return False
-        else:
-            if self.verbose:
-                print("PASSED - All UUID-like IDs contain valid hex values")
-            return True
+        return self._check_rule(UuidIdRule)
 
     def _looks_like_uuid(self, value):
         clean_value = value.strip("{}()").replace("-", "")
         return len(clean_value) == 32 and all(c.isalnum() for c in clean_value)
 
+    def _slide_layout_id_inputs(self):
+        inputs = []
+        for slide_master in sorted(self.package.glob("ppt/slideMasters/*.xml")):
+            rels_file = slide_master.parent / "_rels" / f"{slide_master.name}.rels"
+            inputs += [slide_master, rels_file]
+        return inputs
+
+    def _slide_rels_inputs(self):
+        return sorted(self.package.glob("ppt/slides/_rels/*.xml.rels"))
+
     def validate_slide_layout_ids(self):
         import lxml.etree
 
         errors = []
 
-        slide_masters = list(self.unpacked_dir.glob("ppt/slideMasters/*.xml"))
+        slide_masters = self.package.glob("ppt/slideMasters/*.xml")
 
         if not slide_masters:
             if self.verbose:
@@ -115,26 +113,25 @@ class PPTXSchemaValidator(BaseSchemaValidator):
 
         for slide_master in slide_masters:
             try:
-                root = lxml.etree.parse(str(slide_master)).getroot()
+                root = self.package.root(slide_master)
 
                 rels_file = slide_master.parent / "_rels" / f"{slide_master.name}.rels"
 
-                if not rels_file.exists():
+                if not self.package.exists(rels_file):
                     errors.append(
-                        f"  {slide_master.relative_to(self.unpacked_dir)}: "
-                        f"Missing relationships file: {rels_file.relative_to(self.unpacked_dir)}"
+                        (
+                            self._relative(slide_master),
+                            None,
+                            f"Missing relationships file: {self._relative(rels_file)}",
+                        )
                     )
                     continue
 
-                rels_root = lxml.etree.parse(str(rels_file)).getroot()
-
-                valid_layout_rids = set()
-                for rel in rels_root.findall(
-                    f".//{{{self.PACKAGE_RELATIONSHIPS_NAMESPACE}}}Relationship"
-                ):
-                    rel_type = rel.get("Type", "")
-                    if "slideLayout" in rel_type:
-                        valid_layout_rids.add(rel.get("Id"))
+                valid_layout_rids = {
+                    rel.id
+                    for rel in self.graph.relationships_in(rels_file)
+                    if "slideLayout" in rel.type
+                }
 
                 for sld_layout_id in root.findall(
                     f".//{{{self.PRESENTATIONML_NAMESPACE}}}sldLayoutId"
@@ -146,20 +143,20 @@ class PPTXSchemaValidator(BaseSchemaValidator):
 
                     if r_id and r_id not in valid_layout_rids:
                         errors.append(
-                            f"  {slide_master.relative_to(self.unpacked_dir)}: "
-                            f"Line {sld_layout_id.sourceline}: sldLayoutId with id='{layout_id}' "
-                            f"references r:id='{r_id}' which is not found in slide layout relationships"
+                            (
+                                self._relative(slide_master),
+                                sld_layout_id.sourceline,
+                                f"sldLayoutId with id='{layout_id}' "
+                                f"references r:id='{r_id}' which is not found in slide layout relationships",
+                            )
                         )
 
             except (lxml.etree.XMLSyntaxError, Exception) as e:
-                errors.append(
-                    f"  {slide_master.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
+                errors.append((self._relative(slide_master), None, f"Error: {e}"))
 
         if errors:
             print(f"FAILED - Found {len(errors)} slide layout ID validation errors:")
-            for error in errors:
-                print(error)
+            self._print_findings(errors)
             print(
                 "Remove invalid references or add missing slide layouts to the relationships file."
             )
@@ -170,37 +167,32 @@ class PPTXSchemaValidator(BaseSchemaValidator):
             return True
 
     def validate_no_duplicate_slide_layouts(self):
-        import lxml.etree
-
         errors = []
-        slide_rels_files = list(self.unpacked_dir.glob("ppt/slides/_rels/*.xml.rels"))
+        slide_rels_files = self.package.glob("ppt/slides/_rels/*.xml.rels")
 
         for rels_file in slide_rels_files:
             try:
-                root = lxml.etree.parse(str(rels_file)).getroot()
-
                 layout_rels = [
                     rel
-                    for rel in root.findall(
-                        f".//{{{self.PACKAGE_RELATIONSHIPS_NAMESPACE}}}Relationship"
-                    )
-                    if "slideLayout" in rel.get("Type", "")
+                    for rel in self.graph.relationships_in(rels_file)
+                    if "slideLayout" in rel.type
                 ]
 
                 if len(layout_rels) > 1:
                     errors.append(
-                        f"  {rels_file.relative_to(self.unpacked_dir)}: has {len(layout_rels)} slideLayout references"
+                        (
+                            self._relative(rels_file),
+                            None,
+                            f"has {len(layout_rels)} slideLayout references",
+                        )
                     )
 
             except Exception as e:
-                errors.append(
-                    f"  {rels_file.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
+                errors.append((self._relative(rels_file), None, f"Error: {e}"))
 
         if errors:
             print("FAILED - Found slides with duplicate slideLayout references:")
-            for error in errors:
-                print(error)
+            self._print_findings(errors)
             return False
         else:
             if self.verbose:
@@ -213,7 +205,7 @@ class PPTXSchemaValidator(BaseSchemaValidator):
         errors = []
         notes_slide_references = {}  
 
-        slide_rels_files = list(self.unpacked_dir.glob("ppt/slides/_rels/*.xml.rels"))
+        slide_rels_files = self.package.glob("ppt/slides/_rels/*.xml.rels")
 
         if not slide_rels_files:
             if self.verbose:
@@ -222,14 +214,9 @@ class PPTXSchemaValidator(BaseSchemaValidator):
 
         for rels_file in slide_rels_files:
             try:
-                root = lxml.etree.parse(str(rels_file)).getroot()
-
-                for rel in root.findall(
-                    f".//{{{self.PACKAGE_RELATIONSHIPS_NAMESPACE}}}Relationship"
-                ):
-                    rel_type = rel.get("Type", "")
-                    if "notesSlide" in rel_type:
-                        target = rel.get("Target", "")
+                for rel in self.graph.relationships_in(rels_file):
+                    if "notesSlide" in rel.type:
+                        target = rel.target
                         if target:
                             normalized_target = target.replace("../", "")
 
@@ -244,25 +231,23 @@ class PPTXSchemaValidator(BaseSchemaValidator):
                             )
 
             except (lxml.etree.XMLSyntaxError, Exception) as e:
-                errors.append(
-                    f"  {rels_file.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
+                errors.append((self._relative(rels_file), None, f"Error: {e}"))
 
         for target, references in notes_slide_references.items():
             if len(references) > 1:
                 slide_names = [ref[0] for ref in references]
                 errors.append(
-                    f"  Notes slide '{target}' is referenced by multiple slides: {', '.join(slide_names)}"
+                    (
+                        None,
+                        None,
+                        f"Notes slide '{target}' is referenced by multiple slides: {', '.join(slide_names)}",
+                        [self._relative(rels_file) for _, rels_file in references],
+                    )
                 )
-                for slide_name, rels_file in references:
-                    errors.append(f"    - {rels_file.relative_to(self.unpacked_dir)}")
 
         if errors:
-            print(
-                f"FAILED - Found {len([e for e in errors if not e.startswith('    ')])} notes slide reference validation errors:"
-            )
-            for error in errors:
-                print(error)
+            print(f"FAILED - Found {len(errors)} notes slide reference validation errors:")
+            self._print_findings(errors)
             print("Each slide may optionally have its own slide file.")
             return False
         else:
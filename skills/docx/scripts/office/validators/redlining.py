@@ -2,104 +2,119 @@
 Validator for tracked changes in Word documents.
 """
 
-import subprocess
-import tempfile
-import zipfile
 from pathlib import Path
 
+import lxml.etree
+
+from .package import ParsedPackage
+from .textdiff import diff_paragraphs, format_hunks
+
 
 class RedliningValidator:
 
-    def __init__(self, unpacked_dir, original_docx, verbose=False, author="Claude"):
+    def __init__(
+        self,
+        unpacked_dir,
+        original_docx,
+        verbose=False,
+        author="Claude",
+        manifest=None,
+        report=None,
+    ):
         self.unpacked_dir = Path(unpacked_dir)
         self.original_docx = Path(original_docx)
         self.verbose = verbose
         self.author = author
+        self.manifest = manifest
+        self.report = report
+        self.hunks = []
+        self.package = ParsedPackage(self.unpacked_dir)
         self.namespaces = {
             "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
         }
 
-    def repair(self) -> int:
+    def repair(self, dry_run=False) -> int:
         return 0
 
     def validate(self):
+        try:
+            if self.report is None:
+                return self._cached_validate()
+            return self.report.run(
+                type(self).__name__, "validate_redlining", self._cached_validate
+            )
+        finally:
+            self.package.close()
+
+    def _cached_validate(self):
+        if self.manifest is None:
+            return self._validate()
+
+        return self.manifest.cached_check(
+            "RedliningValidator.validate",
+            [
+                f"author={self.author}",
+                f"verbose={self.verbose}",
+                self.unpacked_dir / "word" / "document.xml",
+            ],
+            self._validate,
+            self.report,
+        )
+
+    def _validate(self):
         modified_file = self.unpacked_dir / "word" / "document.xml"
-        if not modified_file.exists():
-            print(f"FAILED - Modified document.xml not found at {modified_file}")
+        if not self.package.exists(modified_file):
+            self._fail(f"Modified document.xml not found at {modified_file}")
             return False
 
         try:
-            import xml.etree.ElementTree as ET
-
-            tree = ET.parse(modified_file)
-            root = tree.getroot()
-
-            del_elements = root.findall(".//w:del", self.namespaces)
-            ins_elements = root.findall(".//w:ins", self.namespaces)
-
-            author_del_elements = [
-                elem
-                for elem in del_elements
-                if elem.get(f"{{{self.namespaces['w']}}}author") == self.author
-            ]
-            author_ins_elements = [
-                elem
-                for elem in ins_elements
-                if elem.get(f"{{{self.namespaces['w']}}}author") == self.author
-            ]
-
-            if not author_del_elements and not author_ins_elements:
-                if self.verbose:
-                    print(f"PASSED - No tracked changes by {self.author} found.")
-                return True
-
-        except Exception:
-            pass
+            modified_text, author_changes = self._reverted_text(
+                self.package, modified_file
+            )
+        except lxml.etree.XMLSyntaxError as e:
+            self._fail(f"Error parsing XML files: {e}", "word/document.xml", e.lineno)
+            return False
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
+        if not author_changes:
+            if self.verbose:
+                print(f"PASSED - No tracked changes by {self.author} found.")
+            return True
 
-            try:
-                with zipfile.ZipFile(self.original_docx, "r") as zip_ref:
-                    zip_ref.extractall(temp_path)
-            except Exception as e:
-                print(f"FAILED - Error unpacking original docx: {e}")
-                return False
+        try:
+            original = ParsedPackage(self.original_docx)
+        except Exception as e:
+            self._fail(f"Error unpacking original docx: {e}")
+            return False
 
-            original_file = temp_path / "word" / "document.xml"
-            if not original_file.exists():
-                print(
-                    f"FAILED - Original document.xml not found in {self.original_docx}"
-                )
+        try:
+            original_file = original.root_dir / "word" / "document.xml"
+            if not original.exists(original_file):
+                self._fail(f"Original document.xml not found in {self.original_docx}")
                 return False
 
             try:
-                import xml.etree.ElementTree as ET
-
-                modified_tree = ET.parse(modified_file)
-                modified_root = modified_tree.getroot()
-                original_tree = ET.parse(original_file)
-                original_root = original_tree.getroot()
-            except ET.ParseError as e:
-                print(f"FAILED - Error parsing XML files: {e}")
+                original_text, _ = self._reverted_text(original, original_file)
+            except lxml.etree.XMLSyntaxError as e:
+                self._fail(f"Error parsing XML files: {e}")
                 return False
+        finally:
+            original.close()
+
+        if modified_text != original_text:
+            error_message = self._generate_detailed_diff(
+                original_text, modified_text
+            )
+            print(error_message)
+            return False
 
-            self._remove_author_tracked_changes(original_root)
-            self._remove_author_tracked_changes(modified_root)
-
-            modified_text = self._extract_text_content(modified_root)
-            original_text = self._extract_text_content(original_root)
+        if self.verbose:
+            print(f"PASSED - All changes by {self.author} are properly tracked")
+        return True
 
-            if modified_text != original_text:
-                error_message = self._generate_detailed_diff(
-                    original_text, modified_text
-                )
-                print(error_message)
-                return False
-
-            if self.verbose:
-                print(f"PASSED - All changes by {self.author} are properly tracked")
-            return True
+    def _fail(self, message, file=None, line=None):
+        print(f"FAILED - {message}")
+        if self.report is not None:
+            self.report.add_finding(message, file=file, line=line)
 
     def _generate_detailed_diff(self, original_text, modified_text):
         error_parts = [
@@ -116,131 +131,67 @@ class RedliningValidator:
             "",
         ]
 
-        git_diff = self._get_git_word_diff(original_text, modified_text)
-        if git_diff:
-            error_parts.extend(["Differences:", "============", git_diff])
-        else:
-            error_parts.append("Unable to generate word diff (git not available)")
-
-        return "\n".join(error_parts)
-
-    def _get_git_word_diff(self, original_text, modified_text):
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-
-                original_file = temp_path / "original.txt"
-                modified_file = temp_path / "modified.txt"
-
-                original_file.write_text(original_text, encoding="utf-8")
-                modified_file.write_text(modified_text, encoding="utf-8")
-
-                result = subprocess.run(
-                    [
-                        "git",
-                        "diff",
-                        "--word-diff=plain",
-                        "--word-diff-regex=.",  
-                        "-U0",  
-                        "--no-index",
-                        str(original_file),
-                        str(modified_file),
-                    ],
-                    capture_output=True,
-                    text=True,
+        self.hunks = diff_paragraphs(
+            original_text.split("\n"), modified_text.split("\n")
+        )
+        if self.report is not None:
+            for hunk in self.hunks:
+                self.report.add_finding(
+                    f"Paragraph {hunk.modified_index + 1}: {' '.join(hunk.lines)}",
+                    file="word/document.xml",
                 )
 
-                if result.stdout.strip():
-                    lines = result.stdout.split("\n")
-                    content_lines = []
-                    in_content = False
-                    for line in lines:
-                        if line.startswith("@@"):
-                            in_content = True
-                            continue
-                        if in_content and line.strip():
-                            content_lines.append(line)
-
-                    if content_lines:
-                        return "\n".join(content_lines)
-
-                result = subprocess.run(
-                    [
-                        "git",
-                        "diff",
-                        "--word-diff=plain",
-                        "-U0",  
-                        "--no-index",
-                        str(original_file),
-                        str(modified_file),
-                    ],
-                    capture_output=True,
-                    text=True,
-                )
+        error_parts.extend(["Differences:", "============", format_hunks(self.hunks)])
+        return "\n".join(error_parts)
 
-                if result.stdout.strip():
-                    lines = result.stdout.split("\n")
-                    content_lines = []
-                    in_content = False
-                    for line in lines:
-                        if line.startswith("@@"):
-                            in_content = True
-                            continue
-                        if in_content and line.strip():
-                            content_lines.append(line)
-                    return "\n".join(content_lines)
-
-        except (subprocess.CalledProcessError, FileNotFoundError, Exception):
-            pass
-
-        return None
-
-    def _remove_author_tracked_changes(self, root):
-        ins_tag = f"{{{self.namespaces['w']}}}ins"
-        del_tag = f"{{{self.namespaces['w']}}}del"
-        author_attr = f"{{{self.namespaces['w']}}}author"
-
-        for parent in root.iter():
-            to_remove = []
-            for child in parent:
-                if child.tag == ins_tag and child.get(author_attr) == self.author:
-                    to_remove.append(child)
-            for elem in to_remove:
-                parent.remove(elem)
-
-        deltext_tag = f"{{{self.namespaces['w']}}}delText"
-        t_tag = f"{{{self.namespaces['w']}}}t"
-
-        for parent in root.iter():
-            to_process = []
-            for child in parent:
-                if child.tag == del_tag and child.get(author_attr) == self.author:
-                    to_process.append((child, list(parent).index(child)))
-
-            for del_elem, del_index in reversed(to_process):
-                for elem in del_elem.iter():
-                    if elem.tag == deltext_tag:
-                        elem.tag = t_tag
-
-                for child in reversed(list(del_elem)):
-                    parent.insert(del_index, child)
-                parent.remove(del_elem)
-
-    def _extract_text_content(self, root):
-        p_tag = f"{{{self.namespaces['w']}}}p"
-        t_tag = f"{{{self.namespaces['w']}}}t"
+    def _reverted_text(self, package, part):
+        # One streaming pass: text inside the author's insertions is dropped
+        # and the author's deletions are read back as plain text.
+        w = self.namespaces["w"]
+        p_tag = f"{{{w}}}p"
+        t_tag = f"{{{w}}}t"
+        deltext_tag = f"{{{w}}}delText"
+        ins_tag = f"{{{w}}}ins"
+        del_tag = f"{{{w}}}del"
+        author_attr = f"{{{w}}}author"
 
         paragraphs = []
-        for p_elem in root.findall(f".//{p_tag}"):
-            text_parts = []
-            for t_elem in p_elem.findall(f".//{t_tag}"):
-                if t_elem.text:
-                    text_parts.append(t_elem.text)
-            paragraph_text = "".join(text_parts)
-            if paragraph_text:
-                paragraphs.append(paragraph_text)
-
-        return "\n".join(paragraphs)
+        open_paragraphs = []
+        author_changes = 0
+        inserted = deleted = 0
+
+        for event, elem in package.iterparse(
+            part, tag=(p_tag, t_tag, deltext_tag, ins_tag, del_tag)
+        ):
+            tag = elem.tag
+            if tag == t_tag or tag == deltext_tag:
+                if (
+                    event == "end"
+                    and elem.text
+                    and not inserted
+                    and (tag == t_tag or deleted)
+                ):
+                    for index in open_paragraphs:
+                        paragraphs[index].append(elem.text)
+            elif tag == p_tag:
+                if event == "start":
+                    open_paragraphs.append(len(paragraphs))
+                    paragraphs.append([])
+                else:
+                    open_paragraphs.pop()
+            elif elem.get(author_attr) == self.author:
+                if event == "start":
+                    author_changes += 1
+                    step = 1
+                else:
+                    step = -1
+                if tag == ins_tag:
+                    inserted += step
+                else:
+                    deleted += step
+
+        text = "\n".join(filter(None, ("".join(parts) for parts in paragraphs)))
+        return text, author_changes
 
 
 if __name__ == "__main__":
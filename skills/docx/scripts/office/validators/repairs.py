@@ -0,0 +1,117 @@
+"""
+Single-pass repair engine for automatically fixable issues.
+
+Each repair decides which elements it handles and fixes one element at a
+time. The engine parses a part once with lxml, walks it once applying every
+interested repair, and serializes the part again only if a repair changed
+it, so untouched parts keep their exact bytes. In dry-run mode the changes
+are reported but nothing is written.
+
+With a validation manifest, parts a repair has already found clean are
+skipped until their content changes.
+"""
+
+import lxml.etree
+
+XML_SPACE_ATTRIBUTE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def _preview(text):
+    return repr(text[:30]) + "..." if len(text) > 30 else repr(text)
+
+
+class Repair:
+
+    name = None
+
+    def __init__(self, validator):
+        self.validator = validator
+
+    def applies_to(self, part):
+        return True
+
+    def handles(self, elem):
+        return True
+
+    def element(self, part, elem):
+        # Fixes elem in place and describes the change, or returns None.
+        return None
+
+
+class WhitespacePreservationRepair(Repair):
+
+    name = "whitespace_preservation"
+
+    def handles(self, elem):
+        return elem.tag.endswith("}t")
+
+    def element(self, part, elem):
+        text = elem.text
+        if not text or not (text.startswith((" ", "\t")) or text.endswith((" ", "\t"))):
+            return None
+        if elem.get(XML_SPACE_ATTRIBUTE) == "preserve":
+            return None
+
+        elem.set(XML_SPACE_ATTRIBUTE, "preserve")
+        tag = f"{elem.prefix}:t" if elem.prefix else "t"
+        return f"Added xml:space='preserve' to {tag}: {_preview(text)}"
+
+
+class RepairEngine:
+
+    def __init__(self, validator, repairs, dry_run=False):
+        self.validator = validator
+        self.package = validator.package
+        self.repairs = repairs
+        self.dry_run = dry_run
+        self.parts_rewritten = 0
+
+    def run(self):
+        count = 0
+        for part in self.package.parts:
+            repairs = [
+                repair
+                for repair in self.repairs
+                if repair.applies_to(part)
+                and not self.validator._is_repaired(part, f"repair:{repair.name}")
+            ]
+            if repairs:
+                count += self._repair_part(part, repairs)
+        return count
+
+    def _repair_part(self, part, repairs):
+        try:
+            with self.package.open(part) as f:
+                tree = lxml.etree.parse(f)
+        except Exception:
+            return 0
+
+        changes = []
+        for elem in tree.getroot().iter(lxml.etree.Element):
+            for repair in repairs:
+                if repair.handles(elem):
+                    change = repair.element(part, elem)
+                    if change:
+                        changes.append(change)
+
+        verb = "Would repair" if self.dry_run else "Repaired"
+        for change in changes:
+            print(f"  {verb}: {part.name}: {change}")
+
+        if self.dry_run:
+            return len(changes)
+
+        if changes:
+            self.package.write_bytes(
+                part,
+                lxml.etree.tostring(
+                    tree,
+                    xml_declaration=True,
+                    encoding="UTF-8",
+                    standalone=tree.docinfo.standalone,
+                ),
+            )
+            self.parts_rewritten += 1
+        for repair in repairs:
+            self.validator._mark_repaired(part, f"repair:{repair.name}", bool(changes))
+        return len(changes)
@@ -0,0 +1,269 @@
+"""
+In-process paragraph and character diff for the redlining report.
+
+Paragraphs are aligned with a patience diff, falling back to a Myers diff
+between anchors, and changed paragraphs are then compared character by
+character with a Myers diff. Changes are rendered the way
+`git diff --word-diff=plain --word-diff-regex=.` prints them: deletions as
+[-text-] and insertions as {+text+}.
+
+The whole diff shares one time budget. Once it runs out, the remaining
+ranges are reported as whole-paragraph replacements instead.
+"""
+
+import time
+
+DEFAULT_TIME_BUDGET = 2.0
+
+
+class TimeBudgetExceeded(Exception):
+    pass
+
+
+class DiffHunk:
+
+    def __init__(self, original_index, original, modified_index, modified):
+        self.original_index = original_index
+        self.original = original
+        self.modified_index = modified_index
+        self.modified = modified
+        self.lines = []
+
+    @property
+    def header(self):
+        return (
+            f"@@ -{_line_range(self.original_index, len(self.original))} "
+            f"+{_line_range(self.modified_index, len(self.modified))} @@"
+        )
+
+    def to_dict(self):
+        return {
+            "original_index": self.original_index,
+            "modified_index": self.modified_index,
+            "original": self.original,
+            "modified": self.modified,
+            "diff": self.lines,
+        }
+
+
+def diff_paragraphs(original, modified, time_budget=DEFAULT_TIME_BUDGET):
+    deadline = time.monotonic() + time_budget
+
+    matches = []
+    _patience(original, modified, 0, len(original), 0, len(modified), deadline, matches)
+
+    hunks = []
+    for tag, i1, i2, j1, j2 in _opcodes(matches, len(original), len(modified)):
+        if tag == "equal":
+            continue
+
+        hunk = DiffHunk(i1, original[i1:i2], j1, modified[j1:j2])
+        for k in range(max(i2 - i1, j2 - j1)):
+            old = hunk.original[k] if k < len(hunk.original) else None
+            new = hunk.modified[k] if k < len(hunk.modified) else None
+            if old is None:
+                hunk.lines.append(f"{{+{new}+}}")
+            elif new is None:
+                hunk.lines.append(f"[-{old}-]")
+            else:
+                hunk.lines.append(render_changes(old, new, deadline))
+        hunks.append(hunk)
+
+    return hunks
+
+
+def format_hunks(hunks):
+    lines = []
+    for hunk in hunks:
+        lines.append(hunk.header)
+        lines.extend(hunk.lines)
+    return "\n".join(lines)
+
+
+def render_changes(old, new, deadline):
+    try:
+        matches = _myers(old, new, 0, len(old), 0, len(new), deadline)
+    except TimeBudgetExceeded:
+        matches = []
+
+    parts = []
+    for tag, i1, i2, j1, j2 in _opcodes(matches, len(old), len(new)):
+        if tag == "equal":
+            parts.append(old[i1:i2])
+            continue
+        if i1 < i2:
+            parts.append(f"[-{old[i1:i2]}-]")
+        if j1 < j2:
+            parts.append(f"{{+{new[j1:j2]}+}}")
+    return "".join(parts)
+
+
+def _patience(a, b, alo, ahi, blo, bhi, deadline, matches):
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        matches.append((alo, blo))
+        alo += 1
+        blo += 1
+
+    tail = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        tail.append((ahi, bhi))
+
+    anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+    if anchors:
+        for i, j in anchors:
+            _patience(a, b, alo, i, blo, j, deadline, matches)
+            matches.append((i, j))
+            alo, blo = i + 1, j + 1
+        _patience(a, b, alo, ahi, blo, bhi, deadline, matches)
+    elif alo < ahi and blo < bhi:
+        try:
+            matches.extend(_myers(a, b, alo, ahi, blo, bhi, deadline))
+        except TimeBudgetExceeded:
+            pass
+
+    matches.extend(reversed(tail))
+
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi):
+    counts = {}
+    for i in range(alo, ahi):
+        entry = counts.setdefault(a[i], [0, 0, i])
+        entry[0] += 1
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[1] += 1
+            if entry[1] == 1:
+                entry.append(j)
+
+    pairs = sorted(
+        (entry[2], entry[3])
+        for entry in counts.values()
+        if entry[0] == 1 and entry[1] == 1
+    )
+    return _longest_increasing(pairs)
+
+
+def _longest_increasing(pairs):
+    # Patience sorting on the positions in b, keeping a back-pointer per pair.
+    tops = []
+    top_indexes = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        lo, hi = 0, len(tops)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tops[mid] < j:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            previous[index] = top_indexes[lo - 1]
+        if lo == len(tops):
+            tops.append(j)
+            top_indexes.append(index)
+        else:
+            tops[lo] = j
+            top_indexes[lo] = index
+
+    result = []
+    index = top_indexes[-1] if top_indexes else None
+    while index is not None:
+        result.append(pairs[index])
+        index = previous[index]
+    return result[::-1]
+
+
+def _myers(a, b, alo, ahi, blo, bhi, deadline):
+    head = []
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        head.append((alo, blo))
+        alo += 1
+        blo += 1
+
+    tail = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        tail.append((ahi, bhi))
+
+    n, m = ahi - alo, bhi - blo
+    max_d = n + m
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+
+    for d in range(max_d + 1):
+        if time.monotonic() > deadline:
+            raise TimeBudgetExceeded
+        trace.append(v[offset - d - 1 : offset + d + 2])
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return head + _backtrack(trace, n, m, alo, blo) + tail[::-1]
+
+    return head + tail[::-1]
+
+
+def _backtrack(trace, x, y, alo, blo):
+    snake = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1 + d + 1] < v[k + 1 + d + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k + d + 1]
+        prev_y = prev_x - prev_k
+
+        while x > prev_x and y > prev_y and x > 0 and y > 0:
+            x -= 1
+            y -= 1
+            snake.append((alo + x, blo + y))
+        if d == 0:
+            break
+        x, y = prev_x, prev_y
+
+    return snake[::-1]
+
+
+def _opcodes(matches, n, m):
+    opcodes = []
+    i = j = 0
+    for mi, mj in [*matches, (n, m)]:
+        if i < mi or j < mj:
+            if i < mi and j < mj:
+                tag = "replace"
+            elif i < mi:
+                tag = "delete"
+            else:
+                tag = "insert"
+            opcodes.append((tag, i, mi, j, mj))
+        if mi < n and mj < m:
+            if opcodes and opcodes[-1][0] == "equal":
+                _, ei, _, ej, _ = opcodes.pop()
+                opcodes.append(("equal", ei, mi + 1, ej, mj + 1))
+            else:
+                opcodes.append(("equal", mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
+def _line_range(index, count):
+    if count == 1:
+        return f"{index + 1}"
+    if count == 0:
+        return f"{index},0"
+    return f"{index + 1},{count}"
@@ -23,6 +23,8 @@ import shutil
 import sys
 from pathlib import Path
 
+from office.validators.graph import PackageGraph
+
 
 def get_next_slide_number(slides_dir: Path) -> int:
     existing = [int(m.group(1)) for f in slides_dir.glob("slide*.xml")
@@ -139,18 +141,30 @@ def _add_to_content_types(unpacked_dir: Path, dest: str) -> None:
 
 
 def _add_to_presentation_rels(unpacked_dir: Path, dest: str) -> str:
+    unpacked_dir = unpacked_dir.resolve()
     pres_rels_path = unpacked_dir / "ppt" / "_rels" / "presentation.xml.rels"
-    pres_rels = pres_rels_path.read_text(encoding="utf-8")
-
-    rids = [int(m) for m in re.findall(r'Id="rId(\d+)"', pres_rels)]
+    dest_part = unpacked_dir / "ppt" / "slides" / dest
+
+    relationships = PackageGraph.for_directory(unpacked_dir).relationships_in(
+        pres_rels_path
+    )
+    for rel in relationships:
+        if rel.target_part == dest_part:
+            return rel.id
+
+    rids = [
+        int(m.group(1))
+        for rel in relationships
+        if (m := re.fullmatch(r"rId(\d+)", rel.id or ""))
+    ]
     next_rid = max(rids) + 1 if rids else 1
     rid = f"rId{next_rid}"
 
     new_rel = f'<Relationship Id="{rid}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide" Target="slides/{dest}"/>'
 
-    if f"slides/{dest}" not in pres_rels:
-        pres_rels = pres_rels.replace("</Relationships>", f"  {new_rel}\n</Relationships>")
-        pres_rels_path.write_text(pres_rels, encoding="utf-8")
+    pres_rels = pres_rels_path.read_text(encoding="utf-8")
+    pres_rels = pres_rels.replace("</Relationships>", f"  {new_rel}\n</Relationships>")
+    pres_rels_path.write_text(pres_rels, encoding="utf-8")
 
     return rid
 
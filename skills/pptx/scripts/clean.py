@@ -19,26 +19,24 @@ import sys
 from pathlib import Path
 
 import defusedxml.minidom
+from office.validators.graph import PackageGraph
 
 
 import re
 
 
-def get_slides_in_sldidlst(unpacked_dir: Path) -> set[str]:
+def get_slides_in_sldidlst(unpacked_dir: Path, graph: PackageGraph) -> set[str]:
     pres_path = unpacked_dir / "ppt" / "presentation.xml"
     pres_rels_path = unpacked_dir / "ppt" / "_rels" / "presentation.xml.rels"
 
     if not pres_path.exists() or not pres_rels_path.exists():
         return set()
 
-    rels_dom = defusedxml.minidom.parse(str(pres_rels_path))
     rid_to_slide = {}
-    for rel in rels_dom.getElementsByTagName("Relationship"):
-        rid = rel.getAttribute("Id")
-        target = rel.getAttribute("Target")
-        rel_type = rel.getAttribute("Type")
-        if "slide" in rel_type and target.startswith("slides/"):
-            rid_to_slide[rid] = target.replace("slides/", "")
+    for rel in graph.relationships_in(pres_rels_path):
+        target = rel.target or ""
+        if "slide" in rel.type and target.startswith("slides/"):
+            rid_to_slide[rel.id] = target.replace("slides/", "")
 
     pres_content = pres_path.read_text(encoding="utf-8")
     referenced_rids = set(re.findall(r'<p:sldId[^>]*r:id="([^"]+)"', pres_content))
@@ -46,7 +44,7 @@ def get_slides_in_sldidlst(unpacked_dir: Path) -> set[str]:
     return {rid_to_slide[rid] for rid in referenced_rids if rid in rid_to_slide}
 
 
-def remove_orphaned_slides(unpacked_dir: Path) -> list[str]:
+def remove_orphaned_slides(unpacked_dir: Path, graph: PackageGraph) -> list[str]:
     slides_dir = unpacked_dir / "ppt" / "slides"
     slides_rels_dir = slides_dir / "_rels"
     pres_rels_path = unpacked_dir / "ppt" / "_rels" / "presentation.xml.rels"
@@ -54,7 +52,7 @@ def remove_orphaned_slides(unpacked_dir: Path) -> list[str]:
     if not slides_dir.exists():
         return []
 
-    referenced_slides = get_slides_in_sldidlst(unpacked_dir)
+    referenced_slides = get_slides_in_sldidlst(unpacked_dir, graph)
     removed = []
 
     for slide_file in slides_dir.glob("slide*.xml"):
@@ -66,6 +64,7 @@ def remove_orphaned_slides(unpacked_dir: Path) -> list[str]:
             rels_file = slides_rels_dir / f"{slide_file.name}.rels"
             if rels_file.exists():
                 rels_file.unlink()
+                graph.discard(rels_file)
                 removed.append(str(rels_file.relative_to(unpacked_dir)))
 
     if removed and pres_rels_path.exists():
@@ -84,11 +83,12 @@ def remove_orphaned_slides(unpacked_dir: Path) -> list[str]:
         if changed:
             with open(pres_rels_path, "wb") as f:
                 f.write(rels_dom.toxml(encoding="utf-8"))
+            graph.reload(pres_rels_path)
 
     return removed
 
 
-def remove_trash_directory(unpacked_dir: Path) -> list[str]:
+def remove_trash_directory(unpacked_dir: Path, graph: PackageGraph) -> list[str]:
     trash_dir = unpacked_dir / "[trash]"
     removed = []
 
@@ -98,12 +98,13 @@ def remove_trash_directory(unpacked_dir: Path) -> list[str]:
                 rel_path = file_path.relative_to(unpacked_dir)
                 removed.append(str(rel_path))
                 file_path.unlink()
+                graph.discard(file_path)
         trash_dir.rmdir()
 
     return removed
 
 
-def get_slide_referenced_files(unpacked_dir: Path) -> set:
+def get_slide_referenced_files(unpacked_dir: Path, graph: PackageGraph) -> set:
     referenced = set()
     slides_rels_dir = unpacked_dir / "ppt" / "slides" / "_rels"
 
@@ -111,24 +112,17 @@ def get_slide_referenced_files(unpacked_dir: Path) -> set:
         return referenced
 
     for rels_file in slides_rels_dir.glob("*.rels"):
-        dom = defusedxml.minidom.parse(str(rels_file))
-        for rel in dom.getElementsByTagName("Relationship"):
-            target = rel.getAttribute("Target")
-            if not target:
-                continue
-            target_path = (rels_file.parent.parent / target).resolve()
-            try:
-                referenced.add(target_path.relative_to(unpacked_dir.resolve()))
-            except ValueError:
-                pass
+        for rel in graph.relationships_in(rels_file):
+            if rel.target_part is not None:
+                referenced.add(rel.target_part)
 
     return referenced
 
 
-def remove_orphaned_rels_files(unpacked_dir: Path) -> list[str]:
+def remove_orphaned_rels_files(unpacked_dir: Path, graph: PackageGraph) -> list[str]:
     resource_dirs = ["charts", "diagrams", "drawings"]
     removed = []
-    slide_referenced = get_slide_referenced_files(unpacked_dir)
+    slide_referenced = get_slide_referenced_files(unpacked_dir, graph)
 
     for dir_name in resource_dirs:
         rels_dir = unpacked_dir / "ppt" / dir_name / "_rels"
@@ -136,39 +130,18 @@ def remove_orphaned_rels_files(unpacked_dir: Path) -> list[str]:
             continue
 
         for rels_file in rels_dir.glob("*.rels"):
-            resource_file = rels_dir.parent / rels_file.name.replace(".rels", "")
-            try:
-                resource_rel_path = resource_file.resolve().relative_to(unpacked_dir.resolve())
-            except ValueError:
-                continue
+            resource_file = PackageGraph.source_of(rels_file)
 
-            if not resource_file.exists() or resource_rel_path not in slide_referenced:
+            if not resource_file.exists() or resource_file not in slide_referenced:
                 rels_file.unlink()
+                graph.discard(rels_file)
                 rel_path = rels_file.relative_to(unpacked_dir)
                 removed.append(str(rel_path))
 
     return removed
 
 
-def get_referenced_files(unpacked_dir: Path) -> set:
-    referenced = set()
-
-    for rels_file in unpacked_dir.rglob("*.rels"):
-        dom = defusedxml.minidom.parse(str(rels_file))
-        for rel in dom.getElementsByTagName("Relationship"):
-            target = rel.getAttribute("Target")
-            if not target:
-                continue
-            target_path = (rels_file.parent.parent / target).resolve()
-            try:
-                referenced.add(target_path.relative_to(unpacked_dir.resolve()))
-            except ValueError:
-                pass
-
-    return referenced
-
-
-def remove_orphaned_files(unpacked_dir: Path, referenced: set) -> list[str]:
+def remove_orphaned_files(unpacked_dir: Path, graph: PackageGraph) -> list[str]:
     resource_dirs = ["media", "embeddings", "charts", "diagrams", "tags", "drawings", "ink"]
     removed = []
 
@@ -181,7 +154,7 @@ def remove_orphaned_files(unpacked_dir: Path, referenced: set) -> list[str]:
             if not file_path.is_file():
                 continue
             rel_path = file_path.relative_to(unpacked_dir)
-            if rel_path not in referenced:
+            if not graph.is_referenced(file_path):
                 file_path.unlink()
                 removed.append(str(rel_path))
 
@@ -189,12 +162,13 @@ def remove_orphaned_files(unpacked_dir: Path, referenced: set) -> list[str]:
     if theme_dir.exists():
         for file_path in theme_dir.glob("theme*.xml"):
             rel_path = file_path.relative_to(unpacked_dir)
-            if rel_path not in referenced:
+            if not graph.is_referenced(file_path):
                 file_path.unlink()
                 removed.append(str(rel_path))
                 theme_rels = theme_dir / "_rels" / f"{file_path.name}.rels"
                 if theme_rels.exists():
                     theme_rels.unlink()
+                    graph.discard(theme_rels)
                     removed.append(str(theme_rels.relative_to(unpacked_dir)))
 
     notes_dir = unpacked_dir / "ppt" / "notesSlides"
@@ -203,7 +177,7 @@ def remove_orphaned_files(unpacked_dir: Path, referenced: set) -> list[str]:
             if not file_path.is_file():
                 continue
             rel_path = file_path.relative_to(unpacked_dir)
-            if rel_path not in referenced:
+            if not graph.is_referenced(file_path):
                 file_path.unlink()
                 removed.append(str(rel_path))
 
@@ -213,6 +187,7 @@ def remove_orphaned_files(unpacked_dir: Path, referenced: set) -> list[str]:
                 notes_file = notes_dir / file_path.name.replace(".rels", "")
                 if not notes_file.exists():
                     file_path.unlink()
+                    graph.discard(file_path)
                     removed.append(str(file_path.relative_to(unpacked_dir)))
 
     return removed
@@ -239,18 +214,19 @@ def update_content_types(unpacked_dir: Path, removed_files: list[str]) -> None:
 
 
 def clean_unused_files(unpacked_dir: Path) -> list[str]:
+    unpacked_dir = unpacked_dir.resolve()
+    graph = PackageGraph.for_directory(unpacked_dir)
     all_removed = []
 
-    slides_removed = remove_orphaned_slides(unpacked_dir)
+    slides_removed = remove_orphaned_slides(unpacked_dir, graph)
     all_removed.extend(slides_removed)
 
-    trash_removed = remove_trash_directory(unpacked_dir)
+    trash_removed = remove_trash_directory(unpacked_dir, graph)
     all_removed.extend(trash_removed)
 
     while True:
-        removed_rels = remove_orphaned_rels_files(unpacked_dir)
-        referenced = get_referenced_files(unpacked_dir)
-        removed_files = remove_orphaned_files(unpacked_dir, referenced)
+        removed_rels = remove_orphaned_rels_files(unpacked_dir, graph)
+        removed_files = remove_orphaned_files(unpacked_dir, graph)
 
         total_removed = removed_rels + removed_files
         if not total_removed:
@@ -0,0 +1,247 @@
+"""Stream XML parts into pretty-printed or condensed form.
+
+Parts are parsed with an lxml target parser and written out as they are
+parsed, without building a tree, so memory stays flat whatever the size
+of the part.
+
+Both forms share one set of layout rules:
+- whitespace-only text between child elements is layout: pretty_print
+  replaces it with indentation, condense drops it
+- text elements (w:t, a:t, t, w:delText, w:instrText, ...) and elements
+  with mixed content are written exactly as parsed, whitespace included
+- comments are kept by pretty_print and dropped by condense, except inside
+  text elements, where both keep them
+- processing instructions are always kept
+
+so condense(pretty_print(part)) is byte-identical to condense(part), and
+pretty_print(condense(part)) to pretty_print(part) when the part has no
+comments.
+
+Entities are not resolved, so no DTD can expand a part; the predefined
+entities and character references are still written back as parsed.
+
+Namespace declarations are written as declared. Where one namespace is
+bound to several prefixes, elements and attributes take the innermost one.
+
+Declarations match the previous minidom output: pretty-printed parts start
+with <?xml version="1.0" encoding="utf-8"?> on its own line and end with a
+newline; condensed parts start with <?xml version="1.0" encoding="UTF-8"?>.
+"""
+
+import lxml.etree
+
+INDENT = "  "
+
+TEXT_ELEMENTS = {"t", "delText", "instrText", "delInstrText"}
+_TEXT_TAG_SUFFIXES = tuple("}" + name for name in TEXT_ELEMENTS)
+
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+CHUNK_SIZE = 1 << 20
+FLUSH_PIECES = 1 << 14
+
+_TEXT_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", "\r": "&#13;"})
+_ATTRIBUTE_ESCAPES = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "\n": "&#10;",
+        "\r": "&#13;",
+        "\t": "&#9;",
+    }
+)
+
+
+def pretty_print(source, output, replacements=None) -> None:
+    _serialize(source, _Formatter(output, INDENT, replacements))
+
+
+def condense(source, output) -> None:
+    _serialize(source, _Formatter(output, None, None))
+
+
+def _escape_attribute(value):
+    # Without entity resolution, libxml2 hands an escaped "&" in an attribute
+    # value to the target as the character reference "&#38;".
+    if "&" in value:
+        value = value.replace("&#38;", "&")
+    return value.translate(_ATTRIBUTE_ESCAPES)
+
+
+def _serialize(source, formatter):
+    parser = lxml.etree.XMLParser(target=formatter, resolve_entities=False, huge_tree=True)
+    if isinstance(source, bytes):
+        for offset in range(0, len(source), CHUNK_SIZE):
+            parser.feed(source[offset : offset + CHUNK_SIZE])
+    else:
+        while chunk := source.read(CHUNK_SIZE):
+            parser.feed(chunk)
+    parser.close()
+
+
+class _Frame:
+    __slots__ = ("name", "preserve", "open", "text", "declared")
+
+    def __init__(self, name, preserve, declared):
+        self.name = name
+        self.preserve = preserve
+        self.open = True
+        self.text = []
+        self.declared = declared
+
+
+class _Formatter:
+
+    def __init__(self, output, indent, replacements):
+        self.output = output
+        self.indent = indent
+        self.translation = str.maketrans(replacements) if replacements else None
+        self.stack = []
+        self.prefixes = {XML_NAMESPACE: ["xml"]}
+        self.names = {}
+        self.attribute_names = {}
+        self.newlines = []
+        self.buffer = []
+        self.write = self.buffer.append
+        if indent is None:
+            self.write('<?xml version="1.0" encoding="UTF-8"?>')
+        else:
+            self.write('<?xml version="1.0" encoding="utf-8"?>\n')
+
+    def flush(self):
+        text = "".join(self.buffer)
+        if self.translation is not None:
+            text = text.translate(self.translation)
+        self.output.write(text.encode("utf-8"))
+        self.buffer.clear()
+
+    def qualified_name(self, tag, attribute=False):
+        # Names only change with namespace declarations, which clear the cache.
+        names = self.attribute_names if attribute else self.names
+        name = names.get(tag)
+        if name is None:
+            name = names[tag] = self.resolve(tag, attribute)
+        return name
+
+    def resolve(self, tag, attribute):
+        if tag[0] != "{":
+            return tag
+        uri, local = tag[1:].split("}", 1)
+        prefixes = self.prefixes.get(uri)
+        if not prefixes:
+            raise ValueError(f"No prefix declared for namespace {uri}")
+        prefix = prefixes[-1]
+        if attribute and not prefix:
+            # Attributes never take the default namespace.
+            prefix = next((p for p in reversed(prefixes) if p), None)
+            if prefix is None:
+                raise ValueError(f"No prefix declared for attribute namespace {uri}")
+        return f"{prefix}:{local}" if prefix else local
+
+    def child(self, parent):
+        # Settle the parent's start tag and pending text before a child node.
+        if parent.open:
+            self.write(">")
+            parent.open = False
+        if parent.text:
+            text = "".join(parent.text)
+            parent.text = []
+            if parent.preserve:
+                self.write(text.translate(_TEXT_ESCAPES))
+            elif text.strip():
+                # Mixed content: everything from here on is written as is.
+                parent.preserve = True
+                self.write(text.translate(_TEXT_ESCAPES))
+
+    def newline(self):
+        depth = len(self.stack)
+        while len(self.newlines) <= depth:
+            self.newlines.append("\n" + self.indent * len(self.newlines))
+        self.write(self.newlines[depth])
+
+    def start(self, tag, attrib, nsmap):
+        preserve = False
+        if self.stack:
+            parent = self.stack[-1]
+            if parent.open or parent.text:
+                self.child(parent)
+            preserve = parent.preserve
+            if self.indent is not None and not preserve:
+                self.newline()
+
+        declarations = []
+        if nsmap:
+            for prefix, uri in nsmap.items():
+                prefix = prefix or ""
+                self.prefixes.setdefault(uri, []).append(prefix)
+                declarations.append((prefix, uri))
+            self.names.clear()
+            self.attribute_names.clear()
+
+        name = self.names.get(tag) or self.qualified_name(tag)
+        parts = ["<", name]
+        for prefix, uri in declarations:
+            attribute = f"xmlns:{prefix}" if prefix else "xmlns"
+            parts.append(f' {attribute}="{_escape_attribute(uri)}"')
+        if attrib:
+            for key, value in attrib.items():
+                parts.append(f' {self.qualified_name(key, True)}="{_escape_attribute(value)}"')
+        self.write("".join(parts))
+
+        if not preserve:
+            preserve = tag.endswith(_TEXT_TAG_SUFFIXES) or tag in TEXT_ELEMENTS
+        self.stack.append(_Frame(name, preserve, declarations))
+
+    def data(self, data):
+        if self.stack:
+            self.stack[-1].text.append(data)
+
+    def end(self, tag):
+        frame = self.stack.pop()
+        text = "".join(frame.text)
+        if frame.open:
+            if text:
+                self.write(f">{text.translate(_TEXT_ESCAPES)}</{frame.name}>")
+            else:
+                self.write("/>")
+        else:
+            if text and (frame.preserve or text.strip()):
+                frame.preserve = True
+                self.write(text.translate(_TEXT_ESCAPES))
+            if self.indent is not None and not frame.preserve:
+                self.newline()
+            self.write(f"</{frame.name}>")
+
+        if frame.declared:
+            for prefix, uri in frame.declared:
+                self.prefixes[uri].pop()
+            self.names.clear()
+            self.attribute_names.clear()
+        if not self.stack and self.indent is not None:
+            self.write("\n")
+        if len(self.buffer) >= FLUSH_PIECES:
+            self.flush()
+
+    def comment(self, text):
+        parent = self.stack[-1] if self.stack else None
+        if parent is not None and self.indent is None and not parent.preserve:
+            return
+        self.node(f"<!--{text}-->")
+
+    def pi(self, target, data):
+        self.node(f"<?{target} {data}?>" if data else f"<?{target}?>")
+
+    def node(self, markup):
+        parent = self.stack[-1] if self.stack else None
+        if parent is None:
+            self.write(markup + "\n" if self.indent is not None else markup)
+            return
+        self.child(parent)
+        if self.indent is not None and not parent.preserve:
+            self.newline()
+        self.write(markup)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,496 @@
+"""Generate synthetic DOCX, PPTX and XLSX files of configurable size.
+
+The documents are written directly as OOXML parts, streamed into the zip,
+so even very large documents are generated in bounded memory. Content is
+deterministic for a given seed, and every document passes the validators
+in this package, so benchmarks measure the normal, passing path.
+
+Document features exercise the pipeline stages:
+- run fragmentation: runs with identical formatting, rsid attributes and
+  proofErr markers, which merge_runs merges
+- tracked changes: adjacent insertions and deletions by one author, which
+  simplify_redlines merges
+- comments, images, slides and worksheet rows
+- a hyperlink whose relationship target and tooltip hold "&", "<" and '"',
+  which must come through unpack and pack unchanged
+"""
+
+import random
+import struct
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+S = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+WP = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+PIC = "http://schemas.openxmlformats.org/drawingml/2006/picture"
+PACKAGE_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+OFFICE_DOCUMENT = f"{REL}/officeDocument"
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+
+AUTHOR = "Benchmark"
+DATE = "2024-01-01T00:00:00Z"
+
+IMAGE_EXTENT = 952500
+
+HYPERLINK_TARGET = 'https://example.com/search?q="lorem"&lang=en&sort=<date>'
+HYPERLINK_TOOLTIP = 'Search for "lorem" & <ipsum>'
+
+
+class _Package:
+
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.overrides = []
+
+    def write(self, name, content, content_type=None):
+        if content_type:
+            self.overrides.append((name, content_type))
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        self.zip.writestr(name, data)
+
+    def stream(self, name, chunks, content_type=None):
+        if content_type:
+            self.overrides.append((name, content_type))
+        with self.zip.open(name, "w", force_zip64=True) as f:
+            for chunk in chunks:
+                f.write(chunk.encode("utf-8"))
+
+    def relationships(self, name, relationships):
+        # External targets are given as (id, type, target, "External").
+        items = "".join(
+            f'<Relationship Id="{rid}" Type="{REL}/{rel_type}" Target="{_attribute(target)}"'
+            + "".join(f' TargetMode="{mode}"' for mode in options)
+            + "/>"
+            for rid, rel_type, target, *options in relationships
+        )
+        self.write(
+            name,
+            f'{XML_DECLARATION}<Relationships xmlns="{PACKAGE_RELS}">{items}</Relationships>',
+        )
+
+    def close(self, image_count=0):
+        defaults = [
+            ("rels", "application/vnd.openxmlformats-package.relationships+xml"),
+            ("xml", "application/xml"),
+        ]
+        if image_count:
+            defaults.append(("png", "image/png"))
+        items = "".join(
+            f'<Default Extension="{ext}" ContentType="{ct}"/>' for ext, ct in defaults
+        )
+        items += "".join(
+            f'<Override PartName="/{name}" ContentType="{ct}"/>'
+            for name, ct in self.overrides
+        )
+        self.zip.writestr(
+            "[Content_Types].xml",
+            f'{XML_DECLARATION}<Types xmlns="{CONTENT_TYPES}">{items}</Types>',
+        )
+        self.zip.close()
+
+
+def _attribute(value):
+    return escape(value, {'"': "&quot;"})
+
+
+def make_png(size, seed=0):
+    # A grayscale image of noise, so it stays about `size` bytes compressed.
+    width = 64
+    height = max(1, size // width)
+    rng = random.Random(seed)
+    raw = b"".join(b"\x00" + rng.randbytes(width) for _ in range(height))
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _docx_paragraphs(rng, paragraphs, runs_per_paragraph, tracked_changes, comments, images):
+    # Features are spread evenly over the body.
+    def spread(count):
+        if not count:
+            return {}
+        step = max(1, paragraphs // count)
+        return {index * step: index for index in range(min(count, paragraphs))}
+
+    revisions = spread(tracked_changes)
+    commented = spread(comments)
+    pictures = spread(images)
+    revision_id = 1000
+
+    for index in range(paragraphs):
+        parts = [f'<w:p w:rsidR="00A1{index % 10000:04d}">']
+
+        if index == 0:
+            parts.append(
+                f'<w:hyperlink r:id="rIdLink" w:tooltip="{_attribute(HYPERLINK_TOOLTIP)}">'
+                f"<w:r><w:t>{_sentence(rng, 2)}</w:t></w:r></w:hyperlink>"
+            )
+
+        if index in commented:
+            parts.append(f'<w:commentRangeStart w:id="{commented[index]}"/>')
+
+        for run in range(runs_per_paragraph):
+            text = _sentence(rng, 3)
+            parts.append(
+                f'<w:r w:rsidR="00B{run:05d}"><w:rPr><w:b/></w:rPr>'
+                f'<w:t xml:space="preserve">{text} </w:t></w:r>'
+            )
+            if run == 0 and runs_per_paragraph > 1:
+                parts.append('<w:proofErr w:type="spellStart"/>')
+            elif run == 1:
+                parts.append('<w:proofErr w:type="spellEnd"/>')
+
+        if index in revisions:
+            for _ in range(2):
+                revision_id += 1
+                parts.append(
+                    f'<w:ins w:id="{revision_id}" w:author="{AUTHOR}" w:date="{DATE}">'
+                    f"<w:r><w:t xml:space=\"preserve\">{_sentence(rng, 2)} </w:t></w:r></w:ins>"
+                )
+            for _ in range(2):
+                revision_id += 1
+                parts.append(
+                    f'<w:del w:id="{revision_id}" w:author="{AUTHOR}" w:date="{DATE}">'
+                    f"<w:r><w:delText xml:space=\"preserve\">{_sentence(rng, 2)} </w:delText></w:r></w:del>"
+                )
+
+        if index in commented:
+            number = commented[index]
+            parts.append(
+                f'<w:commentRangeEnd w:id="{number}"/>'
+                f'<w:r><w:commentReference w:id="{number}"/></w:r>'
+            )
+
+        if index in pictures:
+            number = pictures[index] + 1
+            parts.append(
+                f"<w:r><w:drawing>"
+                f'<wp:inline distT="0" distB="0" distL="0" distR="0">'
+                f'<wp:extent cx="{IMAGE_EXTENT}" cy="{IMAGE_EXTENT}"/>'
+                f'<wp:docPr id="{number}" name="Picture {number}"/>'
+                f'<a:graphic><a:graphicData uri="{PIC}"><pic:pic>'
+                f'<pic:nvPicPr><pic:cNvPr id="{number}" name="image{number}.png"/><pic:cNvPicPr/></pic:nvPicPr>'
+                f'<pic:blipFill><a:blip r:embed="rIdImage{number}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+                f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{IMAGE_EXTENT}" cy="{IMAGE_EXTENT}"/></a:xfrm>'
+                f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr>'
+                f"</pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r>"
+            )
+
+        parts.append("</w:p>")
+        yield "".join(parts)
+
+
+def make_docx(
+    path,
+    paragraphs=1000,
+    runs_per_paragraph=4,
+    tracked_changes=0,
+    comments=0,
+    images=0,
+    image_size=16 * 1024,
+    seed=0,
+):
+    rng = random.Random(seed)
+    package = _Package(path)
+
+    package.relationships("_rels/.rels", [("rId1", "officeDocument", "word/document.xml")])
+
+    relationships = [
+        ("rId1", "styles", "styles.xml"),
+        ("rIdLink", "hyperlink", HYPERLINK_TARGET, "External"),
+    ]
+    if comments:
+        relationships.append(("rId2", "comments", "comments.xml"))
+    for number in range(1, images + 1):
+        relationships.append((f"rIdImage{number}", "image", f"media/image{number}.png"))
+        package.write(f"word/media/image{number}.png", make_png(image_size, seed + number))
+    package.relationships("word/_rels/document.xml.rels", relationships)
+
+    package.write(
+        "word/styles.xml",
+        f'{XML_DECLARATION}<w:styles xmlns:w="{W}">'
+        f'<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+        f"</w:styles>",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml",
+    )
+
+    if comments:
+        items = "".join(
+            f'<w:comment w:id="{number}" w:author="{AUTHOR}" w:date="{DATE}" w:initials="B">'
+            f"<w:p><w:r><w:t>{_sentence(rng, 6)}</w:t></w:r></w:p></w:comment>"
+            for number in range(comments)
+        )
+        package.write(
+            "word/comments.xml",
+            f'{XML_DECLARATION}<w:comments xmlns:w="{W}">{items}</w:comments>',
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml",
+        )
+
+    def document():
+        yield (
+            f'{XML_DECLARATION}<w:document xmlns:w="{W}" xmlns:r="{R}" xmlns:wp="{WP}" '
+            f'xmlns:a="{A}" xmlns:pic="{PIC}"><w:body>'
+        )
+        yield from _docx_paragraphs(
+            rng, paragraphs, runs_per_paragraph, tracked_changes, comments, images
+        )
+        yield (
+            '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+            '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" '
+            'w:header="720" w:footer="720" w:gutter="0"/></w:sectPr></w:body></w:document>'
+        )
+
+    package.stream(
+        "word/document.xml",
+        document(),
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml",
+    )
+    package.close(images)
+
+
+THEME = (
+    f'{XML_DECLARATION}<a:theme xmlns:a="{A}" name="Benchmark"><a:themeElements>'
+    '<a:clrScheme name="Benchmark">'
+    '<a:dk1><a:srgbClr val="000000"/></a:dk1><a:lt1><a:srgbClr val="FFFFFF"/></a:lt1>'
+    '<a:dk2><a:srgbClr val="1F497D"/></a:dk2><a:lt2><a:srgbClr val="EEECE1"/></a:lt2>'
+    + "".join(f'<a:accent{n}><a:srgbClr val="4F81BD"/></a:accent{n}>' for n in range(1, 7))
+    + '<a:hlink><a:srgbClr val="0000FF"/></a:hlink><a:folHlink><a:srgbClr val="800080"/></a:folHlink>'
+    "</a:clrScheme>"
+    '<a:fontScheme name="Benchmark">'
+    '<a:majorFont><a:latin typeface="Calibri"/><a:ea typeface=""/><a:cs typeface=""/></a:majorFont>'
+    '<a:minorFont><a:latin typeface="Calibri"/><a:ea typeface=""/><a:cs typeface=""/></a:minorFont>'
+    "</a:fontScheme>"
+    '<a:fmtScheme name="Benchmark">'
+    "<a:fillStyleLst>" + '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>' * 3 + "</a:fillStyleLst>"
+    "<a:lnStyleLst>" + '<a:ln w="9525"><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:ln>' * 3 + "</a:lnStyleLst>"
+    "<a:effectStyleLst>" + "<a:effectStyle><a:effectLst/></a:effectStyle>" * 3 + "</a:effectStyleLst>"
+    "<a:bgFillStyleLst>" + '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>' * 3 + "</a:bgFillStyleLst>"
+    "</a:fmtScheme></a:themeElements></a:theme>"
+)
+
+CLR_MAP = (
+    '<p:clrMap bg1="lt1" tx1="dk1" bg2="lt2" tx2="dk2" accent1="accent1" accent2="accent2" '
+    'accent3="accent3" accent4="accent4" accent5="accent5" accent6="accent6" '
+    'hlink="hlink" folHlink="folHlink"/>'
+)
+
+EMPTY_TREE = (
+    '<p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr><p:grpSpPr/>'
+)
+
+
+def _slide_shape(shape_id, name, y, text):
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+        f'<p:spPr><a:xfrm><a:off x="457200" y="{y}"/><a:ext cx="8229600" cy="1143000"/></a:xfrm>'
+        f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr>'
+        f'<p:txBody><a:bodyPr/><a:lstStyle/><a:p><a:r><a:rPr lang="en-US"/><a:t>{text}</a:t></a:r></a:p></p:txBody></p:sp>'
+    )
+
+
+def make_pptx(path, slides=20, shapes_per_slide=3, images=0, image_size=16 * 1024, seed=0):
+    rng = random.Random(seed)
+    package = _Package(path)
+    presentation_type = "application/vnd.openxmlformats-officedocument.presentationml"
+
+    package.relationships("_rels/.rels", [("rId1", "officeDocument", "ppt/presentation.xml")])
+
+    slide_ids = "".join(
+        f'<p:sldId id="{256 + number}" r:id="rId{number + 3}"/>' for number in range(slides)
+    )
+    package.write(
+        "ppt/presentation.xml",
+        f'{XML_DECLARATION}<p:presentation xmlns:a="{A}" xmlns:r="{R}" xmlns:p="{P}">'
+        f'<p:sldMasterIdLst><p:sldMasterId id="2147483648" r:id="rId1"/></p:sldMasterIdLst>'
+        f"<p:sldIdLst>{slide_ids}</p:sldIdLst>"
+        f'<p:sldSz cx="9144000" cy="6858000"/><p:notesSz cx="6858000" cy="9144000"/>'
+        f"</p:presentation>",
+        f"{presentation_type}.presentation.main+xml",
+    )
+    package.relationships(
+        "ppt/_rels/presentation.xml.rels",
+        [
+            ("rId1", "slideMaster", "slideMasters/slideMaster1.xml"),
+            ("rId2", "theme", "theme/theme1.xml"),
+        ]
+        + [
+            (f"rId{number + 3}", "slide", f"slides/slide{number + 1}.xml")
+            for number in range(slides)
+        ],
+    )
+
+    package.write("ppt/theme/theme1.xml", THEME, "application/vnd.openxmlformats-officedocument.theme+xml")
+
+    package.write(
+        "ppt/slideMasters/slideMaster1.xml",
+        f'{XML_DECLARATION}<p:sldMaster xmlns:a="{A}" xmlns:r="{R}" xmlns:p="{P}">'
+        f"<p:cSld><p:spTree>{EMPTY_TREE}</p:spTree></p:cSld>{CLR_MAP}"
+        f'<p:sldLayoutIdLst><p:sldLayoutId id="2147483649" r:id="rId1"/></p:sldLayoutIdLst>'
+        f"</p:sldMaster>",
+        f"{presentation_type}.slideMaster+xml",
+    )
+    package.relationships(
+        "ppt/slideMasters/_rels/slideMaster1.xml.rels",
+        [
+            ("rId1", "slideLayout", "../slideLayouts/slideLayout1.xml"),
+            ("rId2", "theme", "../theme/theme1.xml"),
+        ],
+    )
+
+    package.write(
+        "ppt/slideLayouts/slideLayout1.xml",
+        f'{XML_DECLARATION}<p:sldLayout xmlns:a="{A}" xmlns:r="{R}" xmlns:p="{P}">'
+        f"<p:cSld><p:spTree>{EMPTY_TREE}</p:spTree></p:cSld>"
+        f"<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sldLayout>",
+        f"{presentation_type}.slideLayout+xml",
+    )
+    package.relationships(
+        "ppt/slideLayouts/_rels/slideLayout1.xml.rels",
+        [("rId1", "slideMaster", "../slideMasters/slideMaster1.xml")],
+    )
+
+    image_slides = {}
+    if images and slides:
+        step = max(1, slides // images)
+        image_slides = {index * step: index + 1 for index in range(min(images, slides))}
+
+    for number in range(slides):
+        shapes = [_slide_shape(2, "Title 1", 274638, f"Slide {number + 1}")]
+        for shape in range(1, shapes_per_slide):
+            shapes.append(
+                _slide_shape(shape + 2, f"Text {shape + 1}", 1600200 + shape * 1143000, _sentence(rng, 8))
+            )
+
+        relationships = [("rId1", "slideLayout", "../slideLayouts/slideLayout1.xml")]
+        image = image_slides.get(number)
+        if image:
+            shape_id = shapes_per_slide + 2
+            shapes.append(
+                f'<p:pic><p:nvPicPr><p:cNvPr id="{shape_id}" name="Picture {shape_id}"/><p:cNvPicPr/><p:nvPr/></p:nvPicPr>'
+                f'<p:blipFill><a:blip r:embed="rId2"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+                f'<p:spPr><a:xfrm><a:off x="457200" y="457200"/><a:ext cx="{IMAGE_EXTENT}" cy="{IMAGE_EXTENT}"/></a:xfrm>'
+                f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr></p:pic>'
+            )
+            relationships.append(("rId2", "image", f"../media/image{image}.png"))
+            package.write(f"ppt/media/image{image}.png", make_png(image_size, seed + image))
+
+        package.write(
+            f"ppt/slides/slide{number + 1}.xml",
+            f'{XML_DECLARATION}<p:sld xmlns:a="{A}" xmlns:r="{R}" xmlns:p="{P}">'
+            f'<p:cSld><p:spTree>{EMPTY_TREE}{"".join(shapes)}</p:spTree></p:cSld>'
+            f"<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>",
+            f"{presentation_type}.slide+xml",
+        )
+        package.relationships(f"ppt/slides/_rels/slide{number + 1}.xml.rels", relationships)
+
+    package.close(len(image_slides))
+
+
+def _column_name(number):
+    name = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def make_xlsx(path, sheets=1, rows=1000, columns=10, strings=1000, seed=0):
+    rng = random.Random(seed)
+    package = _Package(path)
+    spreadsheet_type = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+    strings = max(1, strings)
+
+    package.relationships("_rels/.rels", [("rId1", "officeDocument", "xl/workbook.xml")])
+
+    sheet_entries = "".join(
+        f'<sheet name="Sheet{number}" sheetId="{number}" r:id="rId{number + 2}"/>'
+        for number in range(1, sheets + 1)
+    )
+    package.write(
+        "xl/workbook.xml",
+        f'{XML_DECLARATION}<workbook xmlns="{S}" xmlns:r="{R}"><sheets>{sheet_entries}</sheets></workbook>',
+        f"{spreadsheet_type}.sheet.main+xml",
+    )
+    package.relationships(
+        "xl/_rels/workbook.xml.rels",
+        [
+            ("rId1", "styles", "styles.xml"),
+            ("rId2", "sharedStrings", "sharedStrings.xml"),
+        ]
+        + [
+            (f"rId{number + 2}", "worksheet", f"worksheets/sheet{number}.xml")
+            for number in range(1, sheets + 1)
+        ],
+    )
+
+    package.write(
+        "xl/styles.xml",
+        f'{XML_DECLARATION}<styleSheet xmlns="{S}">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="2" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        "</styleSheet>",
+        f"{spreadsheet_type}.styles+xml",
+    )
+
+    def shared_strings():
+        yield f'{XML_DECLARATION}<sst xmlns="{S}" count="{strings}" uniqueCount="{strings}">'
+        for _ in range(strings):
+            yield f"<si><t>{_sentence(rng, 3)}</t></si>"
+        yield "</sst>"
+
+    package.stream("xl/sharedStrings.xml", shared_strings(), f"{spreadsheet_type}.sharedStrings+xml")
+
+    names = [_column_name(number) for number in range(1, columns + 1)]
+
+    def worksheet():
+        yield f'{XML_DECLARATION}<worksheet xmlns="{S}"><sheetData>'
+        for row in range(1, rows + 1):
+            cells = []
+            for column, name in enumerate(names):
+                if column % 2:
+                    cells.append(f'<c r="{name}{row}" s="1"><v>{rng.random() * 1000:.2f}</v></c>')
+                else:
+                    cells.append(f'<c r="{name}{row}" t="s"><v>{rng.randrange(strings)}</v></c>')
+            yield f'<row r="{row}">{"".join(cells)}</row>'
+        yield "</sheetData></worksheet>"
+
+    for number in range(1, sheets + 1):
+        package.stream(
+            f"xl/worksheets/sheet{number}.xml", worksheet(), f"{spreadsheet_type}.worksheet+xml"
+        )
+
+    package.close()
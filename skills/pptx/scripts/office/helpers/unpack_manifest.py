@@ -0,0 +1,98 @@
+"""Record the parts unpack wrote, so pack can tell which are unchanged.
+
+unpack pretty-prints XML parts, so a part that was never edited no longer
+matches its member in the original archive byte for byte. The manifest,
+kept in the unpacked directory, records for every part the CRC-32 and size
+of the original member, and the CRC-32, size and SHA-256 of the file written
+from it.
+
+A part is unchanged from a member of the original archive when its content
+is the content of the member, or, when the member is the one unpack read,
+the content of the file unpack wrote. CRC-32 and size only rule candidates
+out cheaply; the content itself is compared by SHA-256, so an edit whose
+CRC-32 collides with the original is never dropped. pack then copies the
+member's compressed bytes from the original archive instead of compressing
+the part again.
+"""
+
+import hashlib
+import json
+import zlib
+from pathlib import Path
+
+from validators.manifest import UNPACK_MANIFEST_NAME
+
+UNPACK_MANIFEST_VERSION = 2
+
+CHUNK_SIZE = 1 << 20
+
+
+class UnpackManifest:
+
+    def __init__(self, root_dir):
+        self.root_dir = Path(root_dir)
+        self.path = self.root_dir / UNPACK_MANIFEST_NAME
+        self.parts = {}
+
+    @classmethod
+    def load(cls, root_dir):
+        manifest = cls(root_dir)
+        try:
+            data = json.loads(manifest.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return manifest
+        if data.get("version") == UNPACK_MANIFEST_VERSION:
+            manifest.parts = data.get("parts", {})
+        return manifest
+
+    def record(self, name, member, crc, size, digest):
+        self.parts[name] = {
+            "member": [member.CRC, member.file_size],
+            "file": [crc, size, digest],
+        }
+
+    def unchanged(self, name, path, archive, member):
+        # `archive` is the original ZipFile and `member` its ZipInfo for
+        # `name`. A candidate digest of None is the member's own content,
+        # hashed only if its CRC-32 and size match.
+        candidates = []
+        entry = self.parts.get(name)
+        if entry is not None and entry["member"] == [member.CRC, member.file_size]:
+            candidates.append(entry["file"])
+        candidates.append([member.CRC, member.file_size, None])
+
+        # The size rules out most edited parts without reading them.
+        size = Path(path).stat().st_size
+        candidates = [candidate for candidate in candidates if candidate[1] == size]
+        if not candidates:
+            return False
+
+        crc, digest = file_digests(path)
+        for candidate_crc, _, candidate_digest in candidates:
+            if crc != candidate_crc:
+                continue
+            if candidate_digest is None:
+                with archive.open(member) as f:
+                    candidate_digest = _digests(f)[1]
+            if digest == candidate_digest:
+                return True
+        return False
+
+    def save(self):
+        data = {"version": UNPACK_MANIFEST_VERSION, "parts": self.parts}
+        self.path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def file_digests(path):
+    # CRC-32 and SHA-256 of a file, read once.
+    with open(path, "rb") as f:
+        return _digests(f)
+
+
+def _digests(f):
+    crc = 0
+    sha256 = hashlib.sha256()
+    while chunk := f.read(CHUNK_SIZE):
+        crc = zlib.crc32(chunk, crc)
+        sha256.update(chunk)
+    return crc, sha256.hexdigest()
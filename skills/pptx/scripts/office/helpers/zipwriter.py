@@ -0,0 +1,310 @@
+"""Write zip archives whose members may be copied still compressed.
+
+ZipFile can only add data it compresses itself, so pack.py writes its
+archives with ZipWriter instead. New members are deflated as they are
+written; members copied from another archive keep their compressed bytes,
+which are read from the source file at the offsets recorded in its ZipInfo.
+
+The writer lays out the archive itself (local file headers, central
+directory and end of central directory record, with zip64 records where
+sizes, offsets or the member count need them), so it depends only on the
+documented ZipInfo fields of the source archive, not on ZipFile internals.
+The output file must be seekable: the header of a new member is rewritten
+with its CRC and sizes once the member is complete.
+"""
+
+import os
+import shutil
+import struct
+import sys
+import time
+import zlib
+
+CHUNK_SIZE = 1 << 20
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHLLLHH")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+CENTRAL_HEADER = struct.Struct("<4sBBBBHHHHLLLHHHHHLL")
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+END_RECORD = struct.Struct("<4sHHHHLLH")
+END_RECORD_SIGNATURE = b"PK\x05\x06"
+ZIP64_END_RECORD = struct.Struct("<4sQHHLLQQQQ")
+ZIP64_END_RECORD_SIGNATURE = b"PK\x06\x06"
+ZIP64_LOCATOR = struct.Struct("<4sLQL")
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_EXTRA_ID = 0x0001
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+# New members whose size estimate comes this close to the limit reserve
+# room for zip64 sizes in their local header, as ZipFile does.
+ZIP64_MARGIN = 1.05
+
+DEFAULT_VERSION = 20
+ZIP64_VERSION = 45
+
+UTF8_FLAG = 0x800
+# Bits 1 and 2 describe the compressed data (deflate level, LZMA end
+# marker), so they are kept when a member is copied.
+COMPRESSION_OPTION_FLAGS = 0x6
+
+CREATE_SYSTEM = 0 if sys.platform == "win32" else 3
+
+
+class ZipWriter:
+
+    def __init__(self, path):
+        self.fp = open(path, "wb")
+        self.entries = []
+        self._writing = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.fp.close()
+
+    def write(self, path, name):
+        stat = os.stat(path)
+        with open(path, "rb") as source, self.open(
+            name, stat.st_mtime, stat.st_mode, stat.st_size
+        ) as output:
+            shutil.copyfileobj(source, output, CHUNK_SIZE)
+
+    def open(self, name, mtime, mode, size_hint=0):
+        if self._writing:
+            raise ValueError("Close the open member before writing another")
+        entry = _Entry(name, _date_time(mtime), (mode & 0xFFFF) << 16, ZIP_DEFLATED)
+        entry.zip64 = size_hint * ZIP64_MARGIN > ZIP64_LIMIT
+        self._write_local_header(entry)
+        self._writing = True
+        return _MemberWriter(self, entry)
+
+    def copy(self, source, info):
+        # `source` is the source archive opened in binary mode, `info` the
+        # ZipInfo of the member to copy.
+        if self._writing:
+            raise ValueError("Close the open member before writing another")
+        source.seek(info.header_offset)
+        header = source.read(LOCAL_HEADER.size)
+        if len(header) != LOCAL_HEADER.size or header[:4] != LOCAL_HEADER_SIGNATURE:
+            raise ValueError(f"Bad local file header for {info.filename}")
+        name_length, extra_length = LOCAL_HEADER.unpack(header)[-2:]
+        source.seek(info.header_offset + LOCAL_HEADER.size + name_length + extra_length)
+
+        entry = _Entry(info.filename, info.date_time, info.external_attr, info.compress_type)
+        entry.flags |= info.flag_bits & COMPRESSION_OPTION_FLAGS
+        entry.extract_version = max(DEFAULT_VERSION, info.extract_version)
+        entry.crc = info.CRC
+        entry.compress_size = info.compress_size
+        entry.file_size = info.file_size
+        entry.zip64 = entry.file_size > ZIP64_LIMIT or entry.compress_size > ZIP64_LIMIT
+        self._write_local_header(entry)
+
+        remaining = info.compress_size
+        while remaining:
+            chunk = source.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError(f"Truncated data for {info.filename}")
+            self.fp.write(chunk)
+            remaining -= len(chunk)
+
+    def close(self):
+        if self.fp.closed:
+            return
+        if self._writing:
+            raise ValueError("Close the open member before closing the archive")
+
+        directory_offset = self.fp.tell()
+        for entry in self.entries:
+            self.fp.write(entry.central_header())
+        directory_size = self.fp.tell() - directory_offset
+
+        count = len(self.entries)
+        if (
+            count > ZIP64_COUNT_LIMIT
+            or directory_offset > ZIP64_LIMIT
+            or directory_size > ZIP64_LIMIT
+        ):
+            end_offset = self.fp.tell()
+            self.fp.write(
+                ZIP64_END_RECORD.pack(
+                    ZIP64_END_RECORD_SIGNATURE,
+                    ZIP64_END_RECORD.size - 12,
+                    ZIP64_VERSION,
+                    ZIP64_VERSION,
+                    0,
+                    0,
+                    count,
+                    count,
+                    directory_size,
+                    directory_offset,
+                )
+            )
+            self.fp.write(ZIP64_LOCATOR.pack(ZIP64_LOCATOR_SIGNATURE, 0, end_offset, 1))
+            count = min(count, ZIP64_COUNT_LIMIT)
+            directory_size = min(directory_size, ZIP64_LIMIT)
+            directory_offset = min(directory_offset, ZIP64_LIMIT)
+
+        self.fp.write(
+            END_RECORD.pack(
+                END_RECORD_SIGNATURE, 0, 0, count, count, directory_size, directory_offset, 0
+            )
+        )
+        self.fp.close()
+
+    def _write_local_header(self, entry):
+        entry.offset = self.fp.tell()
+        self.fp.write(entry.local_header())
+        self.entries.append(entry)
+
+    def _finish(self, entry):
+        end = self.fp.tell()
+        if not entry.zip64 and (
+            entry.file_size > ZIP64_LIMIT or entry.compress_size > ZIP64_LIMIT
+        ):
+            raise ValueError(f"{entry.name} is too large for the space reserved in its header")
+        self.fp.seek(entry.offset)
+        self.fp.write(entry.local_header())
+        self.fp.seek(end)
+        self._writing = False
+
+
+class _MemberWriter:
+
+    def __init__(self, writer, entry):
+        self.writer = writer
+        self.entry = entry
+        self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+
+    def write(self, data):
+        self.entry.crc = zlib.crc32(data, self.entry.crc)
+        self.entry.file_size += len(data)
+        self._output(self.compressor.compress(data))
+        return len(data)
+
+    def close(self):
+        self._output(self.compressor.flush())
+        self.writer._finish(self.entry)
+
+    def _output(self, data):
+        if data:
+            self.writer.fp.write(data)
+            self.entry.compress_size += len(data)
+
+
+class _Entry:
+
+    def __init__(self, name, date_time, external_attr, compress_type):
+        self.name = name
+        self.encoded_name = name.encode("utf-8")
+        self.flags = 0 if name.isascii() else UTF8_FLAG
+        self.date_time = date_time
+        self.external_attr = external_attr
+        self.compress_type = compress_type
+        self.extract_version = DEFAULT_VERSION
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+        self.offset = 0
+        self.zip64 = False
+
+    def dos_time(self):
+        year, month, day, hour, minute, second = self.date_time
+        return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+    def local_header(self):
+        dos_time, dos_date = self.dos_time()
+        extract_version = self.extract_version
+        compress_size, file_size = self.compress_size, self.file_size
+        extra = b""
+        if self.zip64:
+            extra = struct.pack("<HHQQ", ZIP64_EXTRA_ID, 16, file_size, compress_size)
+            compress_size = file_size = ZIP64_LIMIT
+            extract_version = max(extract_version, ZIP64_VERSION)
+        return (
+            LOCAL_HEADER.pack(
+                LOCAL_HEADER_SIGNATURE,
+                extract_version,
+                self.flags,
+                self.compress_type,
+                dos_time,
+                dos_date,
+                self.crc,
+                compress_size,
+                file_size,
+                len(self.encoded_name),
+                len(extra),
+            )
+            + self.encoded_name
+            + extra
+        )
+
+    def central_header(self):
+        dos_time, dos_date = self.dos_time()
+        extract_version = self.extract_version
+        values = []
+        file_size, compress_size, offset = self.file_size, self.compress_size, self.offset
+        # Only the fields that overflow go into the zip64 extra field, in
+        # this order.
+        if file_size > ZIP64_LIMIT:
+            values.append(file_size)
+            file_size = ZIP64_LIMIT
+        if compress_size > ZIP64_LIMIT:
+            values.append(compress_size)
+            compress_size = ZIP64_LIMIT
+        if offset > ZIP64_LIMIT:
+            values.append(offset)
+            offset = ZIP64_LIMIT
+        extra = b""
+        if values:
+            extra = struct.pack(f"<HH{len(values)}Q", ZIP64_EXTRA_ID, 8 * len(values), *values)
+            extract_version = max(extract_version, ZIP64_VERSION)
+        return (
+            CENTRAL_HEADER.pack(
+                CENTRAL_HEADER_SIGNATURE,
+                extract_version,
+                CREATE_SYSTEM,
+                extract_version,
+                0,
+                self.flags,
+                self.compress_type,
+                dos_time,
+                dos_date,
+                self.crc,
+                compress_size,
+                file_size,
+                len(self.encoded_name),
+                len(extra),
+                0,
+                0,
+                0,
+                self.external_attr,
+                offset,
+            )
+            + self.encoded_name
+            + extra
+        )
+
+
+def _date_time(mtime):
+    # Zip timestamps cover 1980 to 2107.
+    date_time = time.localtime(mtime)[:6]
+    if date_time[0] < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    if date_time[0] > 2107:
+        return (2107, 12, 31, 23, 59, 59)
+    return date_time
@@ -0,0 +1,127 @@
+"""Files persisted between runs are only trusted in a private per-user directory."""
+
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import zipfile
+
+import pytest
+
+from validators import xsd
+from validators.baseline import BaselineIndex
+from validators.cache import cache_dir, is_private
+from validators.server import default_socket_path, request
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX ownership")
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def original(tmp_path):
+    path = tmp_path / "original.docx"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("word/document.xml", b"<document/>")
+    return path
+
+
+@pytest.fixture
+def fresh_bundle():
+    xsd.clear_schemas()
+    yield
+    xsd.clear_schemas()
+
+
+def test_cache_dir_is_private(temp_dir):
+    path = cache_dir()
+
+    assert path.parent == temp_dir
+    assert path.stat().st_mode & 0o777 == 0o700
+    assert is_private(path, directory=True)
+
+
+def test_cache_dir_rejects_shared_directory(temp_dir):
+    shared = temp_dir / f"ooxml_validators_{os.getuid()}"
+    shared.mkdir()
+    shared.chmod(0o777)
+
+    assert cache_dir() is None
+
+
+def test_cache_dir_rejects_symlink(temp_dir):
+    target = temp_dir / "elsewhere"
+    target.mkdir(mode=0o700)
+    (temp_dir / f"ooxml_validators_{os.getuid()}").symlink_to(target)
+
+    assert cache_dir() is None
+
+
+def test_schema_bundle_in_shared_directory_is_ignored(temp_dir, fresh_bundle):
+    shared = temp_dir / f"ooxml_validators_{os.getuid()}"
+    shared.mkdir()
+    shared.chmod(0o777)
+    with zipfile.ZipFile(shared / f"schemas_{xsd.schemas_version()}.zip", "w") as zf:
+        zf.writestr("planted.xsd", b"<planted/>")
+
+    bundle = xsd._load_bundle()
+
+    assert "planted.xsd" not in bundle
+    assert bundle
+
+
+def test_baseline_index_is_private_and_keyed_by_content_hash(temp_dir, original):
+    validated = []
+
+    def validate_part(part_name, data):
+        validated.append(part_name)
+        return False, {"original error": 1}
+
+    index = BaselineIndex(original, validate_part)
+    assert index.errors_for("word/document.xml") == {"original error"}
+    index.close()
+
+    assert index.index_path.parent == cache_dir()
+    entry = json.loads(index.index_path.read_text())["parts"]["word/document.xml"]
+    assert entry["hash"] == hashlib.sha256(b"<document/>").hexdigest()
+
+    index = BaselineIndex(original, validate_part)
+    assert index.errors_for("word/document.xml") == {"original error"}
+    index.close()
+    assert len(validated) == 1
+
+
+def test_baseline_index_is_not_kept_in_shared_directory(temp_dir, original):
+    shared = temp_dir / f"ooxml_validators_{os.getuid()}"
+    shared.mkdir()
+    shared.chmod(0o777)
+
+    index = BaselineIndex(original, lambda part_name, data: (False, {"error": 1}))
+    assert index.errors_for("word/document.xml") == {"error"}
+    index.close()
+
+    assert index.index_path is None
+    assert list(shared.iterdir()) == []
+
+
+def test_default_socket_is_in_cache_dir(temp_dir):
+    assert default_socket_path().parent == cache_dir()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets")
+def test_client_does_not_connect_to_shared_socket(tmp_path):
+    socket_path = tmp_path / "validator.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(str(socket_path))
+        listener.listen()
+        listener.setblocking(False)
+        socket_path.chmod(0o666)
+
+        assert request({"command": "ping"}, socket_path, timeout=1) is None
+        with pytest.raises(BlockingIOError):
+            listener.accept()
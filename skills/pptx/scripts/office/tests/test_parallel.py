@@ -0,0 +1,89 @@
+"""Work split across worker processes gives the same results as serial runs."""
+
+import zipfile
+
+import pytest
+
+from helpers.normalize import normalize_directory
+from helpers.synthetic import make_docx
+from validators.docx import DOCXSchemaValidator
+from validators.repairs import Repair
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+class _BogusElementRepair(Repair):
+
+    name = "bogus_element"
+
+    def handles(self, elem):
+        return elem.tag == f"{{{W}}}bogus"
+
+    def element(self, part, elem):
+        elem.tag = f"{{{W}}}p"
+        return "w:bogus → w:p"
+
+
+class _RepairingValidator(DOCXSchemaValidator):
+
+    REPAIRS = [*DOCXSchemaValidator.REPAIRS, _BogusElementRepair]
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "document.docx"
+    make_docx(path, paragraphs=200, tracked_changes=20, comments=10)
+    return path
+
+
+def _files(directory):
+    return {
+        path.relative_to(directory).as_posix(): path.read_bytes()
+        for path in sorted(directory.rglob("*"))
+        if path.is_file()
+    }
+
+
+@pytest.fixture
+def packed(tmp_path):
+    # An element the schema does not allow, which only the repair fixes.
+    path = tmp_path / "bogus.docx"
+    make_docx(path, paragraphs=20, comments=1)
+    with zipfile.ZipFile(path) as zf:
+        parts = {info.filename: zf.read(info) for info in zf.infolist()}
+    parts["word/document.xml"] = parts["word/document.xml"].replace(
+        b"<w:body>", b"<w:body><w:bogus/>", 1
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+    return path
+
+
+def _xsd_check(path, jobs, repair=True):
+    validator = _RepairingValidator(path, jobs=jobs)
+    if repair:
+        assert validator.repair() >= 1
+    return validator.validate_against_xsd()
+
+
+def test_packed_xsd_check_sees_repairs_with_jobs(packed):
+    assert _xsd_check(packed, 1, repair=False) is False
+
+    assert _xsd_check(packed, 1) is True
+    assert _xsd_check(packed, 2) is True
+
+
+def test_parallel_normalize_matches_serial(document, tmp_path):
+    outputs = {}
+    counts = {}
+    for jobs in (1, 2):
+        directory = tmp_path / f"jobs{jobs}"
+        with zipfile.ZipFile(document) as zf:
+            zf.extractall(directory)
+        counts[jobs] = normalize_directory(directory, jobs=jobs)
+        outputs[jobs] = _files(directory)
+
+    assert counts[2] == counts[1]
+    assert counts[1] != (0, 0)
+    assert outputs[2] == outputs[1]
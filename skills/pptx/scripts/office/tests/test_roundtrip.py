@@ -0,0 +1,105 @@
+"""Unpack and pack a document, checking that escaped attributes survive."""
+
+import json
+import re
+import zipfile
+import zlib
+
+import pytest
+
+from helpers.synthetic import make_docx
+from helpers.unpack_manifest import UnpackManifest
+from pack import pack
+from unpack import unpack
+
+ESCAPED_ATTRIBUTE = re.compile(rb'(?:Target|w:tooltip)="[^"]*&[^"]*"')
+
+
+def _escaped_attributes(path):
+    with zipfile.ZipFile(path) as zf:
+        return {
+            name: ESCAPED_ATTRIBUTE.findall(zf.read(name))
+            for name in ("word/_rels/document.xml.rels", "word/document.xml")
+        }
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "link.docx"
+    make_docx(path, paragraphs=10, tracked_changes=2, comments=1)
+    return path
+
+
+def test_unpack_keeps_escaped_attributes(document, tmp_path):
+    unpacked = tmp_path / "unpacked"
+    _, message = unpack(str(document), str(unpacked))
+    assert not message.startswith("Error"), message
+
+    original = _escaped_attributes(document)
+    assert all(original.values())
+    for name, attributes in original.items():
+        assert ESCAPED_ATTRIBUTE.findall((unpacked / name).read_bytes()) == attributes
+
+
+def test_unpack_and_pack_keep_escaped_attributes(document, tmp_path):
+    unpacked = tmp_path / "unpacked"
+    packed = tmp_path / "packed.docx"
+    unpack(str(document), str(unpacked))
+    # A second round trip, from the packed file, must not change them either.
+    _, message = pack(str(unpacked), str(packed), validate=False)
+    assert not message.startswith("Error"), message
+    assert _escaped_attributes(packed) == _escaped_attributes(document)
+
+    unpacked_again = tmp_path / "unpacked-again"
+    packed_again = tmp_path / "packed-again.docx"
+    unpack(str(packed), str(unpacked_again))
+    pack(str(unpacked_again), str(packed_again), validate=False)
+    assert _escaped_attributes(packed_again) == _escaped_attributes(document)
+
+
+def test_pack_with_original_keeps_escaped_attributes(document, tmp_path):
+    unpacked = tmp_path / "unpacked"
+    packed = tmp_path / "packed.docx"
+    unpack(str(document), str(unpacked))
+    # Edited parts are condensed again; the rest are copied from the original.
+    edited = {"word/_rels/document.xml.rels", "word/document.xml"}
+    for name in edited:
+        part = unpacked / name
+        part.write_bytes(part.read_bytes().replace(b"?>", b"?>\n", 1))
+    body = unpacked / "word/document.xml"
+    body.write_bytes(body.read_bytes().replace(b"<w:t>", b"<w:t>Edited ", 1))
+
+    _, message = pack(str(unpacked), str(packed), original_file=str(document), validate=False)
+    assert not message.startswith("Error"), message
+    assert _escaped_attributes(packed) == _escaped_attributes(document)
+
+    with zipfile.ZipFile(document) as original, zipfile.ZipFile(packed) as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == sorted(original.namelist())
+        for info in zf.infolist():
+            source = original.getinfo(info.filename)
+            if info.filename not in edited:
+                assert (info.CRC, info.compress_size) == (source.CRC, source.compress_size)
+                assert zf.read(info.filename) == original.read(info.filename)
+        assert b"<w:t>Edited " in zf.read("word/document.xml")
+
+
+def test_pack_with_original_keeps_edit_with_colliding_crc(document, tmp_path):
+    unpacked = tmp_path / "unpacked"
+    packed = tmp_path / "packed.docx"
+    unpack(str(document), str(unpacked))
+    body = unpacked / "word/document.xml"
+    body.write_bytes(body.read_bytes().replace(b"<w:t>", b"<w:t>Edited ", 1))
+
+    # Make the recorded CRC-32 and size those of the edited part, as if the
+    # edit collided with the part unpack wrote; only its SHA-256 differs.
+    manifest = UnpackManifest.load(unpacked)
+    data = body.read_bytes()
+    manifest.parts["word/document.xml"]["file"][:2] = [zlib.crc32(data), len(data)]
+    manifest.save()
+    assert json.loads(manifest.path.read_text())["parts"]["word/document.xml"]["file"][2]
+
+    _, message = pack(str(unpacked), str(packed), original_file=str(document), validate=False)
+    assert not message.startswith("Error"), message
+    with zipfile.ZipFile(packed) as zf:
+        assert b"<w:t>Edited " in zf.read("word/document.xml")
@@ -0,0 +1,90 @@
+"""The rule engine walks each part once and replays unchanged parts."""
+
+import pytest
+
+from validators.manifest import ValidationManifest
+from validators.package import ParsedPackage
+from validators.rules import Rule, RuleEngine
+
+PARTS = {
+    "a.xml": b'<root><item id="1"/><item id="2" bad="x"/></root>',
+    "b.xml": b'<root><other bad="y"/></root>',
+    "_rels/.rels": b'<root><item id="3"/></root>',
+}
+
+
+class _ItemRule(Rule):
+
+    name = "items"
+
+    START_TAGS = frozenset({"item"})
+
+    def start(self, elem):
+        self.errors.append((self.file, elem.sourceline, f"item {elem.get('id')}"))
+
+
+class _BadAttributeRule(Rule):
+
+    name = "bad_attributes"
+
+    ATTRIBUTES = frozenset({"bad"})
+
+    def attribute(self, elem, name, value):
+        self.errors.append((self.file, elem.sourceline, f"{elem.tag} {name}={value}"))
+
+
+@pytest.fixture
+def package(tmp_path):
+    for name, data in PARTS.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return tmp_path
+
+
+def _run(root, manifest=None):
+    package = ParsedPackage(root)
+    rules = [_ItemRule(None), _BadAttributeRule(None)]
+    engine = RuleEngine(package, rules, manifest)
+    engine.run()
+    findings = {rule.name: sorted(tuple(error) for error in rule.errors) for rule in rules}
+    return package, engine, findings
+
+
+def test_rules_share_one_traversal(package):
+    parsed, engine, findings = _run(package)
+
+    assert engine.parts_visited == len(PARTS)
+    assert parsed.parse_count == len(PARTS)
+    assert findings == {
+        "items": [
+            ("_rels/.rels", 1, "item 3"),
+            ("a.xml", 1, "item 1"),
+            ("a.xml", 1, "item 2"),
+        ],
+        "bad_attributes": [("a.xml", 1, "item bad=x"), ("b.xml", 1, "other bad=y")],
+    }
+
+
+def test_manifest_replays_unchanged_parts(package):
+    manifest = ValidationManifest(package)
+    _, _, first = _run(package, manifest)
+    manifest.save()
+
+    parsed, engine, replayed = _run(package, ValidationManifest(package))
+
+    assert engine.parts_replayed == len(PARTS)
+    assert engine.parts_visited == 0
+    assert parsed.parse_count == 0
+    assert replayed == first
+
+    (package / "a.xml").write_bytes(b'<root><item id="4"/></root>')
+    parsed, engine, edited = _run(package, ValidationManifest(package))
+
+    assert engine.parts_replayed == len(PARTS) - 1
+    assert engine.parts_visited == 1
+    assert parsed.parse_count == 1
+    assert edited == {
+        "items": [("_rels/.rels", 1, "item 3"), ("a.xml", 1, "item 4")],
+        "bad_attributes": [("b.xml", 1, "other bad=y")],
+    }
@@ -0,0 +1,96 @@
+"""
+Run a resident validation server that keeps the XSD schemas compiled between runs.
+
+Usage:
+    python validation_server.py [--socket PATH | --stdio] [--idle-timeout SECONDS]
+    python validation_server.py --stop
+
+While the server is listening on the default socket, pack.py sends its
+validation to the server instead of validating in process. Requests and
+replies are JSON objects, one per line:
+
+    {"id": 1, "command": "validate", "path": "unpacked/", "original": "input.docx", "auto_repair": true}
+
+Commands: validate, repair, ping, shutdown. The server exits after
+--idle-timeout seconds without a request (default: 1800, 0 disables).
+
+Examples:
+    python validation_server.py &
+    python validation_server.py --stdio < requests.jsonl
+"""
+
+import argparse
+import sys
+
+from validators.server import (
+    DEFAULT_IDLE_TIMEOUT,
+    ValidationServer,
+    default_socket_path,
+    preload_schemas,
+    request,
+    serve_stdio,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident Office document validation server")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--socket",
+        default=None,
+        metavar="PATH",
+        help="Unix socket to listen on (default: a per-version path in a private per-user directory)",
+    )
+    mode.add_argument(
+        "--stdio",
+        action="store_true",
+        help="Read requests from stdin and write replies to stdout instead of a socket",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        metavar="SECONDS",
+        help=f"Exit after this many seconds without a request (default: {DEFAULT_IDLE_TIMEOUT}, 0 disables)",
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="Stop the server listening on the socket and exit",
+    )
+    args = parser.parse_args()
+
+    socket_path = args.socket or default_socket_path()
+    if socket_path is None and not args.stdio:
+        print(
+            "Error: no private per-user directory for the socket in the temp directory; use --socket",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    if args.stop:
+        reply = request({"command": "shutdown"}, socket_path, timeout=5)
+        if reply is None:
+            print(f"No validation server is listening on {socket_path}")
+            sys.exit(1)
+        print(f"Stopped validation server on {socket_path}")
+        return
+
+    if args.stdio:
+        preload_schemas()
+        serve_stdio()
+        return
+
+    try:
+        server = ValidationServer(socket_path, idle_timeout=args.idle_timeout)
+    except (RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    loaded = preload_schemas()
+    print(f"Validation server listening on {socket_path} ({loaded} schemas loaded)", flush=True)
+    server.serve()
+
+
+if __name__ == "__main__":
+    main()
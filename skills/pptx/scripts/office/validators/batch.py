@@ -0,0 +1,165 @@
+"""
+Batch validation of document corpora.
+
+Documents are found from files, directories (searched recursively) and glob
+patterns, then validated concurrently by a pool of worker processes. The
+schemas are compiled once before the pool starts; where processes are
+forked the workers inherit them instead of compiling their own copy.
+
+Each document yields one result as soon as it finishes, and a
+BatchSummary collects pass/fail counts, the most frequent failing rules
+and the slowest documents.
+"""
+
+import glob
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .server import handle_request, preload_schemas
+
+DOCUMENT_SUFFIXES = {".docx", ".pptx", ".xlsx"}
+
+
+def find_documents(sources, suffixes=DOCUMENT_SUFFIXES):
+    found = {}
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            candidates = sorted(path.rglob("*"))
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = [Path(match) for match in sorted(glob.glob(source, recursive=True))]
+
+        for candidate in candidates:
+            # Office writes "~$name.docx" lock files next to open documents.
+            if (
+                candidate.suffix.lower() in suffixes
+                and candidate.is_file()
+                and not candidate.name.startswith("~$")
+            ):
+                found.setdefault(candidate.resolve(), candidate)
+    return list(found.values())
+
+
+def validate_document(path, original=None, author="Claude"):
+    started = time.perf_counter()
+    reply = handle_request(
+        {
+            "command": "validate",
+            "path": str(path),
+            "original": str(original) if original else None,
+            "author": author,
+            "manifest": False,
+        }
+    )
+    result = {
+        "type": "file",
+        "path": str(path),
+        "valid": reply.get("valid", False),
+        "wall_time": round(time.perf_counter() - started, 6),
+    }
+
+    if not reply["ok"]:
+        result["error"] = reply["error"]
+        result["rules"] = []
+        result["findings"] = []
+        return result
+
+    checks = reply["report"]["checks"]
+    result["rules"] = sorted(
+        {
+            check["check"].removeprefix("validate_")
+            for check in checks
+            if check["kind"] == "check" and not check["ok"]
+        }
+    )
+    result["findings"] = [finding for check in checks for finding in check["findings"]]
+    return result
+
+
+def validate_documents(paths, workers=None, original=None, author="Claude"):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            yield validate_document(path, original, author)
+        return
+
+    preload_schemas()
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer = None
+    else:
+        context = None
+        initializer = preload_schemas
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(paths)),
+        mp_context=context,
+        initializer=initializer,
+    ) as executor:
+        futures = {
+            executor.submit(validate_document, path, original, author): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {
+                    "type": "file",
+                    "path": str(futures[future]),
+                    "valid": False,
+                    "wall_time": None,
+                    "error": f"{type(e).__name__}: {e}",
+                    "rules": [],
+                    "findings": [],
+                }
+
+
+class BatchSummary:
+
+    def __init__(self, top=10):
+        self.top = top
+        self.results = []
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        self.results.append(
+            {
+                "path": result["path"],
+                "valid": result["valid"],
+                "error": "error" in result,
+                "wall_time": result["wall_time"],
+                "rules": result["rules"],
+            }
+        )
+
+    @property
+    def failed(self):
+        return sum(1 for result in self.results if not result["valid"])
+
+    def to_dict(self):
+        rules = Counter(rule for result in self.results for rule in result["rules"])
+        timed = [result for result in self.results if result["wall_time"] is not None]
+        slowest = sorted(timed, key=lambda result: result["wall_time"], reverse=True)
+
+        return {
+            "type": "summary",
+            "files": len(self.results),
+            "passed": len(self.results) - self.failed,
+            "failed": self.failed,
+            "errors": sum(1 for result in self.results if result["error"]),
+            "wall_time": round(time.perf_counter() - self.started, 6),
+            "top_failing_rules": [
+                {"rule": rule, "files": count} for rule, count in rules.most_common(self.top)
+            ],
+            "slowest_files": [
+                {"path": result["path"], "wall_time": result["wall_time"]}
+                for result in slowest[: self.top]
+            ],
+        }
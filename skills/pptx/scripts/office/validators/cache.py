@@ -0,0 +1,46 @@
+"""
+Per-user directory for the files validators keep between runs.
+
+The schema bundle, the baseline indexes of original files and the server
+socket live in one directory under the temp directory. It is created
+readable and writable by the current user only, and it is only used while
+it still belongs to that user and no one else can write to it, so another
+user cannot plant a file there for the validators to trust. When the
+directory fails these checks, for example because another user created it
+first, callers work without it.
+"""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+
+def cache_dir():
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    path = Path(tempfile.gettempdir()) / f"ooxml_validators_{uid}"
+    try:
+        path.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+    if not is_private(path, directory=True):
+        return None
+    return path
+
+
+def is_private(path, directory=False):
+    # True if `path` is not a symlink, belongs to the current user and cannot
+    # be written by anyone else; a directory must not be readable by others
+    # either. Windows has no st_uid, and its temp directory is per-user.
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if stat.S_ISLNK(st.st_mode) or stat.S_ISDIR(st.st_mode) != directory:
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    forbidden = 0o077 if directory else 0o022
+    return st.st_uid == os.getuid() and not st.st_mode & forbidden
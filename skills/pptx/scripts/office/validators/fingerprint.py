@@ -0,0 +1,135 @@
+"""
+Structural fingerprint of the story parts of an Office package.
+
+For each story part (document body, headers, footers, notes, comments,
+slides, worksheets) the fingerprint counts the structural elements of
+interest, such as paragraphs, tables, runs, images, shapes, rows and cells.
+Tags are counted by a parser target that builds no tree, so fingerprinting
+a part, or a packed original, never loads it in full.
+"""
+
+import fnmatch
+
+from .package import ParsedPackage
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+V = "urn:schemas-microsoft-com:vml"
+S = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+DOCX_STORY_PATTERNS = [
+    "word/document.xml",
+    "word/header*.xml",
+    "word/footer*.xml",
+    "word/footnotes.xml",
+    "word/endnotes.xml",
+    "word/comments.xml",
+]
+
+# Runs and tracked changes are not counted: unpack merges adjacent runs and
+# adjacent insertions and deletions, so their counts in an unedited part
+# already differ from the original's.
+DOCX_FEATURES = {
+    "paragraphs": [f"{{{W}}}p"],
+    "tables": [f"{{{W}}}tbl"],
+    "images": [f"{{{A}}}blip", f"{{{V}}}imagedata"],
+    "comments": [f"{{{W}}}comment", f"{{{W}}}commentReference"],
+    "sections": [f"{{{W}}}sectPr"],
+}
+
+PPTX_STORY_PATTERNS = [
+    "ppt/slides/*.xml",
+    "ppt/notesSlides/*.xml",
+    "ppt/comments/*.xml",
+]
+
+PPTX_FEATURES = {
+    "shapes": [f"{{{P}}}sp"],
+    "pictures": [f"{{{P}}}pic"],
+    "tables": [f"{{{A}}}tbl"],
+    "paragraphs": [f"{{{A}}}p"],
+    "runs": [f"{{{A}}}r"],
+    "comments": [f"{{{P}}}cm"],
+}
+
+XLSX_STORY_PATTERNS = [
+    "xl/worksheets/*.xml",
+    "xl/sharedStrings.xml",
+]
+
+XLSX_FEATURES = {
+    "rows": [f"{{{S}}}row"],
+    "cells": [f"{{{S}}}c"],
+    "formulas": [f"{{{S}}}f"],
+    "merged_cells": [f"{{{S}}}mergeCell"],
+    "hyperlinks": [f"{{{S}}}hyperlink"],
+    "strings": [f"{{{S}}}si"],
+}
+
+
+class StructuralFingerprint:
+
+    def __init__(self, features):
+        self.features = features
+        self.parts = {}
+
+    @classmethod
+    def of(cls, package, patterns, features):
+        fingerprint = cls(features)
+        for pattern in patterns:
+            for part in sorted(package.glob(pattern)):
+                tag_counts = package.tag_counts(part)
+                counts = {
+                    feature: sum(tag_counts[tag] for tag in tags)
+                    for feature, tags in features.items()
+                }
+                name = part.relative_to(package.root_dir).as_posix()
+                fingerprint.parts[name] = counts
+        return fingerprint
+
+    @classmethod
+    def of_file(cls, path, patterns, features):
+        package = ParsedPackage(path)
+        try:
+            return cls.of(package, patterns, features)
+        finally:
+            package.close()
+
+    def total(self, pattern, feature=None):
+        parts = [
+            counts for name, counts in self.parts.items() if fnmatch.fnmatch(name, pattern)
+        ]
+        if feature is None:
+            return len(parts)
+        return sum(counts[feature] for counts in parts)
+
+    def diff(self, original):
+        lines = []
+        names = list(original.parts)
+        names += [name for name in self.parts if name not in original.parts]
+
+        for name in names:
+            old = original.parts.get(name)
+            new = self.parts.get(name)
+            if old is None:
+                lines.append(f"  {name}: added ({self._summary(new)})")
+            elif new is None:
+                lines.append(f"  {name}: removed ({self._summary(old)})")
+            elif old != new:
+                changes = [
+                    f"{feature} {old[feature]} → {new[feature]} ({signed(new[feature] - old[feature])})"
+                    for feature in self.features
+                    if old[feature] != new[feature]
+                ]
+                lines.append(f"  {name}: {', '.join(changes)}")
+        return lines
+
+    def _summary(self, counts):
+        return ", ".join(
+            f"{feature} {count}" for feature, count in counts.items() if count
+        ) or "empty"
+
+
+def signed(value):
+    return f"+{value}" if value > 0 else str(value)
@@ -0,0 +1,184 @@
+"""
+Relationship graph of an Office package built from its .rels parts.
+
+Each .rels part is parsed once, when first queried. Queries that need the
+whole package (reverse edges, orphans, reachability) index every .rels part
+in one pass. Targets are resolved the way the package validators resolve
+them: absolute targets from the package root, relative ones from the folder
+of the source part. Targets starting with http or mailto: are external.
+"""
+
+import os
+from collections import deque
+from pathlib import Path
+
+from .package import ParsedPackage
+
+PACKAGE_RELATIONSHIPS_NAMESPACE = (
+    "http://schemas.openxmlformats.org/package/2006/relationships"
+)
+
+EXTERNAL_PREFIXES = ("http", "mailto:")
+
+
+class Relationship:
+
+    def __init__(self, source, rels_part, elem, target_part):
+        self.source = source
+        self.rels_part = rels_part
+        self.id = elem.get("Id")
+        self.type = elem.get("Type", "")
+        self.target = elem.get("Target")
+        self.target_mode = elem.get("TargetMode")
+        self.sourceline = elem.sourceline
+        self.target_part = target_part
+
+    @property
+    def type_name(self):
+        return self.type.split("/")[-1]
+
+
+class PackageGraph:
+
+    def __init__(self, package):
+        self.package = package
+        self.root_dir = package.root_dir
+
+        self._relationships = {}
+        self._errors = {}
+        self._incoming = None
+
+    @classmethod
+    def for_directory(cls, root_dir):
+        return cls(ParsedPackage(root_dir))
+
+    @staticmethod
+    def rels_part_for(part):
+        part = Path(part)
+        return part.parent / "_rels" / f"{part.name}.rels"
+
+    @staticmethod
+    def source_of(rels_part):
+        rels_part = Path(rels_part)
+        return rels_part.parent.parent / rels_part.name[: -len(".rels")]
+
+    def resolve(self, rels_part, target):
+        if not target or target.startswith(EXTERNAL_PREFIXES):
+            return None
+
+        if target.startswith("/"):
+            path = self.root_dir / target.lstrip("/")
+        elif rels_part.name == ".rels":
+            path = self.root_dir / target
+        else:
+            path = rels_part.parent.parent / target
+        return Path(os.path.normpath(path))
+
+    def relationships_in(self, rels_part):
+        rels_part = Path(rels_part)
+        if rels_part in self._errors:
+            raise self._errors[rels_part]
+
+        relationships = self._relationships.get(rels_part)
+        if relationships is None:
+            relationships = self._load(rels_part)
+        return relationships
+
+    def relationships_of(self, part):
+        rels_part = self.rels_part_for(part)
+        if not self.package.exists(rels_part):
+            return []
+        return self.relationships_in(rels_part)
+
+    def targets(self, part):
+        return [
+            rel.target_part
+            for rel in self.relationships_of(part)
+            if rel.target_part is not None
+        ]
+
+    def incoming(self, part):
+        self._index()
+        return self._incoming.get(Path(part), [])
+
+    def is_referenced(self, part):
+        return bool(self.incoming(part))
+
+    def orphans(self, parts):
+        self._index()
+        return [part for part in parts if not self._incoming.get(Path(part))]
+
+    def reachable(self, start=None):
+        start = self.root_dir if start is None else Path(start)
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            part = queue.popleft()
+            try:
+                targets = self.targets(part)
+            except Exception:
+                continue
+            for target in targets:
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        return seen
+
+    def discard(self, rels_part):
+        rels_part = Path(rels_part)
+        self._errors.pop(rels_part, None)
+        relationships = self._relationships.pop(rels_part, None)
+        self.package.invalidate(rels_part)
+        if self._incoming is not None and relationships:
+            for rel in relationships:
+                incoming = self._incoming.get(rel.target_part)
+                if incoming is not None and rel in incoming:
+                    incoming.remove(rel)
+
+    def reload(self, rels_part):
+        self.discard(rels_part)
+        if self.package.exists(rels_part):
+            try:
+                self.relationships_in(rels_part)
+            except Exception:
+                pass
+
+    def _load(self, rels_part):
+        try:
+            root = self.package.root(rels_part)
+        except Exception as e:
+            self._errors[rels_part] = e
+            raise
+
+        source = self.source_of(rels_part)
+        relationships = [
+            Relationship(
+                source, rels_part, elem, self.resolve(rels_part, elem.get("Target"))
+            )
+            for elem in root.iter(f"{{{PACKAGE_RELATIONSHIPS_NAMESPACE}}}Relationship")
+        ]
+        self._relationships[rels_part] = relationships
+
+        if self._incoming is not None:
+            self._add_incoming(relationships)
+        return relationships
+
+    def _index(self):
+        if self._incoming is not None:
+            return
+
+        for rels_part in self.package.parts:
+            if rels_part.name.endswith(".rels"):
+                try:
+                    self.relationships_in(rels_part)
+                except Exception:
+                    pass
+
+        self._incoming = {}
+        for relationships in self._relationships.values():
+            self._add_incoming(relationships)
+
+    def _add_incoming(self, relationships):
+        for rel in relationships:
+            if rel.target_part is not None:
+                self._incoming.setdefault(rel.target_part, []).append(rel)
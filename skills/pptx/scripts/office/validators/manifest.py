@@ -0,0 +1,212 @@
+"""
+Content-hash manifest of an unpacked Office package for incremental validation.
+
+The manifest lives in the unpacked directory and records a hash of every
+part together with the per-part results of each check at that hash. Checks
+that span several parts are cached under a digest of the inputs they read.
+On the next run only changed parts, and the cross-part checks whose inputs
+changed, are validated again; everything else is replayed from the manifest.
+The whole manifest is discarded when the original file, the schemas or the
+validator code change.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from .xsd import code_version, schemas_version
+
+MANIFEST_NAME = ".validation_manifest.json"
+
+# Written by unpack.py (see helpers/unpack_manifest.py).
+UNPACK_MANIFEST_NAME = ".unpack_manifest.json"
+
+# Files kept in an unpacked directory that are not parts of the package.
+LOCAL_FILES = {MANIFEST_NAME, UNPACK_MANIFEST_NAME}
+
+MANIFEST_VERSION = 2
+
+# Files modified this close to the last save may share its mtime tick, so
+# their stat data alone cannot prove they are unchanged.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class ValidationManifest:
+
+    def __init__(self, root_dir, config=None):
+        self.root_dir = Path(root_dir).resolve()
+        self.path = self.root_dir / MANIFEST_NAME
+        self.config = config or {}
+
+        self.parts = {}
+        self.checks = {}
+        self._saved_at = 0
+        self._hashes = {}
+        self._dirty = False
+        self._load()
+
+    @classmethod
+    def for_package(cls, unpacked_dir, original_file=None):
+        return cls(
+            unpacked_dir,
+            {
+                "original": file_identity(original_file),
+                "schemas": schemas_version(),
+                "code": code_version(),
+            },
+        )
+
+    def part_hash(self, path):
+        name = self._name(path)
+        if name in self._hashes:
+            return self._hashes[name]
+
+        stat = Path(path).stat()
+        entry = self.parts.get(name)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime"] == stat.st_mtime_ns
+            and stat.st_mtime_ns < self._saved_at - RACY_WINDOW_NS
+        ):
+            digest = entry["hash"]
+        else:
+            content = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    content.update(chunk)
+            digest = content.hexdigest()
+            if entry is None or entry["hash"] != digest:
+                entry = self.parts[name] = {"hash": digest, "results": {}}
+            entry["size"] = stat.st_size
+            entry["mtime"] = stat.st_mtime_ns
+            self._dirty = True
+
+        self._hashes[name] = digest
+        return digest
+
+    def get(self, path, key):
+        self.part_hash(path)
+        return self.parts[self._name(path)]["results"].get(key)
+
+    def put(self, path, key, value):
+        self.part_hash(path)
+        self.parts[self._name(path)]["results"][key] = value
+        self._dirty = True
+
+    def invalidate(self, path):
+        self._hashes.pop(self._name(path), None)
+
+    def digest(self, inputs):
+        digest = hashlib.sha256()
+        for item in inputs:
+            if isinstance(item, Path):
+                content = self.part_hash(item) if item.is_file() else "missing"
+                digest.update(f"{self._name(item)}={content}\n".encode())
+            else:
+                digest.update(f"{item}\n".encode())
+        return digest.hexdigest()
+
+    def cached_check(self, name, inputs, run, report=None):
+        # With a report, the findings the check added are cached with its
+        # output and added again on replay; an entry cached without them is
+        # run again.
+        key = self.digest(inputs)
+        entry = self.checks.get(name)
+        if (
+            entry is not None
+            and entry["inputs"] == key
+            and (report is None or entry.get("findings") is not None)
+        ):
+            print(entry["output"], end="")
+            if report is not None:
+                for finding in entry["findings"]:
+                    report.add_finding(**finding)
+            return entry["ok"]
+
+        findings = report.current.findings if report is not None else None
+        start = len(findings) if findings is not None else 0
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                ok = run()
+        finally:
+            print(buffer.getvalue(), end="")
+
+        entry = self.checks[name] = {"inputs": key, "ok": ok, "output": buffer.getvalue()}
+        if findings is not None:
+            entry["findings"] = [
+                {
+                    "message": finding.message,
+                    "file": finding.file,
+                    "line": finding.line,
+                    "severity": finding.severity,
+                    "details": finding.details,
+                }
+                for finding in findings[start:]
+            ]
+        self._dirty = True
+        return ok
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        self.parts = {
+            name: entry
+            for name, entry in self.parts.items()
+            if (self.root_dir / name).is_file()
+        }
+        data = {
+            "version": MANIFEST_VERSION,
+            "config": self.config,
+            "saved_at": time.time_ns(),
+            "parts": self.parts,
+            "checks": self.checks,
+        }
+
+        try:
+            fd, temp_name = tempfile.mkstemp(dir=self.root_dir, suffix=".json")
+        except OSError:
+            return
+
+        # The temp file is in the package, so it must not outlive any failure,
+        # or it would be packed and reported as an unreferenced part.
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_name, self.path)
+            self._dirty = False
+        except OSError:
+            pass
+        finally:
+            Path(temp_name).unlink(missing_ok=True)
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") != MANIFEST_VERSION or data.get("config") != self.config:
+            return
+
+        self.parts = data.get("parts", {})
+        self.checks = data.get("checks", {})
+        self._saved_at = data.get("saved_at", 0)
+
+    def _name(self, path):
+        return Path(path).resolve().relative_to(self.root_dir).as_posix()
+
+
+def file_identity(path):
+    if path is None:
+        return None
+    path = Path(path).resolve()
+    stat = path.stat()
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
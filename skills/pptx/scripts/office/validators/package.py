@@ -0,0 +1,318 @@
+"""
+Parsed view of an Office package shared by all validator checks.
+
+The package is backed either by an unpacked directory or directly by a
+packed .docx/.pptx/.xlsx file, whose members are read as streams without
+extracting them. Parts are addressed by their path under the package root
+(for a packed file, the path of the file itself).
+
+Every XML part is parsed at most once and the tree is handed to each check.
+Trees are shared and must be treated as read-only; checks that need to
+mutate a tree ask for a copy. Cached trees are evicted least-recently-used
+once their estimated size exceeds the memory budget. Parts too large for the
+budget can instead be streamed, with finished elements cleared as they go.
+"""
+
+import copy
+import fnmatch
+import io
+import zipfile
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+import lxml.etree
+
+from .manifest import LOCAL_FILES
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+PARSED_SIZE_FACTOR = 8
+
+
+class DirectoryStore:
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def parts(self, patterns):
+        return [f for pattern in patterns for f in self.root_dir.rglob(pattern)]
+
+    def files(self):
+        return [
+            f
+            for f in self.root_dir.rglob("*")
+            if f.is_file() and f.name not in LOCAL_FILES
+        ]
+
+    def glob(self, pattern):
+        return list(self.root_dir.glob(pattern))
+
+    def exists(self, path):
+        return Path(path).is_file()
+
+    def open(self, path):
+        return open(path, "rb")
+
+    def size(self, path):
+        return Path(path).stat().st_size
+
+    def write_bytes(self, path, data):
+        Path(path).write_bytes(data)
+
+    def written(self):
+        # Writes go straight to disk, where other processes see them.
+        return {}
+
+    def close(self):
+        pass
+
+
+class ZipStore:
+
+    def __init__(self, zip_path):
+        self.root_dir = zip_path
+        self._zip = None
+        self._members = None
+        # Repairs of a packed file are kept in memory; the file is never rewritten.
+        self._written = {}
+
+    @property
+    def members(self):
+        if self._members is None:
+            self._zip = zipfile.ZipFile(self.root_dir, "r")
+            self._members = {
+                self.root_dir / info.filename: info
+                for info in self._zip.infolist()
+                if not info.is_dir()
+            }
+        return self._members
+
+    def parts(self, patterns):
+        return [
+            member
+            for pattern in patterns
+            for member in self.members
+            if fnmatch.fnmatch(member.name, pattern)
+        ]
+
+    def files(self):
+        return list(self.members)
+
+    def glob(self, pattern):
+        segments = pattern.split("/")
+        matches = []
+        for member in self.members:
+            parts = member.relative_to(self.root_dir).parts
+            if len(parts) == len(segments) and all(
+                fnmatch.fnmatch(part, segment) for part, segment in zip(parts, segments)
+            ):
+                matches.append(member)
+        return matches
+
+    def exists(self, path):
+        return Path(path) in self.members
+
+    def open(self, path):
+        path = Path(path)
+        if path in self._written:
+            return io.BytesIO(self._written[path])
+        info = self.members[path]
+        return self._zip.open(info)
+
+    def size(self, path):
+        path = Path(path)
+        if path in self._written:
+            return len(self._written[path])
+        return self.members[path].file_size
+
+    def write_bytes(self, path, data):
+        self._written[Path(path)] = data
+
+    def written(self):
+        # Parts repaired in memory, which other processes opening the same
+        # file do not see.
+        return dict(self._written)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            self._members = None
+
+
+class ParsedPackage:
+
+    PART_PATTERNS = ["*.xml", "*.rels"]
+
+    def __init__(self, root_dir, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.root_dir = Path(root_dir)
+        self.memory_budget = memory_budget
+
+        if self.root_dir.is_file():
+            self.store = ZipStore(self.root_dir)
+        else:
+            self.store = DirectoryStore(self.root_dir)
+
+        self.parts = self.store.parts(self.PART_PATTERNS)
+
+        self._files = None
+        self._trees = OrderedDict()
+        self._failures = {}
+        self._memory_used = 0
+        self.parse_count = 0
+
+    @property
+    def is_packed(self):
+        return isinstance(self.store, ZipStore)
+
+    def tree(self, part):
+        part = Path(part)
+
+        if part in self._failures:
+            raise self._failures[part]
+
+        cached = self._trees.get(part)
+        if cached is not None:
+            self._trees.move_to_end(part)
+            return cached[0]
+
+        try:
+            with self.store.open(part) as f:
+                tree = lxml.etree.parse(f)
+        except lxml.etree.XMLSyntaxError as e:
+            self._failures[part] = e
+            raise
+        self.parse_count += 1
+
+        cost = self.store.size(part) * PARSED_SIZE_FACTOR
+        if cost <= self.memory_budget:
+            self._trees[part] = (tree, cost)
+            self._memory_used += cost
+            self._evict()
+
+        return tree
+
+    def root(self, part):
+        return self.tree(part).getroot()
+
+    def streams(self, part):
+        part = Path(part)
+        if part in self._trees:
+            return False
+        return self.store.size(part) * PARSED_SIZE_FACTOR > self.memory_budget
+
+    def iterparse(self, part, events=("start", "end"), tag=None):
+        part = Path(part)
+        if part in self._failures:
+            raise self._failures[part]
+
+        with self.store.open(part) as f:
+            try:
+                for event, elem in lxml.etree.iterparse(f, events=events, tag=tag):
+                    yield event, elem
+                    if event == "end":
+                        # Keep only the open ancestors and their last children.
+                        elem.clear(keep_tail=True)
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
+            except lxml.etree.XMLSyntaxError as e:
+                self._failures[part] = e
+                raise
+
+    def tag_counts(self, part):
+        # A parser target counts start tags without building any tree.
+        parser = lxml.etree.XMLParser(target=_TagCounter())
+        with self.store.open(part) as f:
+            return lxml.etree.parse(f, parser)
+
+    def check_well_formed(self, part):
+        if not self.streams(part):
+            self.tree(part)
+            return
+
+        # A parser target without callbacks checks the syntax without
+        # building elements at all.
+        part = Path(part)
+        if part in self._failures:
+            raise self._failures[part]
+        try:
+            with self.store.open(part) as f:
+                lxml.etree.parse(f, lxml.etree.XMLParser(target=_NullTarget()))
+        except lxml.etree.XMLSyntaxError as e:
+            self._failures[part] = e
+            raise
+
+    def root_tag(self, part):
+        part = Path(part)
+        cached = self._trees.get(part)
+        if cached is not None:
+            return cached[0].getroot().tag
+
+        # Only the start of the document is read to find the root element.
+        with self.store.open(part) as f:
+            for _, elem in lxml.etree.iterparse(f, events=("start",)):
+                return elem.tag
+
+    def files(self):
+        if self._files is None:
+            self._files = self.store.files()
+        return self._files
+
+    def glob(self, pattern):
+        return self.store.glob(pattern)
+
+    def exists(self, path):
+        return self.store.exists(path)
+
+    def open(self, path):
+        return self.store.open(path)
+
+    def read_bytes(self, path):
+        with self.store.open(path) as f:
+            return f.read()
+
+    def write_bytes(self, path, data):
+        self.store.write_bytes(path, data)
+        self.invalidate(path)
+
+    def copy(self, part):
+        return copy.deepcopy(self.tree(part))
+
+    def invalidate(self, part):
+        part = Path(part)
+        self._failures.pop(part, None)
+        cached = self._trees.pop(part, None)
+        if cached is not None:
+            self._memory_used -= cached[1]
+
+    def clear(self):
+        self._trees.clear()
+        self._failures.clear()
+        self._memory_used = 0
+
+    def close(self):
+        self.clear()
+        self.store.close()
+
+    def _evict(self):
+        while self._memory_used > self.memory_budget and len(self._trees) > 1:
+            _, (_, cost) = self._trees.popitem(last=False)
+            self._memory_used -= cost
+
+
+class _TagCounter:
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def start(self, tag, attrib):
+        self.counts[tag] += 1
+
+    def close(self):
+        return self.counts
+
+
+class _NullTarget:
+
+    def close(self):
+        return None
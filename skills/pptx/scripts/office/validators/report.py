@@ -0,0 +1,243 @@
+"""
+Structured validation report with per-check timings.
+
+Every check run through the report has its printed output captured and its
+wall time, CPU time and memory recorded. Checks add their findings, with the
+part and line they refer to, while they run. Rules evaluated together in one
+traversal of the package have their time moved from the traversal step to
+their own checks. The report can be exported as JSON or SARIF 2.1.0.
+"""
+
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+TOOL_NAME = "office-validate"
+
+
+def format_finding(message, file=None, line=None):
+    # The form findings are printed in below a FAILED line.
+    if file is None:
+        return f"  {message}"
+    if line is None:
+        return f"  {file}: {message}"
+    return f"  {file}: Line {line}: {message}"
+
+
+class Finding:
+
+    def __init__(self, rule_id, message, file=None, line=None, severity="error", details=None):
+        self.rule_id = rule_id
+        self.message = message
+        self.file = file
+        self.line = line
+        self.severity = severity
+        self.details = list(details or [])
+
+    def to_dict(self):
+        return {
+            "rule_id": self.rule_id,
+            "severity": self.severity,
+            "file": self.file,
+            "line": self.line,
+            "message": self.message,
+            "details": self.details,
+        }
+
+
+class CheckResult:
+
+    def __init__(self, validator, name, kind):
+        self.validator = validator
+        self.name = name
+        self.kind = kind
+        self.result = None
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = None
+        self.max_rss = None
+        self.output = ""
+        self.findings = []
+        # Time moved here from an earlier step (see ValidationReport.charge).
+        self.charged_wall_time = 0.0
+        self.charged_cpu_time = 0.0
+
+    @property
+    def rule_id(self):
+        return self.name.removeprefix("validate_")
+
+    @property
+    def ok(self):
+        if self.kind == "check":
+            return bool(self.result)
+        return True
+
+    def to_dict(self):
+        return {
+            "validator": self.validator,
+            "check": self.name,
+            "kind": self.kind,
+            "ok": self.ok,
+            "result": self.result if self.kind == "repair" else None,
+            "wall_time": round(self.wall_time, 6),
+            "cpu_time": round(self.cpu_time, 6),
+            "peak_memory": self.peak_memory,
+            "max_rss": self.max_rss,
+            "findings": [finding.to_dict() for finding in self.findings],
+            "output": self.output,
+        }
+
+
+class ValidationReport:
+
+    def __init__(self, echo=True, trace_memory=False):
+        self.echo = echo
+        self.trace_memory = trace_memory
+        self.checks = []
+        self._current = None
+
+    @property
+    def findings(self):
+        return [finding for check in self.checks for finding in check.findings]
+
+    @property
+    def valid(self):
+        return all(check.ok for check in self.checks)
+
+    @property
+    def current(self):
+        return self._current
+
+    def run(self, validator, name, func, kind="check"):
+        check = CheckResult(validator, name, kind)
+        self.checks.append(check)
+        self._current = check
+
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+
+        buffer = io.StringIO()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                check.result = func()
+        finally:
+            check.wall_time = time.perf_counter() - started + check.charged_wall_time
+            check.cpu_time = time.process_time() - cpu_started + check.charged_cpu_time
+            if self.trace_memory:
+                check.peak_memory = tracemalloc.get_traced_memory()[1]
+                if tracing:
+                    tracemalloc.stop()
+            if resource is not None:
+                check.max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            check.output = buffer.getvalue()
+            self._current = None
+            if self.echo:
+                print(check.output, end="")
+
+        if kind == "check" and not check.ok and not check.findings:
+            # Every failed check has at least one finding.
+            check.findings.append(Finding(check.rule_id, f"{check.name} failed"))
+        return check.result
+
+    def add_finding(self, message, file=None, line=None, severity="error", details=None):
+        check = self._current
+        finding = Finding(
+            check.rule_id, message, file=file, line=line, severity=severity, details=details
+        )
+        check.findings.append(finding)
+        return finding
+
+    def charge(self, seconds, source):
+        # Moves `seconds` of the wall time of the step `source`, run earlier by
+        # the same validator, to the running check, with the same share of the
+        # step's CPU time.
+        check = self._current
+        for step in reversed(self.checks):
+            if step.name == source and step.validator == check.validator:
+                break
+        else:
+            return
+        moved = min(seconds, step.wall_time)
+        if moved <= 0:
+            return
+        cpu = step.cpu_time * moved / step.wall_time
+        step.wall_time -= moved
+        step.cpu_time -= cpu
+        check.charged_wall_time += moved
+        check.charged_cpu_time += cpu
+
+    def to_json(self):
+        return {
+            "valid": self.valid,
+            "wall_time": round(sum(check.wall_time for check in self.checks), 6),
+            "checks": [check.to_dict() for check in self.checks],
+        }
+
+    def to_sarif(self):
+        rule_ids = sorted({check.rule_id for check in self.checks if check.kind == "check"})
+        results = []
+        for finding in self.findings:
+            result = {
+                "ruleId": finding.rule_id,
+                "level": finding.severity,
+                "message": {"text": "\n".join([finding.message, *finding.details])},
+            }
+            if finding.file:
+                location = {"artifactLocation": {"uri": finding.file}}
+                if finding.line is not None:
+                    location["region"] = {"startLine": finding.line}
+                result["locations"] = [{"physicalLocation": location}]
+            results.append(result)
+
+        return {
+            "version": "2.1.0",
+            "$schema": SARIF_SCHEMA,
+            "runs": [
+                {
+                    "tool": {
+                        "driver": {
+                            "name": TOOL_NAME,
+                            "rules": [{"id": rule_id} for rule_id in rule_ids],
+                        }
+                    },
+                    "results": results,
+                    "invocations": [
+                        {
+                            "executionSuccessful": True,
+                            "properties": {
+                                "checks": [
+                                    {
+                                        "validator": check.validator,
+                                        "check": check.name,
+                                        "wall_time": round(check.wall_time, 6),
+                                        "cpu_time": round(check.cpu_time, 6),
+                                        "peak_memory": check.peak_memory,
+                                        "max_rss": check.max_rss,
+                                    }
+                                    for check in self.checks
+                                ]
+                            },
+                        }
+                    ],
+                }
+            ],
+        }
+
+    def dumps(self, format="json"):
+        data = self.to_sarif() if format == "sarif" else self.to_json()
+        return json.dumps(data, indent=2, ensure_ascii=False)
@@ -0,0 +1,278 @@
+"""
+Resident validation server.
+
+A long-running process that compiles every XSD schema once and then answers
+validate and repair requests, so each request skips interpreter startup, the
+lxml import and schema compilation. Requests and replies are JSON objects,
+one per line, read from a Unix socket or from stdin.
+
+Request:
+    {"id": 1, "command": "validate", "path": "unpacked/", "original": "in.docx",
+     "author": "Claude", "auto_repair": true}
+
+Reply:
+    {"id": 1, "ok": true, "valid": true, "repairs": 0, "output": "...", "report": {...}}
+
+The other commands are "repair" (repairs only), "ping" and "shutdown".
+Requests are handled one at a time, because the validators print their
+findings and the output of a request is captured from stdout.
+
+The default socket lives in the per-user cache directory (see cache.py),
+which no other user can enter, and its name includes a hash of the validator
+code and schemas, so clients never talk to a server started from an older
+version. Clients only connect to a socket that belongs to the current user.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+from pathlib import Path
+
+import lxml.etree
+
+from .base import BaseSchemaValidator
+from .cache import cache_dir, is_private
+from .docx import DOCXSchemaValidator
+from .manifest import ValidationManifest
+from .pptx import PPTXSchemaValidator
+from .redlining import RedliningValidator
+from .report import ValidationReport
+from .xlsx import XLSXSchemaValidator
+from .xsd import SCHEMAS_DIR, code_version, load_schema
+
+DEFAULT_IDLE_TIMEOUT = 1800
+CLIENT_TIMEOUT = 600
+
+
+def default_socket_path():
+    # None when there is no private cache directory to put the socket in.
+    directory = cache_dir()
+    if directory is None:
+        return None
+    return directory / f"validator_{code_version()}.sock"
+
+
+def preload_schemas():
+    loaded = 0
+    for schema in sorted(set(BaseSchemaValidator.SCHEMA_MAPPINGS.values())):
+        try:
+            load_schema(SCHEMAS_DIR / schema)
+            loaded += 1
+        except (lxml.etree.XMLSchemaParseError, lxml.etree.XMLSyntaxError, OSError):
+            pass
+    return loaded
+
+
+def handle_request(request):
+    command = request.get("command", "validate")
+    reply = {"id": request.get("id")}
+
+    try:
+        if command == "ping":
+            reply.update(ok=True, version=code_version(), pid=os.getpid())
+        elif command in ("validate", "repair"):
+            reply.update(ok=True, **_validate(request, repair_only=command == "repair"))
+        else:
+            reply.update(ok=False, error=f"Unknown command: {command}")
+    except Exception as e:
+        reply.update(ok=False, error=f"{type(e).__name__}: {e}")
+    return reply
+
+
+def _validate(request, repair_only=False):
+    path = Path(request["path"])
+    original = Path(request["original"]) if request.get("original") else None
+    if not path.exists():
+        raise FileNotFoundError(f"{path} does not exist")
+
+    # A packed document is validated as its own type; the original is only the
+    # baseline it is compared with. An unpacked directory takes the type of
+    # its original.
+    if path.is_file():
+        suffix = path.suffix.lower()
+    else:
+        suffix = original.suffix.lower() if original else ""
+    manifest = None
+    if path.is_dir() and request.get("manifest", True):
+        manifest = ValidationManifest.for_package(path, original)
+
+    report = ValidationReport(echo=True)
+    options = {
+        "verbose": request.get("verbose", False),
+        "manifest": manifest,
+        "report": report,
+    }
+
+    match suffix:
+        case ".docx":
+            validators = [
+                DOCXSchemaValidator(path, original, jobs=request.get("jobs", 1), **options)
+            ]
+            if original:
+                validators.append(
+                    RedliningValidator(
+                        path, original, author=request.get("author", "Claude"), **options
+                    )
+                )
+        case ".pptx":
+            validators = [
+                PPTXSchemaValidator(path, original, jobs=request.get("jobs", 1), **options)
+            ]
+        case ".xlsx":
+            validators = [
+                XLSXSchemaValidator(path, original, jobs=request.get("jobs", 1), **options)
+            ]
+        case _:
+            raise ValueError(f"Validation not supported for file type {suffix}")
+
+    output = io.StringIO()
+    repairs = 0
+    valid = None
+    with contextlib.redirect_stdout(output):
+        if repair_only or request.get("auto_repair"):
+            dry_run = request.get("dry_run", False)
+            repairs = sum(
+                report.run(
+                    type(v).__name__,
+                    "repair",
+                    lambda v=v: v.repair(dry_run=dry_run),
+                    kind="repair",
+                )
+                for v in validators
+            )
+            if repairs:
+                verb = "Would auto-repair" if dry_run else "Auto-repaired"
+                print(f"{verb} {repairs} issue(s)")
+        if not repair_only:
+            valid = all(v.validate() for v in validators)
+            if valid:
+                print("All validations PASSED!")
+
+    if manifest is not None:
+        manifest.save()
+
+    return {
+        "valid": valid,
+        "repairs": repairs,
+        "output": output.getvalue(),
+        "report": report.to_json(),
+    }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                reply = {"ok": False, "error": f"Invalid request: {e}"}
+            else:
+                if request.get("command") == "shutdown":
+                    self.server.shutdown_requested = True
+                    reply = {"id": request.get("id"), "ok": True}
+                else:
+                    reply = handle_request(request)
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+            if self.server.shutdown_requested:
+                return
+
+
+class ValidationServer(socketserver.UnixStreamServer):
+
+    def __init__(self, socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.socket_path = Path(socket_path)
+        self.idle_timeout = idle_timeout
+        self.shutdown_requested = False
+        self.timeout = 1.0
+
+        if self.socket_path.exists():
+            if ping(self.socket_path) is not None:
+                raise RuntimeError(f"A validation server is already listening on {socket_path}")
+            self.socket_path.unlink()
+
+        # The socket is created with mode 0600, so it is never reachable by
+        # other users, even outside the private cache directory.
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def serve(self):
+        last_request = time.monotonic()
+        try:
+            while not self.shutdown_requested:
+                self._handled = False
+                self.handle_request()
+                if self._handled:
+                    last_request = time.monotonic()
+                elif self.idle_timeout and time.monotonic() - last_request > self.idle_timeout:
+                    break
+        finally:
+            self.server_close()
+            with contextlib.suppress(OSError):
+                self.socket_path.unlink()
+
+    def process_request(self, request, client_address):
+        self._handled = True
+        super().process_request(request, client_address)
+
+
+def serve_stdio(stdin=None, stdout=None):
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            reply = {"ok": False, "error": f"Invalid request: {e}"}
+        else:
+            if request.get("command") == "shutdown":
+                stdout.write(json.dumps({"id": request.get("id"), "ok": True}) + "\n")
+                stdout.flush()
+                return
+            reply = handle_request(request)
+        stdout.write(json.dumps(reply) + "\n")
+        stdout.flush()
+
+
+def request(payload, socket_path=None, timeout=CLIENT_TIMEOUT):
+    # Returns None when no server is listening, so callers can fall back to
+    # validating in process.
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    socket_path = socket_path or default_socket_path()
+    if socket_path is None or not is_private(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(str(socket_path))
+            client.sendall(json.dumps(payload).encode() + b"\n")
+            with client.makefile("rb") as reply:
+                line = reply.readline()
+    except OSError:
+        return None
+
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+def ping(socket_path=None):
+    return request({"command": "ping"}, socket_path, timeout=5)
@@ -0,0 +1,157 @@
+"""
+Process-wide registry of compiled XSD schemas.
+
+Each schema file is compiled at most once per process and shared by every
+validator instance. The schema sources are also persisted as a single bundle
+in the per-user cache directory (see cache.py), so later runs resolve xsd:import/xsd:include from
+memory instead of opening each schema file again.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+
+import lxml.etree
+
+from .cache import cache_dir
+
+SCHEMAS_DIR = (Path(__file__).parent.parent / "schemas").resolve()
+
+_schemas = {}
+_bundle = None
+_version = None
+_code_version = None
+_lock = threading.RLock()
+
+
+def load_schema(schema_path):
+    schema_path = Path(schema_path).resolve()
+
+    with _lock:
+        if schema_path not in _schemas:
+            try:
+                _schemas[schema_path] = _compile_schema(schema_path)
+            except (lxml.etree.XMLSchemaParseError, lxml.etree.XMLSyntaxError, OSError) as e:
+                _schemas[schema_path] = e
+        schema = _schemas[schema_path]
+
+    if isinstance(schema, Exception):
+        raise schema
+    return schema
+
+
+def clear_schemas():
+    global _bundle
+    with _lock:
+        _schemas.clear()
+        _bundle = None
+
+
+def schemas_version():
+    global _version
+    if _version is None:
+        digest = hashlib.sha256()
+        for xsd_file in sorted(SCHEMAS_DIR.rglob("*.xsd")):
+            stat = xsd_file.stat()
+            digest.update(
+                f"{xsd_file.relative_to(SCHEMAS_DIR).as_posix()}:{stat.st_size}:{stat.st_mtime_ns}\n".encode()
+            )
+        _version = digest.hexdigest()[:16]
+    return _version
+
+
+def code_version():
+    # Hash of the validator sources and the schemas, for caches and servers
+    # whose results depend on both.
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256(schemas_version().encode())
+        for source in sorted(Path(__file__).parent.glob("*.py")):
+            digest.update(source.name.encode())
+            digest.update(source.read_bytes())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def _compile_schema(schema_path):
+    bundle = _load_bundle()
+    parser = lxml.etree.XMLParser()
+    parser.resolvers.add(_BundleResolver(bundle))
+
+    source = bundle.get(_bundle_key(schema_path))
+    if source is None:
+        xsd_doc = lxml.etree.parse(str(schema_path), parser=parser)
+    else:
+        xsd_doc = lxml.etree.parse(
+            io.BytesIO(source), parser=parser, base_url=str(schema_path)
+        )
+    return lxml.etree.XMLSchema(xsd_doc)
+
+
+class _BundleResolver(lxml.etree.Resolver):
+
+    def __init__(self, bundle):
+        self.bundle = bundle
+
+    def resolve(self, url, pubid, context):
+        if "://" in url and not url.startswith("file://"):
+            return None
+        source = self.bundle.get(_bundle_key(url.removeprefix("file://")))
+        if source is None:
+            return None
+        return self.resolve_string(source, context, base_url=url)
+
+
+def _bundle_key(path):
+    try:
+        return Path(path).resolve().relative_to(SCHEMAS_DIR).as_posix()
+    except ValueError:
+        return None
+
+
+def _bundle_path():
+    directory = cache_dir()
+    if directory is None:
+        return None
+    return directory / f"schemas_{schemas_version()}.zip"
+
+
+def _load_bundle():
+    global _bundle
+    if _bundle is not None:
+        return _bundle
+
+    bundle_path = _bundle_path()
+    if bundle_path is not None:
+        try:
+            with zipfile.ZipFile(bundle_path, "r") as zf:
+                _bundle = {name: zf.read(name) for name in zf.namelist()}
+            return _bundle
+        except (OSError, zipfile.BadZipFile):
+            pass
+
+    _bundle = {
+        xsd_file.relative_to(SCHEMAS_DIR).as_posix(): xsd_file.read_bytes()
+        for xsd_file in sorted(SCHEMAS_DIR.rglob("*.xsd"))
+    }
+    if bundle_path is None:
+        return _bundle
+
+    try:
+        fd, temp_name = tempfile.mkstemp(dir=bundle_path.parent, suffix=".zip")
+    except OSError:
+        return _bundle
+
+    try:
+        with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_STORED) as zf:
+            for name, source in _bundle.items():
+                zf.writestr(name, source)
+        os.replace(temp_name, bundle_path)
+    except OSError:
+        Path(temp_name).unlink(missing_ok=True)
+
+    return _bundle
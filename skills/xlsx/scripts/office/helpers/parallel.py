@@ -0,0 +1,23 @@
+"""Process parts in worker processes, largest first.
+
+Part sizes vary widely, so a pool that takes parts in archive order can be
+left finishing one large part long after the others are done. map_parts
+starts the largest parts first and hands them out one at a time, and
+returns the results in the order of the parts it was given, so callers do
+not depend on scheduling.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+def map_parts(func, parts, size, jobs, initializer=None, initargs=()):
+    # `func` is called with each part in a worker process and must be
+    # picklable; `size` is called with each part in this process.
+    order = sorted(range(len(parts)), key=lambda i: size(parts[i]), reverse=True)
+    results = [None] * len(parts)
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=initializer, initargs=initargs
+    ) as pool:
+        for i, result in zip(order, pool.map(func, [parts[i] for i in order])):
+            results[i] = result
+    return results
@@ -0,0 +1,155 @@
+"""Profile the stages of the unpack, pack and validate pipelines.
+
+Each stage records its wall time, CPU time and peak traced memory
+(tracemalloc). Validator checks run during a stage are recorded beneath it
+from the stage's ValidationReport. A stage entered more than once, such as a
+stage run for every part, is recorded once with its times summed. With a
+cProfile path, every stage runs under cProfile and the statistics of the
+slowest stage are written there.
+
+The trace is written as JSON in a stable layout, versioned by its "format"
+field, so traces of different versions can be diffed:
+
+    {
+      "format": "office-profile/2",
+      "command": "pack",
+      "wall_time": 1.234567,
+      "cpu_time": 1.200000,
+      "peak_memory": 52428800,
+      "stages": [
+        {"name": "validate", "wall_time": ..., "cpu_time": ..., "peak_memory": ...,
+         "checks": [{"validator": ..., "name": ..., "kind": ..., "wall_time": ...,
+                     "cpu_time": ..., "peak_memory": ...}]}
+      ],
+      "cprofile": {"stage": "validate", "path": "slowest.prof"}
+    }
+
+Times are in seconds and memory in bytes. CPU time covers this process only,
+not worker processes.
+
+Stages of each command:
+
+    unpack    copy          non-XML parts copied from the archive
+              parse         story parts parsed for normalizing (DOCX)
+              normalize     redlines simplified and runs merged (DOCX)
+              pretty_print  XML parts pretty-printed to disk (all of them
+                            with --jobs N)
+              write         parts that are not well-formed, written as read
+    pack      repair, validate
+              compare       parts checked against the unpack manifest
+              condense      XML parts condensed into the archive
+              reuse         unedited parts copied from the original, compressed
+              zip           other parts compressed into the archive
+    validate  repair, validate
+
+office-profile/2 replaced the unpack stages extract, simplify_redlines,
+merge_runs and escape_smart_quotes of office-profile/1 with copy, parse,
+normalize and write, and the pack stage copy with compare, reuse and zip.
+"""
+
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+PROFILE_FORMAT = "office-profile/2"
+
+
+class PipelineProfiler:
+
+    def __init__(self, command, cprofile_path=None):
+        self.command = command
+        self.cprofile_path = Path(cprofile_path) if cprofile_path else None
+        self.stages = []
+        self._profiles = {}
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, report=None):
+        first_check = len(report.checks) if report is not None else 0
+        profile = None
+        if self.cprofile_path:
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall_time = time.perf_counter() - started
+            cpu_time = time.process_time() - cpu_started
+
+            checks = report.checks[first_check:] if report is not None else []
+            # Checks reset the traced peak themselves, so the stage peak is
+            # the highest of its own and theirs.
+            peak_memory = max(
+                [tracemalloc.get_traced_memory()[1]]
+                + [check.peak_memory for check in checks if check.peak_memory is not None]
+            )
+
+            entry = next((s for s in self.stages if s["name"] == name), None)
+            if entry is None:
+                entry = {
+                    "name": name,
+                    "wall_time": 0.0,
+                    "cpu_time": 0.0,
+                    "peak_memory": 0,
+                    "checks": [],
+                }
+                self.stages.append(entry)
+            entry["wall_time"] = round(entry["wall_time"] + wall_time, 6)
+            entry["cpu_time"] = round(entry["cpu_time"] + cpu_time, 6)
+            entry["peak_memory"] = max(entry["peak_memory"], peak_memory)
+            entry["checks"].extend(
+                {
+                    "validator": check.validator,
+                    "name": check.name,
+                    "kind": check.kind,
+                    "wall_time": round(check.wall_time, 6),
+                    "cpu_time": round(check.cpu_time, 6),
+                    "peak_memory": check.peak_memory,
+                }
+                for check in checks
+            )
+
+    def _slowest(self):
+        profiled = [s for s in self.stages if s["name"] in self._profiles]
+        return max(profiled, key=lambda s: s["wall_time"], default=None)
+
+    def to_dict(self):
+        slowest = self._slowest()
+        return {
+            "format": PROFILE_FORMAT,
+            "command": self.command,
+            "wall_time": round(time.perf_counter() - self._started, 6),
+            "cpu_time": round(time.process_time() - self._cpu_started, 6),
+            "peak_memory": max([stage["peak_memory"] for stage in self.stages], default=0),
+            "stages": self.stages,
+            "cprofile": (
+                {"stage": slowest["name"], "path": str(self.cprofile_path)}
+                if slowest is not None
+                else None
+            ),
+        }
+
+    def write(self, path):
+        slowest = self._slowest()
+        if slowest is not None:
+            self._profiles[slowest["name"]].dump_stats(self.cprofile_path)
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2) + "\n", encoding="utf-8")
+
+
+def stage(profiler, name, report=None):
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name, report)
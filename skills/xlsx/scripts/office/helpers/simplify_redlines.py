@@ -8,121 +8,36 @@ Rules:
 - Only merges w:ins with w:ins, w:del with w:del (same element type)
 - Only merges if same author (ignores timestamp differences)
 - Only merges if truly adjacent (only whitespace between them)
+
+Works in the document body, headers, footers, footnotes, endnotes and
+comments. See helpers/normalize.py, which does the work.
 """
 
 import xml.etree.ElementTree as ET
 import zipfile
 from pathlib import Path
 
-import defusedxml.minidom
+from .normalize import normalize_directory
 
 WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
 
 
-def simplify_redlines(input_dir: str) -> tuple[int, str]:
+def simplify_redlines(input_dir: str, jobs: int = 1) -> tuple[int, str]:
     doc_xml = Path(input_dir) / "word" / "document.xml"
 
     if not doc_xml.exists():
         return 0, f"Error: {doc_xml} not found"
 
     try:
-        dom = defusedxml.minidom.parseString(doc_xml.read_text(encoding="utf-8"))
-        root = dom.documentElement
-
-        merge_count = 0
-
-        containers = _find_elements(root, "p") + _find_elements(root, "tc")
-
-        for container in containers:
-            merge_count += _merge_tracked_changes_in(container, "ins")
-            merge_count += _merge_tracked_changes_in(container, "del")
-
-        doc_xml.write_bytes(dom.toxml(encoding="UTF-8"))
+        merge_count, _ = normalize_directory(
+            input_dir, merge_runs=False, simplify_redlines=True, jobs=jobs
+        )
         return merge_count, f"Simplified {merge_count} tracked changes"
 
     except Exception as e:
         return 0, f"Error: {e}"
 
 
-def _merge_tracked_changes_in(container, tag: str) -> int:
-    merge_count = 0
-
-    tracked = [
-        child
-        for child in container.childNodes
-        if child.nodeType == child.ELEMENT_NODE and _is_element(child, tag)
-    ]
-
-    if len(tracked) < 2:
-        return 0
-
-    i = 0
-    while i < len(tracked) - 1:
-        curr = tracked[i]
-        next_elem = tracked[i + 1]
-
-        if _can_merge_tracked(curr, next_elem):
-            _merge_tracked_content(curr, next_elem)
-            container.removeChild(next_elem)
-            tracked.pop(i + 1)
-            merge_count += 1
-        else:
-            i += 1
-
-    return merge_count
-
-
-def _is_element(node, tag: str) -> bool:
-    name = node.localName or node.tagName
-    return name == tag or name.endswith(f":{tag}")
-
-
-def _get_author(elem) -> str:
-    author = elem.getAttribute("w:author")
-    if not author:
-        for attr in elem.attributes.values():
-            if attr.localName == "author" or attr.name.endswith(":author"):
-                return attr.value
-    return author
-
-
-def _can_merge_tracked(elem1, elem2) -> bool:
-    if _get_author(elem1) != _get_author(elem2):
-        return False
-
-    node = elem1.nextSibling
-    while node and node != elem2:
-        if node.nodeType == node.ELEMENT_NODE:
-            return False
-        if node.nodeType == node.TEXT_NODE and node.data.strip():
-            return False
-        node = node.nextSibling
-
-    return True
-
-
-def _merge_tracked_content(target, source):
-    while source.firstChild:
-        child = source.firstChild
-        source.removeChild(child)
-        target.appendChild(child)
-
-
-def _find_elements(root, tag: str) -> list:
-    results = []
-
-    def traverse(node):
-        if node.nodeType == node.ELEMENT_NODE:
-            name = node.localName or node.tagName
-            if name == tag or name.endswith(f":{tag}"):
-                results.append(node)
-            for child in node.childNodes:
-                traverse(child)
-
-    traverse(root)
-    return results
-
-
 def get_tracked_change_authors(doc_xml_path: Path) -> dict[str, int]:
     if not doc_xml_path.exists():
         return {}
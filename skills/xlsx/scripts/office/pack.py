@@ -1,25 +1,60 @@
 """Pack a directory into a DOCX, PPTX, or XLSX file.
 
 Validates with auto-repair, condenses XML formatting, and creates the Office file.
+Parts are streamed from the directory straight into the archive, and XML parts
+are condensed on the way (see helpers/serializer.py), so large parts pack in
+bounded memory. With --jobs N, parts are validated and condensed by N worker
+processes; the archive is still written by one writer, in sorted member order,
+so the output does not depend on scheduling.
+
+With --original, parts that were not edited since unpacking (see
+helpers/unpack_manifest.py) are copied from the original file still
+compressed, so repacking after a small edit costs little more than reading
+the parts to checksum them.
+When a validation server (validation_server.py) is running, validation is sent
+to it instead of loading the validators and schemas in this process.
+
+With --profile, the wall time, CPU time and peak memory of each stage and each
+validator check are written to a JSON trace (see helpers/profiling.py). Profiled
+runs always validate in process.
 
 Usage:
-    python pack.py <input_directory> <output_file> [--original <file>] [--validate true|false]
+    python pack.py <input_directory> <output_file> [--original <file>] [--validate true|false] [--jobs N]
 
 Examples:
     python pack.py unpacked/ output.docx --original input.docx
     python pack.py unpacked/ output.pptx --validate false
+    python pack.py unpacked/ output.docx --original input.docx --profile trace.json
 """
 
 import argparse
-import sys
+import contextlib
 import shutil
+import sys
 import tempfile
 import zipfile
 from pathlib import Path
 
-import defusedxml.minidom
+from helpers.parallel import map_parts
+from helpers.profiling import PipelineProfiler, stage
+from helpers.serializer import condense
+from helpers.unpack_manifest import UnpackManifest
+from helpers.zipwriter import ZipWriter
+from validators import (
+    DOCXSchemaValidator,
+    PPTXSchemaValidator,
+    RedliningValidator,
+    ValidationManifest,
+    ValidationReport,
+    XLSXSchemaValidator,
+)
+from validators.manifest import LOCAL_FILES
+from validators.server import request as server_request
+
+CHUNK_SIZE = 1 << 20
+
+ENCRYPTED_FLAG = 0x1
 
-from validators import DOCXSchemaValidator, PPTXSchemaValidator, RedliningValidator
 
 def pack(
     input_directory: str,
@@ -27,6 +62,8 @@ def pack(
     original_file: str | None = None,
     validate: bool = True,
     infer_author_func=None,
+    jobs: int = 1,
+    profiler: PipelineProfiler | None = None,
 ) -> tuple[None, str]:
     input_dir = Path(input_directory)
     output_path = Path(output_file)
@@ -42,26 +79,69 @@ def pack(
         original_path = Path(original_file)
         if original_path.exists():
             success, output = _run_validation(
-                input_dir, original_path, suffix, infer_author_func
+                input_dir, original_path, suffix, infer_author_func, jobs, profiler
             )
             if output:
                 print(output)
             if not success:
                 return None, f"Error: Validation failed for {input_dir}"
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_content_dir = Path(temp_dir) / "content"
-        shutil.copytree(input_dir, temp_content_dir)
-
-        for pattern in ["*.xml", "*.rels"]:
-            for xml_file in temp_content_dir.rglob(pattern):
-                _condense_xml(xml_file)
+    members = sorted(
+        (f.relative_to(input_dir).as_posix(), f)
+        for f in input_dir.rglob("*")
+        if f.is_file() and f.name not in LOCAL_FILES
+    )
+    members.sort(key=lambda member: member[0] != "[Content_Types].xml")
 
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for f in temp_content_dir.rglob("*"):
-                if f.is_file():
-                    zf.write(f, f.relative_to(temp_content_dir))
+    # Written next to the output and moved into place once complete, so a
+    # failed pack leaves no partial file and the output may be the original.
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = output_path.with_name(output_path.name + ".partial")
+    try:
+        with contextlib.ExitStack() as stack:
+            original = stack.enter_context(_open_original(original_file))
+            temp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            reused = {}
+            if original is not None:
+                manifest = UnpackManifest.load(input_dir)
+                infos = {info.filename: info for info in original.infolist()}
+                with stage(profiler, "compare"):
+                    for name, f in members:
+                        info = infos.get(name)
+                        if (
+                            info is not None
+                            and not info.flag_bits & ENCRYPTED_FLAG
+                            and manifest.unchanged(name, f, original, info)
+                        ):
+                            reused[name] = info
+            # Reused members are copied from the original file as stored.
+            source = stack.enter_context(open(original_file, "rb")) if reused else None
+
+            xml_files = [
+                (name, f)
+                for name, f in members
+                if name not in reused and f.name.endswith((".xml", ".rels"))
+            ]
+            condensed = {}
+            if jobs > 1 and len(xml_files) > 1:
+                with stage(profiler, "condense"):
+                    condensed = _condense_parallel(xml_files, Path(temp_dir), jobs)
+
+            with ZipWriter(partial_path) as zf:
+                for name, f in members:
+                    if name in reused:
+                        with stage(profiler, "reuse"):
+                            zf.copy(source, reused[name])
+                    elif f.name.endswith((".xml", ".rels")):
+                        with stage(profiler, "condense"):
+                            _write_condensed(zf, name, f, condensed.get(name))
+                    else:
+                        with stage(profiler, "zip"):
+                            zf.write(f, name)
+
+        partial_path.replace(output_path)
+    finally:
+        partial_path.unlink(missing_ok=True)
 
     return None, f"Successfully packed {input_dir} to {output_file}"
 
@@ -71,33 +151,65 @@ def _run_validation(
     original_file: Path,
     suffix: str,
     infer_author_func=None,
+    jobs: int = 1,
+    profiler: PipelineProfiler | None = None,
 ) -> tuple[bool, str | None]:
+    author = "Claude"
+    if suffix == ".docx" and infer_author_func:
+        try:
+            author = infer_author_func(unpacked_dir, original_file)
+        except ValueError as e:
+            print(f"Warning: {e} Using default author 'Claude'.", file=sys.stderr)
+
+    if profiler is None:
+        reply = server_request(
+            {
+                "command": "validate",
+                "path": str(unpacked_dir.resolve()),
+                "original": str(original_file.resolve()),
+                "author": author,
+                "jobs": jobs,
+                "auto_repair": True,
+            }
+        )
+        if reply is not None and reply.get("ok"):
+            return bool(reply["valid"]), reply["output"].rstrip("\n") or None
+
     output_lines = []
     validators = []
+    manifest = ValidationManifest.for_package(unpacked_dir, original_file)
+    report = ValidationReport(trace_memory=True) if profiler is not None else None
 
     if suffix == ".docx":
-        author = "Claude"
-        if infer_author_func:
-            try:
-                author = infer_author_func(unpacked_dir, original_file)
-            except ValueError as e:
-                print(f"Warning: {e} Using default author 'Claude'.", file=sys.stderr)
-
         validators = [
-            DOCXSchemaValidator(unpacked_dir, original_file),
-            RedliningValidator(unpacked_dir, original_file, author=author),
+            DOCXSchemaValidator(
+                unpacked_dir, original_file, jobs=jobs, manifest=manifest, report=report
+            ),
+            RedliningValidator(
+                unpacked_dir, original_file, author=author, manifest=manifest, report=report
+            ),
         ]
     elif suffix == ".pptx":
-        validators = [PPTXSchemaValidator(unpacked_dir, original_file)]
-
-    if not validators:
-        return True, None
+        validators = [
+            PPTXSchemaValidator(
+                unpacked_dir, original_file, jobs=jobs, manifest=manifest, report=report
+            )
+        ]
+    elif suffix == ".xlsx":
+        validators = [
+            XLSXSchemaValidator(
+                unpacked_dir, original_file, jobs=jobs, manifest=manifest, report=report
+            )
+        ]
 
-    total_repairs = sum(v.repair() for v in validators)
+    with stage(profiler, "repair"):
+        total_repairs = sum(v.repair() for v in validators)
     if total_repairs:
         output_lines.append(f"Auto-repaired {total_repairs} issue(s)")
 
-    success = all(v.validate() for v in validators)
+    with stage(profiler, "validate", report):
+        success = all(v.validate() for v in validators)
+    manifest.save()
 
     if success:
         output_lines.append("All validations PASSED!")
@@ -105,29 +217,52 @@ def _run_validation(
     return success, "\n".join(output_lines) if output_lines else None
 
 
-def _condense_xml(xml_file: Path) -> None:
+def _open_original(original_file: str | None):
+    if original_file and zipfile.is_zipfile(original_file):
+        return zipfile.ZipFile(original_file, "r")
+    return contextlib.nullcontext()
+
+
+def _condense_parallel(xml_files, temp_dir: Path, jobs: int) -> dict[str, Path]:
+    # The archive is written afterwards from the condensed copies, in member
+    # order.
+    condensed = {name: temp_dir / str(i) for i, (name, _) in enumerate(xml_files)}
+    map_parts(
+        _condense_xml,
+        [(f, condensed[name]) for name, f in xml_files],
+        lambda part: part[0].stat().st_size,
+        jobs,
+    )
+    return condensed
+
+
+def _condense_xml(part: tuple[Path, Path]) -> None:
+    xml_file, condensed = part
+    with open(xml_file, "rb") as source, open(condensed, "wb") as output:
+        _condense_part(xml_file, source, output)
+
+
+def _condense_part(xml_file: Path, source, output) -> None:
     try:
-        with open(xml_file, encoding="utf-8") as f:
-            dom = defusedxml.minidom.parse(f)
-
-        for element in dom.getElementsByTagName("*"):
-            if element.tagName.endswith(":t"):
-                continue
-
-            for child in list(element.childNodes):
-                if (
-                    child.nodeType == child.TEXT_NODE
-                    and child.nodeValue
-                    and child.nodeValue.strip() == ""
-                ) or child.nodeType == child.COMMENT_NODE:
-                    element.removeChild(child)
-
-        xml_file.write_bytes(dom.toxml(encoding="UTF-8"))
+        condense(source, output)
     except Exception as e:
         print(f"ERROR: Failed to parse {xml_file.name}: {e}", file=sys.stderr)
         raise
 
 
+def _write_condensed(zf: ZipWriter, name: str, xml_file: Path, condensed: Path | None) -> None:
+    # The entry takes the part's timestamp and mode, whether the part is
+    # condensed here or was condensed by a worker.
+    stat = xml_file.stat()
+    with zf.open(name, stat.st_mtime, stat.st_mode, stat.st_size) as output:
+        if condensed is not None:
+            with open(condensed, "rb") as source:
+                shutil.copyfileobj(source, output, CHUNK_SIZE)
+        else:
+            with open(xml_file, "rb") as source:
+                _condense_part(xml_file, source, output)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Pack a directory into a DOCX, PPTX, or XLSX file"
@@ -136,7 +271,7 @@ if __name__ == "__main__":
     parser.add_argument("output_file", help="Output Office file (.docx/.pptx/.xlsx)")
     parser.add_argument(
         "--original",
-        help="Original file for validation comparison",
+        help="Original file for validation comparison; unedited parts are copied from it as they are",
     )
     parser.add_argument(
         "--validate",
@@ -145,15 +280,39 @@ if __name__ == "__main__":
         metavar="true|false",
         help="Run validation with auto-repair (default: true)",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Validate and condense parts in N worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="Write wall time, CPU time and peak memory of each stage and check to this JSON file",
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="PATH",
+        help="With --profile, write cProfile statistics of the slowest stage to PATH",
+    )
     args = parser.parse_args()
 
+    profiler = PipelineProfiler("pack", args.cprofile) if args.profile else None
+
     _, message = pack(
         args.input_directory,
         args.output_file,
         original_file=args.original,
         validate=args.validate,
+        jobs=args.jobs,
+        profiler=profiler,
     )
     print(message)
 
+    if profiler is not None:
+        profiler.write(args.profile)
+
     if "Error" in message:
         sys.exit(1)
@@ -0,0 +1,10 @@
+"""Run the tests against the scripts in the parent directory, the way the
+scripts import each other (helpers.*, validators.*)."""
+
+import sys
+from pathlib import Path
+
+OFFICE_DIR = Path(__file__).resolve().parent.parent
+
+if str(OFFICE_DIR) not in sys.path:
+    sys.path.insert(0, str(OFFICE_DIR))
@@ -0,0 +1,27 @@
+"""Batch validation runs the validators of each document's own type."""
+
+from helpers.synthetic import make_docx, make_pptx
+from validators.server import handle_request
+
+
+def _validators(path, original=None):
+    reply = handle_request(
+        {
+            "command": "validate",
+            "path": str(path),
+            "original": str(original) if original else None,
+            "manifest": False,
+        }
+    )
+    assert reply["ok"], reply.get("error")
+    return {check["validator"] for check in reply["report"]["checks"]}
+
+
+def test_document_type_comes_from_the_document(tmp_path):
+    document = tmp_path / "document.docx"
+    presentation = tmp_path / "presentation.pptx"
+    make_docx(document, paragraphs=5)
+    make_pptx(presentation, slides=2)
+
+    assert _validators(presentation, original=document) == {"PPTXSchemaValidator"}
+    assert "DOCXSchemaValidator" in _validators(document, original=document)
@@ -0,0 +1,53 @@
+"""Round trips through the streaming pretty-printer and condenser."""
+
+import io
+
+import lxml.etree
+
+from helpers.serializer import condense, pretty_print
+
+ATTRIBUTES = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    b'<Relationship Id="rId1" Target="https://example.com/?a=1&amp;b=2" TargetMode="External"/>'
+    b'<Relationship Id="rId2" Target="a &lt;b&gt; &quot;c&quot; &#38; &amp;#38; d"/>'
+    b"</Relationships>"
+)
+
+
+def _condense(data):
+    output = io.BytesIO()
+    condense(data, output)
+    return output.getvalue()
+
+
+def _pretty_print(data):
+    output = io.BytesIO()
+    pretty_print(data, output)
+    return output.getvalue()
+
+
+def _attributes(data):
+    return [dict(element.attrib) for element in lxml.etree.fromstring(data).iter()]
+
+
+def test_condense_keeps_escaped_attribute_values():
+    assert _attributes(_condense(ATTRIBUTES)) == _attributes(ATTRIBUTES)
+    assert b'Target="https://example.com/?a=1&amp;b=2"' in _condense(ATTRIBUTES)
+
+
+def test_pretty_print_keeps_escaped_attribute_values():
+    assert _attributes(_pretty_print(ATTRIBUTES)) == _attributes(ATTRIBUTES)
+
+
+def test_round_trips_are_stable():
+    condensed = _condense(ATTRIBUTES)
+    assert _condense(_pretty_print(ATTRIBUTES)) == condensed
+    assert _condense(_pretty_print(condensed)) == condensed
+    assert _pretty_print(condensed) == _pretty_print(_pretty_print(condensed))
+
+
+def test_text_escapes_survive():
+    data = b'<w:t xmlns:w="urn:w">a &amp; b &lt; c &gt; d "e"</w:t>'
+    assert lxml.etree.fromstring(_condense(data)).text == 'a & b < c > d "e"'
+    assert lxml.etree.fromstring(_pretty_print(data)).text == 'a & b < c > d "e"'
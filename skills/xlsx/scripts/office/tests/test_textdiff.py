@@ -0,0 +1,42 @@
+"""Paragraph and character diff of the redlining report."""
+
+from validators.textdiff import diff_paragraphs, format_hunks
+
+ORIGINAL = ["Alpha one.", "Beta two.", "Gamma three.", "Delta four."]
+
+
+def test_inserted_paragraph():
+    modified = ["Alpha one.", "Beta two.", "New paragraph.", "Gamma three.", "Delta four."]
+
+    assert format_hunks(diff_paragraphs(ORIGINAL, modified)) == (
+        "@@ -2,0 +3 @@\n{+New paragraph.+}"
+    )
+
+
+def test_deleted_paragraph():
+    modified = ["Alpha one.", "Gamma three.", "Delta four."]
+
+    assert format_hunks(diff_paragraphs(ORIGINAL, modified)) == "@@ -2 +1,0 @@\n[-Beta two.-]"
+
+
+def test_insertion_and_deletion_within_paragraph():
+    modified = ["Alpha one.", "Beta new two.", "Gamma three.", "Delta."]
+
+    hunks = diff_paragraphs(ORIGINAL, modified)
+
+    assert format_hunks(hunks) == (
+        "@@ -2 +2 @@\nBeta {+new +}two.\n@@ -4 +4 @@\nDelta[- four-]."
+    )
+    assert [hunk.to_dict()["diff"] for hunk in hunks] == [
+        ["Beta {+new +}two."],
+        ["Delta[- four-]."],
+    ]
+
+
+def test_exhausted_time_budget_replaces_whole_paragraphs():
+    modified = ["Alpha one.", "Beta new two.", "Gamma three.", "Delta four."]
+
+    # A negative budget has run out before the first character is compared.
+    assert format_hunks(diff_paragraphs(ORIGINAL, modified, time_budget=-1)) == (
+        "@@ -2 +2 @@\n[-Beta two.-]{+Beta new two.+}"
+    )
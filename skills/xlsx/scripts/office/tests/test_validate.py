@@ -0,0 +1,20 @@
+"""Command-line options of validate.py."""
+
+import sys
+
+import pytest
+
+import validate
+from helpers.synthetic import make_docx
+
+
+def test_dry_run_requires_auto_repair(tmp_path, monkeypatch, capsys):
+    document = tmp_path / "document.docx"
+    make_docx(document, paragraphs=5)
+    monkeypatch.setattr(sys, "argv", ["validate.py", str(document), "--dry-run"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        validate.main()
+
+    assert exit_info.value.code == 2
+    assert "--dry-run requires --auto-repair" in capsys.readouterr().err
@@ -0,0 +1,94 @@
+"""Worksheet rules and workbook name checks of the XLSX validator."""
+
+import zipfile
+
+import pytest
+
+from helpers.synthetic import make_xlsx
+from validators.xlsx import XLSXSchemaValidator
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "book.xlsx"
+    make_xlsx(path, rows=3, columns=2, strings=3)
+    unpacked = tmp_path / "book"
+    with zipfile.ZipFile(path) as zf:
+        zf.extractall(unpacked)
+    return unpacked
+
+
+def _edit(path, old, new):
+    data = path.read_bytes()
+    assert old in data
+    path.write_bytes(data.replace(old, new, 1))
+
+
+def _check(unpacked, check, capsys):
+    capsys.readouterr()
+    result = getattr(XLSXSchemaValidator(unpacked), check)()
+    return result, capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "check",
+    [
+        "validate_cell_references",
+        "validate_shared_string_indexes",
+        "validate_style_indexes",
+        "validate_workbook_names",
+    ],
+)
+def test_generated_workbook_passes(workbook, check, capsys):
+    assert _check(workbook, check, capsys)[0]
+
+
+def test_invalid_cell_reference(workbook, capsys):
+    _edit(workbook / "xl/worksheets/sheet1.xml", b'<c r="B2"', b'<c r="B9"')
+
+    ok, output = _check(workbook, "validate_cell_references", capsys)
+
+    assert not ok
+    assert "xl/worksheets/sheet1.xml: Line 2: Cell B9 does not belong to row 2" in output
+
+
+def test_shared_string_index_out_of_range(workbook, capsys):
+    _edit(workbook / "xl/worksheets/sheet1.xml", b'<c r="A2" t="s"><v>0</v>', b'<c r="A2" t="s"><v>7</v>')
+
+    ok, output = _check(workbook, "validate_shared_string_indexes", capsys)
+
+    assert not ok
+    assert "Cell A2: Shared string index 7 is out of range (the workbook has 3 shared strings)" in output
+
+
+def test_style_index_out_of_range(workbook, capsys):
+    _edit(workbook / "xl/worksheets/sheet1.xml", b'<c r="B3" s="1"', b'<c r="B3" s="5"')
+
+    ok, output = _check(workbook, "validate_style_indexes", capsys)
+
+    assert not ok
+    assert "Cell B3: Style index 5 is out of range (styles.xml has 2 cell formats)" in output
+
+
+def test_duplicate_and_invalid_names(workbook, capsys):
+    _edit(
+        workbook / "xl/workbook.xml",
+        b"</sheets>",
+        b'<sheet name="sheet1" sheetId="2" r:id="rId9"/></sheets>'
+        b'<definedNames><definedName name="Total" localSheetId="4">Sheet1!$A$1</definedName>'
+        b'<definedName name="Rate">Sheet1!$B$1</definedName>'
+        b'<definedName name="rate">Sheet1!$B$2</definedName></definedNames>',
+    )
+
+    ok, output = _check(workbook, "validate_workbook_names", capsys)
+
+    assert not ok
+    assert "Duplicate sheet name 'sheet1'" in output
+    assert "definedName 'Total' has localSheetId='4' but the workbook has 2 sheets" in output
+    assert "Duplicate definedName 'rate' in workbook scope" in output
+
+
+def test_unreadable_workbook_relationships_count_no_shared_strings(workbook):
+    (workbook / "xl/_rels/workbook.xml.rels").write_bytes(b"<Relationships")
+
+    assert XLSXSchemaValidator(workbook).shared_string_count() == 0
@@ -1,9 +1,24 @@
 """Unpack Office files (DOCX, PPTX, XLSX) for editing.
 
-Extracts the ZIP archive, pretty-prints XML files, and optionally:
+Extracts the ZIP archive, pretty-prints XML files, and optionally, in the
+document body, headers, footers, footnotes, endnotes and comments:
 - Merges adjacent runs with identical formatting (DOCX only)
 - Simplifies adjacent tracked changes from same author (DOCX only)
 
+Each part is read from the archive once and written once. XML parts are
+pretty-printed and their smart quotes escaped as they are streamed to disk
+(see helpers/serializer.py), so large parts unpack in bounded memory; only
+the story parts are held in memory to simplify redlines and merge runs, in a
+single pass over each (see helpers/normalize.py).
+With --jobs N, XML parts are processed by N worker processes, largest first.
+
+The CRC-32, size and SHA-256 of every part are recorded in the unpacked
+directory (see helpers/unpack_manifest.py), so pack.py --original can tell
+which parts were not edited and copy them from the original file as they are.
+
+With --profile, the wall time, CPU time and peak memory of each stage are
+written to a JSON trace (see helpers/profiling.py).
+
 Usage:
     python unpack.py <office_file> <output_dir> [options]
 
@@ -11,17 +26,25 @@ Examples:
     python unpack.py document.docx unpacked/
     python unpack.py presentation.pptx unpacked/
     python unpack.py document.docx unpacked/ --merge-runs false
+    python unpack.py presentation.pptx unpacked/ --jobs 4
+    python unpack.py document.docx unpacked/ --profile trace.json
 """
 
 import argparse
+import hashlib
+import shutil
 import sys
 import zipfile
+import zlib
 from pathlib import Path
 
-import defusedxml.minidom
+import lxml.etree
 
-from helpers.merge_runs import merge_runs as do_merge_runs
-from helpers.simplify_redlines import simplify_redlines as do_simplify_redlines
+from helpers.normalize import is_story_part, normalize, parse_part
+from helpers.parallel import map_parts
+from helpers.profiling import PipelineProfiler, stage
+from helpers.serializer import pretty_print
+from helpers.unpack_manifest import UnpackManifest
 
 SMART_QUOTE_REPLACEMENTS = {
     "\u201c": "&#x201C;",  
@@ -30,12 +53,13 @@ SMART_QUOTE_REPLACEMENTS = {
     "\u2019": "&#x2019;",  
 }
 
-
 def unpack(
     input_file: str,
     output_directory: str,
     merge_runs: bool = True,
     simplify_redlines: bool = True,
+    profiler: PipelineProfiler | None = None,
+    jobs: int = 1,
 ) -> tuple[None, str]:
     input_path = Path(input_file)
     output_path = Path(output_directory)
@@ -49,27 +73,60 @@ def unpack(
 
     try:
         output_path.mkdir(parents=True, exist_ok=True)
+        root = output_path.resolve()
+        manifest = UnpackManifest(root)
+        parts = []
+        copied = []
 
         with zipfile.ZipFile(input_path, "r") as zf:
-            zf.extractall(output_path)
+            for info in zf.infolist():
+                target = _member_path(root, info.filename)
+                if target is None:
+                    continue
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if target.name.endswith((".xml", ".rels")):
+                    story = suffix == ".docx" and is_story_part(info.filename)
+                    parts.append((info, target, story))
+                else:
+                    with stage(profiler, "copy"):
+                        with zf.open(info) as source, open(target, "wb") as f:
+                            output = _ChecksumWriter(f)
+                            shutil.copyfileobj(source, output)
+                    copied.append((info, target, output.crc, output.size, output.digest()))
 
-        xml_files = list(output_path.rglob("*.xml")) + list(output_path.rglob("*.rels"))
-        for xml_file in xml_files:
-            _pretty_print_xml(xml_file)
+            if jobs > 1 and len(parts) > 1:
+                with stage(profiler, "pretty_print"):
+                    counts = _write_parts_parallel(
+                        input_path, parts, jobs, merge_runs, simplify_redlines
+                    )
+            else:
+                counts = [
+                    _write_part(
+                        zf, info, target, story, merge_runs, simplify_redlines, profiler
+                    )
+                    for info, target, story in parts
+                ]
 
-        message = f"Unpacked {input_file} ({len(xml_files)} XML files)"
+        written = [
+            (info, target, *count[2:]) for (info, target, _), count in zip(parts, counts)
+        ]
+        for info, target, crc, size, digest in copied + written:
+            manifest.record(target.relative_to(root).as_posix(), info, crc, size, digest)
+        manifest.save()
 
+        simplified = sum(count[0] for count in counts)
+        merged = sum(count[1] for count in counts)
+
+        message = f"Unpacked {input_file} ({len(parts)} XML files)"
         if suffix == ".docx":
             if simplify_redlines:
-                simplify_count, _ = do_simplify_redlines(str(output_path))
-                message += f", simplified {simplify_count} tracked changes"
-
+                message += f", simplified {simplified} tracked changes"
             if merge_runs:
-                merge_count, _ = do_merge_runs(str(output_path))
-                message += f", merged {merge_count} runs"
-
-        for xml_file in xml_files:
-            _escape_smart_quotes(xml_file)
+                message += f", merged {merged} runs"
 
         return None, message
 
@@ -79,23 +136,117 @@ def unpack(
         return None, f"Error unpacking: {e}"
 
 
-def _pretty_print_xml(xml_file: Path) -> None:
+def _member_path(root: Path, name: str) -> Path | None:
+    # Same sanitizing as ZipFile.extractall: no absolute paths or "..".
+    parts = [
+        part
+        for part in name.replace("\\", "/").split("/")
+        if part not in ("", ".", "..")
+    ]
+    if not parts:
+        return None
+    return root.joinpath(*parts)
+
+
+def _write_part(
+    zf: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    target: Path,
+    story: bool,
+    merge_runs: bool,
+    simplify_redlines: bool,
+    profiler: PipelineProfiler | None = None,
+) -> tuple[int, int, int, int, str]:
+    simplified = merged = 0
+    data = None
+    if story and (merge_runs or simplify_redlines):
+        data = zf.read(info)
+        try:
+            with stage(profiler, "parse"):
+                tree = parse_part(data)
+        except Exception:
+            tree = None
+
+        if tree is not None:
+            # Redlines and runs are simplified before pretty-printing, so the
+            # whitespace added for indentation never has to be skipped over.
+            with stage(profiler, "normalize"):
+                simplified, merged = normalize(tree.getroot(), merge_runs, simplify_redlines)
+            data = lxml.etree.tostring(tree, encoding="UTF-8", xml_declaration=True)
+
     try:
-        content = xml_file.read_text(encoding="utf-8")
-        dom = defusedxml.minidom.parseString(content)
-        xml_file.write_bytes(dom.toprettyxml(indent="  ", encoding="utf-8"))
+        with stage(profiler, "pretty_print"), open(target, "wb") as f:
+            output = _ChecksumWriter(f)
+            if data is None:
+                with zf.open(info) as source:
+                    pretty_print(source, output, SMART_QUOTE_REPLACEMENTS)
+            else:
+                pretty_print(data, output, SMART_QUOTE_REPLACEMENTS)
+        crc, size, digest = output.crc, output.size, output.digest()
     except Exception:
-        pass  
+        # Parts that are not well-formed XML are written as they are.
+        with stage(profiler, "write"):
+            if data is None:
+                data = zf.read(info)
+            data = _escape_smart_quotes(data)
+            target.write_bytes(data)
+        crc, size, digest = zlib.crc32(data), len(data), hashlib.sha256(data).hexdigest()
+
+    return simplified, merged, crc, size, digest
+
+
+class _ChecksumWriter:
+
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.sha256.update(data)
+        return self.f.write(data)
+
+    def digest(self):
+        return self.sha256.hexdigest()
 
 
-def _escape_smart_quotes(xml_file: Path) -> None:
+def _write_parts_parallel(input_path, parts, jobs, merge_runs, simplify_redlines):
+    return map_parts(
+        _write_part_in_worker,
+        parts,
+        lambda part: part[0].file_size,
+        jobs,
+        initializer=_init_unpack_worker,
+        initargs=(input_path, merge_runs, simplify_redlines),
+    )
+
+
+def _escape_smart_quotes(data: bytes) -> bytes:
     try:
-        content = xml_file.read_text(encoding="utf-8")
-        for char, entity in SMART_QUOTE_REPLACEMENTS.items():
-            content = content.replace(char, entity)
-        xml_file.write_text(content, encoding="utf-8")
-    except Exception:
-        pass
+        content = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data
+    for char, entity in SMART_QUOTE_REPLACEMENTS.items():
+        content = content.replace(char, entity)
+    return content.encode("utf-8")
+
+
+_worker_zip = None
+_worker_options = None
+
+
+def _init_unpack_worker(input_path, merge_runs, simplify_redlines):
+    global _worker_zip, _worker_options
+    _worker_zip = zipfile.ZipFile(input_path, "r")
+    _worker_options = (merge_runs, simplify_redlines)
+
+
+def _write_part_in_worker(part):
+    info, target, story = part
+    return _write_part(_worker_zip, info, target, story, *_worker_options)
 
 
 if __name__ == "__main__":
@@ -118,15 +269,39 @@ if __name__ == "__main__":
         metavar="true|false",
         help="Merge adjacent tracked changes from same author (DOCX only, default: true)",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Pretty-print parts in N worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="Write wall time, CPU time and peak memory of each stage to this JSON file",
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="PATH",
+        help="With --profile, write cProfile statistics of the slowest stage to PATH",
+    )
     args = parser.parse_args()
 
+    profiler = PipelineProfiler("unpack", args.cprofile) if args.profile else None
+
     _, message = unpack(
         args.input_file,
         args.output_directory,
         merge_runs=args.merge_runs,
         simplify_redlines=args.simplify_redlines,
+        profiler=profiler,
+        jobs=args.jobs,
     )
     print(message)
 
+    if profiler is not None:
+        profiler.write(args.profile)
+
     if "Error" in message:
         sys.exit(1)
@@ -2,24 +2,44 @@
 Command line tool to validate Office document XML files against XSD schemas and tracked changes.
 
 Usage:
-    python validate.py <path> [--original <original_file>] [--auto-repair] [--author NAME]
+    python validate.py <path> [--original <original_file>] [--auto-repair [--dry-run]] [--author NAME] [--jobs N] [--no-manifest] [--format text|json|sarif] [--profile TRACE [--cprofile PATH]]
 
 The first argument can be either:
 - An unpacked directory containing the Office document XML files
-- A packed Office file (.docx/.pptx/.xlsx) which will be unpacked to a temp directory
+- A packed Office file (.docx/.pptx/.xlsx), whose parts are read in place
 
 Auto-repair fixes:
 - paraId/durableId values that exceed OOXML limits
 - Missing xml:space="preserve" on w:t elements with whitespace
+
+All repairs are applied in one pass per part, and only parts that changed are
+rewritten. With --dry-run the repairs are reported but not written.
+
+Unpacked directories keep a manifest of part hashes and per-part results
+(.validation_manifest.json), so later runs only re-check what changed.
+
+With --format json or sarif, the text report is replaced by a structured
+report on stdout listing each finding (file, line, rule, severity, message)
+and the wall time and peak memory of every check.
+
+With --profile, the wall time, CPU time and peak memory of each stage and each
+check are written to a JSON trace (see helpers/profiling.py).
 """
 
 import argparse
 import sys
-import tempfile
 import zipfile
 from pathlib import Path
 
-from validators import DOCXSchemaValidator, PPTXSchemaValidator, RedliningValidator
+from helpers.profiling import PipelineProfiler, stage
+from validators import (
+    DOCXSchemaValidator,
+    PPTXSchemaValidator,
+    RedliningValidator,
+    ValidationManifest,
+    ValidationReport,
+    XLSXSchemaValidator,
+)
 
 
 def main():
@@ -45,12 +65,49 @@ def main():
         action="store_true",
         help="Automatically repair common issues (hex IDs, whitespace preservation)",
     )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --auto-repair, report what would be repaired without changing any file",
+    )
     parser.add_argument(
         "--author",
         default="Claude",
         help="Author name for redlining validation (default: Claude)",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Validate parts against XSD schemas in N worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--no-manifest",
+        action="store_true",
+        help="Do not read or update the incremental validation manifest",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "json", "sarif"],
+        default="text",
+        help="Output format of the validation report (default: text)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="Write wall time, CPU time and peak memory of each stage and check to this JSON file",
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="PATH",
+        help="With --profile, write cProfile statistics of the slowest stage to PATH",
+    )
     args = parser.parse_args()
+    if args.dry_run and not args.auto_repair:
+        parser.error("--dry-run requires --auto-repair")
+
+    profiler = PipelineProfiler("validate", args.cprofile) if args.profile else None
 
     path = Path(args.path)
     assert path.exists(), f"Error: {path} does not exist"
@@ -68,40 +125,92 @@ def main():
         f"Error: Cannot determine file type from {path}. Use --original or provide a .docx/.pptx/.xlsx file."
     )
 
+    manifest = None
     if path.is_file() and path.suffix.lower() in [".docx", ".pptx", ".xlsx"]:
-        temp_dir = tempfile.mkdtemp()
-        with zipfile.ZipFile(path, "r") as zf:
-            zf.extractall(temp_dir)
-        unpacked_dir = Path(temp_dir)
+        assert zipfile.is_zipfile(path), f"Error: {path} is not a valid Office file"
     else:
         assert path.is_dir(), f"Error: {path} is not a directory or Office file"
-        unpacked_dir = path
+        if not args.no_manifest:
+            manifest = ValidationManifest.for_package(path, original_file)
+    unpacked_dir = path
+
+    structured = args.format != "text"
+    report = None
+    if structured or profiler is not None:
+        report = ValidationReport(echo=not structured, trace_memory=True)
 
     match file_extension:
         case ".docx":
             validators = [
-                DOCXSchemaValidator(unpacked_dir, original_file, verbose=args.verbose),
+                DOCXSchemaValidator(
+                    unpacked_dir,
+                    original_file,
+                    verbose=args.verbose,
+                    jobs=args.jobs,
+                    manifest=manifest,
+                    report=report,
+                ),
             ]
             if original_file:
                 validators.append(
-                    RedliningValidator(unpacked_dir, original_file, verbose=args.verbose, author=args.author)  
+                    RedliningValidator(unpacked_dir, original_file, verbose=args.verbose, author=args.author, manifest=manifest, report=report)  
                 )
         case ".pptx":
             validators = [
-                PPTXSchemaValidator(unpacked_dir, original_file, verbose=args.verbose),
+                PPTXSchemaValidator(
+                    unpacked_dir,
+                    original_file,
+                    verbose=args.verbose,
+                    jobs=args.jobs,
+                    manifest=manifest,
+                    report=report,
+                ),
+            ]
+        case ".xlsx":
+            validators = [
+                XLSXSchemaValidator(
+                    unpacked_dir,
+                    original_file,
+                    verbose=args.verbose,
+                    jobs=args.jobs,
+                    manifest=manifest,
+                    report=report,
+                ),
             ]
         case _:
             print(f"Error: Validation not supported for file type {file_extension}")
             sys.exit(1)
 
     if args.auto_repair:
-        total_repairs = sum(v.repair() for v in validators)
-        if total_repairs:
-            print(f"Auto-repaired {total_repairs} issue(s)")
+        with stage(profiler, "repair", report):
+            if report is None:
+                total_repairs = sum(v.repair(dry_run=args.dry_run) for v in validators)
+            else:
+                total_repairs = sum(
+                    report.run(
+                        type(v).__name__,
+                        "repair",
+                        lambda v=v: v.repair(dry_run=args.dry_run),
+                        kind="repair",
+                    )
+                    for v in validators
+                )
+        if total_repairs and not structured:
+            verb = "Would auto-repair" if args.dry_run else "Auto-repaired"
+            print(f"{verb} {total_repairs} issue(s)")
+
+    with stage(profiler, "validate", report):
+        success = all(v.validate() for v in validators)
+
+    if manifest is not None:
+        manifest.save()
 
-    success = all(v.validate() for v in validators)
+    if profiler is not None:
+        profiler.write(args.profile)
 
-    if success:
+    if structured:
+        print(report.dumps(args.format))
+    elif success:
         print("All validations PASSED!")
 
     sys.exit(0 if success else 1)
@@ -4,12 +4,18 @@ Validation modules for Word document processing.
 
 from .base import BaseSchemaValidator
 from .docx import DOCXSchemaValidator
+from .manifest import ValidationManifest
 from .pptx import PPTXSchemaValidator
 from .redlining import RedliningValidator
+from .report import ValidationReport
+from .xlsx import XLSXSchemaValidator
 
 __all__ = [
     "BaseSchemaValidator",
     "DOCXSchemaValidator",
     "PPTXSchemaValidator",
     "RedliningValidator",
+    "ValidationManifest",
+    "ValidationReport",
+    "XLSXSchemaValidator",
 ]
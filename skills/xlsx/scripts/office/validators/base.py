@@ -2,12 +2,31 @@
 Base validator with common validation logic for document files.
 """
 
+import io
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-import defusedxml.minidom
 import lxml.etree
 
+from .baseline import BaselineIndex
+from .fingerprint import StructuralFingerprint, signed
+from .graph import PackageGraph
+from .package import ParsedPackage
+from .repairs import RepairEngine, WhitespacePreservationRepair
+from .report import format_finding
+from .rules import NamespaceRule, RuleEngine, UniqueIdRule
+from .xsd import load_schema
+
+
+TEMPLATE_PATTERN = re.compile(r"\{\{[^}]*\}\}")
+
+TEMPLATE_TEXT_XPATH = lxml.etree.XPath("//text()[contains(., '{{')]")
+
+NAMESPACE_DECLARATION_PATTERN = re.compile(
+    rb"""xmlns(?::[\w.\-]+)?\s*=\s*["']([^"']*)["']"""
+)
+
 
 class BaseSchemaValidator:
 
@@ -40,6 +59,29 @@ class BaseSchemaValidator:
 
     ELEMENT_RELATIONSHIP_TYPES = {}
 
+    CHECKS = []
+
+    REPORTS = []
+
+    RULES = [NamespaceRule, UniqueIdRule]
+
+    REPAIRS = [WhitespacePreservationRepair]
+
+    # Story parts fingerprinted by compare_structure, the elements counted in
+    # them, and the (label, part pattern, feature) total printed as headline.
+    STORY_PATTERNS = []
+
+    STRUCTURE_FEATURES = {}
+
+    STRUCTURE_SUMMARY = None
+
+    # Cross-part checks cached in the validation manifest, mapped to the
+    # method listing the files (and other inputs) their results depend on.
+    CHECK_INPUTS = {
+        "validate_file_references": "_file_reference_inputs",
+        "validate_content_types": "_content_type_inputs",
+    }
+
     SCHEMA_MAPPINGS = {
         "word": "ISO-IEC29500-4_2016/wml.xsd",  
         "ppt": "ISO-IEC29500-4_2016/pml.xsd",  
@@ -91,76 +133,179 @@ class BaseSchemaValidator:
         "http://www.w3.org/XML/1998/namespace",
     }
 
-    def __init__(self, unpacked_dir, original_file=None, verbose=False):
+    def __init__(
+        self,
+        unpacked_dir,
+        original_file=None,
+        verbose=False,
+        jobs=1,
+        manifest=None,
+        report=None,
+    ):
         self.unpacked_dir = Path(unpacked_dir).resolve()
         self.original_file = Path(original_file) if original_file else None
         self.verbose = verbose
+        self.jobs = jobs
+        self.manifest = manifest
+        self.report = report
+        self._baseline = None
+        self._graph = None
+        self._rule_results = {}
 
         self.schemas_dir = Path(__file__).parent.parent / "schemas"
 
-        patterns = ["*.xml", "*.rels"]
-        self.xml_files = [
-            f for pattern in patterns for f in self.unpacked_dir.rglob(pattern)
-        ]
+        self.package = ParsedPackage(self.unpacked_dir)
+        self.xml_files = self.package.parts
 
         if not self.xml_files:
             print(f"Warning: No XML files found in {self.unpacked_dir}")
 
     def validate(self):
-        raise NotImplementedError("Subclasses must implement the validate method")
+        try:
+            if not self._run_check("validate_xml"):
+                return False
+
+            self._measure("run_rules", self._run_fused_rules, kind="step")
+
+            all_valid = True
+            for check in self.CHECKS:
+                if not self._run_check(check):
+                    all_valid = False
+
+            for report in self.REPORTS:
+                self._run_check(report, kind="report")
+
+            return all_valid
+        finally:
+            self._rule_results = {}
+            self._graph = None
+            self.package.close()
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = PackageGraph(self.package)
+        return self._graph
+
+    def run_rules(self, rule_classes):
+        rules = [rule_class(self) for rule_class in rule_classes]
+        engine = RuleEngine(self.package, rules, self.manifest)
+        engine.run()
+        return engine, rules
+
+    def _run_fused_rules(self):
+        engine, rules = self.run_rules(self.RULES)
+        self._rule_results = {type(rule): rule for rule in rules}
+        if self.verbose:
+            engine.print_timings()
+
+    def _run_check(self, check, kind="check"):
+        inputs = self.CHECK_INPUTS.get(check)
+        if self.manifest is None or inputs is None:
+            return self._measure(check, getattr(self, check), kind)
+
+        return self._measure(
+            check,
+            lambda: self.manifest.cached_check(
+                f"{type(self).__name__}.{check}",
+                [f"verbose={self.verbose}", *getattr(self, inputs)()],
+                getattr(self, check),
+                self.report,
+            ),
+            kind,
+        )
+
+    def _measure(self, name, run, kind="check"):
+        if self.report is None:
+            return run()
+        return self.report.run(type(self).__name__, name, run, kind)
+
+    def _add_finding(self, message, file=None, line=None, details=None):
+        if self.report is not None:
+            self.report.add_finding(message, file=file, line=line, details=details)
+
+    def _print_findings(self, findings):
+        # Findings are (file, line, message) triples, where file and line may
+        # be None, optionally followed by a list of detail lines.
+        for file, line, message, *details in findings:
+            details = details[0] if details else []
+            print(format_finding(message, file, line))
+            for detail in details:
+                print(f"    - {detail}")
+            self._add_finding(message, file, line, details)
+
+    def _fail(self, message, file=None):
+        print(f"FAILED - {message}")
+        self._add_finding(message, file)
+
+    def _relative(self, path):
+        return Path(path).relative_to(self.unpacked_dir).as_posix()
+
+    def _listing(self):
+        return "\n".join(
+            sorted(f.relative_to(self.unpacked_dir).as_posix() for f in self.package.files())
+        )
 
-    def repair(self) -> int:
-        return self.repair_whitespace_preservation()
+    def _file_reference_inputs(self):
+        return [self._listing(), *(f for f in self.xml_files if f.name.endswith(".rels"))]
 
-    def repair_whitespace_preservation(self) -> int:
-        repairs = 0
+    def _content_type_inputs(self):
+        return [self._listing(), *self.xml_files]
 
-        for xml_file in self.xml_files:
-            try:
-                content = xml_file.read_text(encoding="utf-8")
-                dom = defusedxml.minidom.parseString(content)
-                modified = False
+    def _structure_inputs(self):
+        return [
+            part
+            for pattern in self.STORY_PATTERNS
+            for part in sorted(self.package.glob(pattern))
+        ]
+
+    def _is_repaired(self, xml_file, repair):
+        return self.manifest is not None and self.manifest.get(xml_file, repair)
 
-                for elem in dom.getElementsByTagName("*"):
-                    if elem.tagName.endswith(":t") and elem.firstChild:
-                        text = elem.firstChild.nodeValue
-                        if text and (text.startswith((' ', '\t')) or text.endswith((' ', '\t'))):
-                            if elem.getAttribute("xml:space") != "preserve":
-                                elem.setAttribute("xml:space", "preserve")
-                                text_preview = repr(text[:30]) + "..." if len(text) > 30 else repr(text)
-                                print(f"  Repaired: {xml_file.name}: Added xml:space='preserve' to {elem.tagName}: {text_preview}")
-                                repairs += 1
-                                modified = True
+    def _mark_repaired(self, xml_file, repair, modified):
+        if modified:
+            if self.manifest is not None:
+                self.manifest.invalidate(xml_file)
+        elif self.manifest is not None:
+            self.manifest.put(xml_file, repair, True)
 
-                if modified:
-                    xml_file.write_bytes(dom.toxml(encoding="UTF-8"))
+    def _check_rule(self, rule_class):
+        rule = self._rule_results.pop(rule_class, None)
+        if rule is None:
+            _, (rule,) = self.run_rules([rule_class])
+        elif self.report is not None:
+            # The rule ran in the shared traversal; its share of it is its own.
+            self.report.charge(rule.elapsed, "run_rules")
+        return rule.report(self.verbose)
 
-            except Exception:
-                pass
+    def repair(self, dry_run=False) -> int:
+        repairs = [repair_class(self) for repair_class in self.REPAIRS]
+        return RepairEngine(self, repairs, dry_run).run()
 
-        return repairs
+    def repair_whitespace_preservation(self, dry_run=False) -> int:
+        return RepairEngine(self, [WhitespacePreservationRepair(self)], dry_run).run()
 
     def validate_xml(self):
         errors = []
 
         for xml_file in self.xml_files:
+            if self.manifest is not None and self.manifest.get(xml_file, "xml"):
+                continue
+
             try:
-                lxml.etree.parse(str(xml_file))
+                self.package.check_well_formed(xml_file)
+                if self.manifest is not None:
+                    self.manifest.put(xml_file, "xml", True)
             except lxml.etree.XMLSyntaxError as e:
-                errors.append(
-                    f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                    f"Line {e.lineno}: {e.msg}"
-                )
+                errors.append((self._relative(xml_file), e.lineno, e.msg))
             except Exception as e:
                 errors.append(
-                    f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                    f"Unexpected error: {str(e)}"
+                    (self._relative(xml_file), None, f"Unexpected error: {str(e)}")
                 )
 
         if errors:
             print(f"FAILED - Found {len(errors)} XML violations:")
-            for error in errors:
-                print(error)
+            self._print_findings(errors)
             return False
         else:
             if self.verbose:
@@ -168,128 +313,15 @@ class BaseSchemaValidator:
             return True
 
     def validate_namespaces(self):
-        errors = []
-
-        for xml_file in self.xml_files:
-            try:
-                root = lxml.etree.parse(str(xml_file)).getroot()
-                declared = set(root.nsmap.keys()) - {None}  
-
-                for attr_val in [
-                    v for k, v in root.attrib.items() if k.endswith("Ignorable")
-                ]:
-                    undeclared = set(attr_val.split()) - declared
-                    errors.extend(
-                        f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                        f"Namespace '{ns}' in Ignorable but not declared"
-                        for ns in undeclared
-                    )
-            except lxml.etree.XMLSyntaxError:
-                continue
-
-        if errors:
-            print(f"FAILED - {len(errors)} namespace issues:")
-            for error in errors:
-                print(error)
-            return False
-        if self.verbose:
-            print("PASSED - All namespace prefixes properly declared")
-        return True
+        return self._check_rule(NamespaceRule)
 
     def validate_unique_ids(self):
-        errors = []
-        global_ids = {}  
-
-        for xml_file in self.xml_files:
-            try:
-                root = lxml.etree.parse(str(xml_file)).getroot()
-                file_ids = {}  
-
-                mc_elements = root.xpath(
-                    ".//mc:AlternateContent", namespaces={"mc": self.MC_NAMESPACE}
-                )
-                for elem in mc_elements:
-                    elem.getparent().remove(elem)
-
-                for elem in root.iter():
-                    tag = (
-                        elem.tag.split("}")[-1].lower()
-                        if "}" in elem.tag
-                        else elem.tag.lower()
-                    )
-
-                    if tag in self.UNIQUE_ID_REQUIREMENTS:
-                        in_excluded_container = any(
-                            ancestor.tag.split("}")[-1].lower() in self.EXCLUDED_ID_CONTAINERS
-                            for ancestor in elem.iterancestors()
-                        )
-                        if in_excluded_container:
-                            continue
-
-                        attr_name, scope = self.UNIQUE_ID_REQUIREMENTS[tag]
-
-                        id_value = None
-                        for attr, value in elem.attrib.items():
-                            attr_local = (
-                                attr.split("}")[-1].lower()
-                                if "}" in attr
-                                else attr.lower()
-                            )
-                            if attr_local == attr_name:
-                                id_value = value
-                                break
-
-                        if id_value is not None:
-                            if scope == "global":
-                                if id_value in global_ids:
-                                    prev_file, prev_line, prev_tag = global_ids[
-                                        id_value
-                                    ]
-                                    errors.append(
-                                        f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                                        f"Line {elem.sourceline}: Global ID '{id_value}' in <{tag}> "
-                                        f"already used in {prev_file} at line {prev_line} in <{prev_tag}>"
-                                    )
-                                else:
-                                    global_ids[id_value] = (
-                                        xml_file.relative_to(self.unpacked_dir),
-                                        elem.sourceline,
-                                        tag,
-                                    )
-                            elif scope == "file":
-                                key = (tag, attr_name)
-                                if key not in file_ids:
-                                    file_ids[key] = {}
-
-                                if id_value in file_ids[key]:
-                                    prev_line = file_ids[key][id_value]
-                                    errors.append(
-                                        f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                                        f"Line {elem.sourceline}: Duplicate {attr_name}='{id_value}' in <{tag}> "
-                                        f"(first occurrence at line {prev_line})"
-                                    )
-                                else:
-                                    file_ids[key][id_value] = elem.sourceline
-
-            except (lxml.etree.XMLSyntaxError, Exception) as e:
-                errors.append(
-                    f"  {xml_file.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
-
-        if errors:
-            print(f"FAILED - Found {len(errors)} ID uniqueness violations:")
-            for error in errors:
-                print(error)
-            return False
-        else:
-            if self.verbose:
-                print("PASSED - All required IDs are unique")
-            return True
+        return self._check_rule(UniqueIdRule)
 
     def validate_file_references(self):
         errors = []
 
-        rels_files = list(self.unpacked_dir.rglob("*.rels"))
+        rels_files = [f for f in self.xml_files if f.name.endswith(".rels")]
 
         if not rels_files:
             if self.verbose:
@@ -297,15 +329,12 @@ class BaseSchemaValidator:
             return True
 
         all_files = []
-        for file_path in self.unpacked_dir.rglob("*"):
+        for file_path in self.package.files():
             if (
-                file_path.is_file()
-                and file_path.name != "[Content_Types].xml"
+                file_path.name != "[Content_Types].xml"
                 and not file_path.name.endswith(".rels")
             ):  
-                all_files.append(file_path.resolve())
-
-        all_referenced_files = set()
+                all_files.append(file_path)
 
         if self.verbose:
             print(
@@ -314,61 +343,34 @@ class BaseSchemaValidator:
 
         for rels_file in rels_files:
             try:
-                rels_root = lxml.etree.parse(str(rels_file)).getroot()
-
-                rels_dir = rels_file.parent
-
-                referenced_files = set()
-                broken_refs = []
-
-                for rel in rels_root.findall(
-                    ".//ns:Relationship",
-                    namespaces={"ns": self.PACKAGE_RELATIONSHIPS_NAMESPACE},
-                ):
-                    target = rel.get("Target")
-                    if target and not target.startswith(
-                        ("http", "mailto:")
-                    ):  
-                        if target.startswith("/"):
-                            target_path = self.unpacked_dir / target.lstrip("/")
-                        elif rels_file.name == ".rels":
-                            target_path = self.unpacked_dir / target
-                        else:
-                            base_dir = rels_dir.parent
-                            target_path = base_dir / target
-
-                        try:
-                            target_path = target_path.resolve()
-                            if target_path.exists() and target_path.is_file():
-                                referenced_files.add(target_path)
-                                all_referenced_files.add(target_path)
-                            else:
-                                broken_refs.append((target, rel.sourceline))
-                        except (OSError, ValueError):
-                            broken_refs.append((target, rel.sourceline))
-
-                if broken_refs:
-                    rel_path = rels_file.relative_to(self.unpacked_dir)
-                    for broken_ref, line_num in broken_refs:
-                        errors.append(
-                            f"  {rel_path}: Line {line_num}: Broken reference to {broken_ref}"
-                        )
-
+                relationships = self.graph.relationships_in(rels_file)
             except Exception as e:
-                rel_path = rels_file.relative_to(self.unpacked_dir)
-                errors.append(f"  Error parsing {rel_path}: {e}")
+                errors.append((self._relative(rels_file), None, f"Error: {e}"))
+                continue
+
+            broken_refs = [
+                (rel.target, rel.sourceline)
+                for rel in relationships
+                if rel.target_part is not None
+                and not self.package.exists(rel.target_part)
+            ]
+
+            if broken_refs:
+                rel_path = self._relative(rels_file)
+                for broken_ref, line_num in broken_refs:
+                    errors.append(
+                        (rel_path, line_num, f"Broken reference to {broken_ref}")
+                    )
 
-        unreferenced_files = set(all_files) - all_referenced_files
+        unreferenced_files = self.graph.orphans(all_files)
 
         if unreferenced_files:
             for unref_file in sorted(unreferenced_files):
-                unref_rel_path = unref_file.relative_to(self.unpacked_dir)
-                errors.append(f"  Unreferenced file: {unref_rel_path}")
+                errors.append((self._relative(unref_file), None, "Unreferenced file"))
 
         if errors:
             print(f"FAILED - Found {len(errors)} relationship validation errors:")
-            for error in errors:
-                print(error)
+            self._print_findings(errors)
             print(
                 "CRITICAL: These errors will cause the document to appear corrupt. "
                 + "Broken references MUST be fixed, "
@@ -383,8 +385,6 @@ class BaseSchemaValidator:
             return True
 
     def validate_all_relationship_ids(self):
-        import lxml.etree
-
         errors = []
 
         for xml_file in self.xml_files:
@@ -394,71 +394,26 @@ class BaseSchemaValidator:
             rels_dir = xml_file.parent / "_rels"
             rels_file = rels_dir / f"{xml_file.name}.rels"
 
-            if not rels_file.exists():
+            if not self.package.exists(rels_file):
                 continue
 
-            try:
-                rels_root = lxml.etree.parse(str(rels_file)).getroot()
-                rid_to_type = {}
-
-                for rel in rels_root.findall(
-                    f".//{{{self.PACKAGE_RELATIONSHIPS_NAMESPACE}}}Relationship"
-                ):
-                    rid = rel.get("Id")
-                    rel_type = rel.get("Type", "")
-                    if rid:
-                        if rid in rid_to_type:
-                            rels_rel_path = rels_file.relative_to(self.unpacked_dir)
-                            errors.append(
-                                f"  {rels_rel_path}: Line {rel.sourceline}: "
-                                f"Duplicate relationship ID '{rid}' (IDs must be unique)"
-                            )
-                        type_name = (
-                            rel_type.split("/")[-1] if "/" in rel_type else rel_type
-                        )
-                        rid_to_type[rid] = type_name
-
-                xml_root = lxml.etree.parse(str(xml_file)).getroot()
-
-                r_ns = self.OFFICE_RELATIONSHIPS_NAMESPACE
-                rid_attrs_to_check = ["id", "embed", "link"]
-                for elem in xml_root.iter():
-                    for attr_name in rid_attrs_to_check:
-                        rid_attr = elem.get(f"{{{r_ns}}}{attr_name}")
-                        if not rid_attr:
-                            continue
-                        xml_rel_path = xml_file.relative_to(self.unpacked_dir)
-                        elem_name = (
-                            elem.tag.split("}")[-1] if "}" in elem.tag else elem.tag
-                        )
-
-                        if rid_attr not in rid_to_type:
-                            errors.append(
-                                f"  {xml_rel_path}: Line {elem.sourceline}: "
-                                f"<{elem_name}> r:{attr_name} references non-existent relationship '{rid_attr}' "
-                                f"(valid IDs: {', '.join(sorted(rid_to_type.keys())[:5])}{'...' if len(rid_to_type) > 5 else ''})"
-                            )
-                        elif attr_name == "id" and self.ELEMENT_RELATIONSHIP_TYPES:
-                            expected_type = self._get_expected_relationship_type(
-                                elem_name
-                            )
-                            if expected_type:
-                                actual_type = rid_to_type[rid_attr]
-                                if expected_type not in actual_type.lower():
-                                    errors.append(
-                                        f"  {xml_rel_path}: Line {elem.sourceline}: "
-                                        f"<{elem_name}> references '{rid_attr}' which points to '{actual_type}' "
-                                        f"but should point to a '{expected_type}' relationship"
-                                    )
+            if self.manifest is None:
+                errors.extend(self._relationship_id_errors(xml_file, rels_file))
+                continue
 
-            except Exception as e:
-                xml_rel_path = xml_file.relative_to(self.unpacked_dir)
-                errors.append(f"  Error processing {xml_rel_path}: {e}")
+            rels_hash = self.manifest.part_hash(rels_file)
+            cached = self.manifest.get(xml_file, "relationship_ids")
+            if cached is None or cached["rels"] != rels_hash:
+                cached = {
+                    "rels": rels_hash,
+                    "errors": self._relationship_id_errors(xml_file, rels_file),
+                }
+                self.manifest.put(xml_file, "relationship_ids", cached)
+            errors.extend(cached["errors"])
 
         if errors:
             print(f"FAILED - Found {len(errors)} relationship ID reference errors:")
-            for error in errors:
-                print(error)
+            self._print_findings(errors)
             print("\nThese ID mismatches will cause the document to appear corrupt!")
             return False
         else:
@@ -466,6 +421,76 @@ class BaseSchemaValidator:
                 print("PASSED - All relationship ID references are valid")
             return True
 
+    def _relationship_id_errors(self, xml_file, rels_file):
+        errors = []
+
+        try:
+            rid_to_type = {}
+
+            for rel in self.graph.relationships_in(rels_file):
+                rid = rel.id
+                if rid:
+                    if rid in rid_to_type:
+                        errors.append(
+                            (
+                                self._relative(rels_file),
+                                rel.sourceline,
+                                f"Duplicate relationship ID '{rid}' (IDs must be unique)",
+                            )
+                        )
+                    rid_to_type[rid] = rel.type_name
+
+            if self.package.streams(xml_file):
+                elements = (
+                    elem
+                    for event, elem in self.package.iterparse(xml_file)
+                    if event == "start"
+                )
+            else:
+                elements = self.package.root(xml_file).iter()
+
+            r_ns = self.OFFICE_RELATIONSHIPS_NAMESPACE
+            rid_attrs_to_check = ["id", "embed", "link"]
+            for elem in elements:
+                for attr_name in rid_attrs_to_check:
+                    rid_attr = elem.get(f"{{{r_ns}}}{attr_name}")
+                    if not rid_attr:
+                        continue
+                    xml_rel_path = self._relative(xml_file)
+                    elem_name = (
+                        elem.tag.split("}")[-1] if "}" in elem.tag else elem.tag
+                    )
+
+                    if rid_attr not in rid_to_type:
+                        errors.append(
+                            (
+                                xml_rel_path,
+                                elem.sourceline,
+                                f"<{elem_name}> r:{attr_name} references non-existent relationship '{rid_attr}' "
+                                f"(valid IDs: {', '.join(sorted(rid_to_type.keys())[:5])}{'...' if len(rid_to_type) > 5 else ''})",
+                            )
+                        )
+                    elif attr_name == "id" and self.ELEMENT_RELATIONSHIP_TYPES:
+                        expected_type = self._get_expected_relationship_type(
+                            elem_name
+                        )
+                        if expected_type:
+                            actual_type = rid_to_type[rid_attr]
+                            if expected_type not in actual_type.lower():
+                                errors.append(
+                                    (
+                                        xml_rel_path,
+                                        elem.sourceline,
+                                        f"<{elem_name}> references '{rid_attr}' which points to '{actual_type}' "
+                                        f"but should point to a '{expected_type}' relationship",
+                                    )
+                                )
+
+        except Exception as e:
+            errors.append((self._relative(xml_file), None, f"Error: {e}"))
+
+        return errors
+
     def _get_expected_relationship_type(self, element_name):
         elem_lower = element_name.lower()
 
@@ -493,12 +518,12 @@ class BaseSchemaValidator:
         errors = []
 
         content_types_file = self.unpacked_dir / "[Content_Types].xml"
-        if not content_types_file.exists():
-            print("FAILED - [Content_Types].xml file not found")
+        if not self.package.exists(content_types_file):
+            self._fail("[Content_Types].xml file not found", "[Content_Types].xml")
             return False
 
         try:
-            root = lxml.etree.parse(str(content_types_file)).getroot()
+            root = self.package.root(content_types_file)
             declared_parts = set()
             declared_extensions = set()
 
@@ -538,8 +563,7 @@ class BaseSchemaValidator:
                 "emf": "image/x-emf",
             }
 
-            all_files = list(self.unpacked_dir.rglob("*"))
-            all_files = [f for f in all_files if f.is_file()]
+            all_files = self.package.files()
 
             for xml_file in self.xml_files:
                 path_str = str(xml_file.relative_to(self.unpacked_dir)).replace(
@@ -553,12 +577,16 @@ class BaseSchemaValidator:
                     continue
 
                 try:
-                    root_tag = lxml.etree.parse(str(xml_file)).getroot().tag
+                    root_tag = self.package.root_tag(xml_file)
                     root_name = root_tag.split("}")[-1] if "}" in root_tag else root_tag
 
                     if root_name in declarable_roots and path_str not in declared_parts:
                         errors.append(
-                            f"  {path_str}: File with <{root_name}> root not declared in [Content_Types].xml"
+                            (
+                                path_str,
+                                None,
+                                f"File with <{root_name}> root not declared in [Content_Types].xml",
+                            )
                         )
 
                 except Exception:
@@ -575,18 +603,20 @@ class BaseSchemaValidator:
                 extension = file_path.suffix.lstrip(".").lower()
                 if extension and extension not in declared_extensions:
                     if extension in media_extensions:
-                        relative_path = file_path.relative_to(self.unpacked_dir)
                         errors.append(
-                            f'  {relative_path}: File with extension \'{extension}\' not declared in [Content_Types].xml - should add: <Default Extension="{extension}" ContentType="{media_extensions[extension]}"/>'
+                            (
+                                self._relative(file_path),
+                                None,
+                                f'File with extension \'{extension}\' not declared in [Content_Types].xml - should add: <Default Extension="{extension}" ContentType="{media_extensions[extension]}"/>',
+                            )
                         )
 
         except Exception as e:
-            errors.append(f"  Error parsing [Content_Types].xml: {e}")
+            errors.append(("[Content_Types].xml", None, f"Error: {e}"))
 
         if errors:
             print(f"FAILED - Found {len(errors)} content type declaration errors:")
-            for error in errors:
-                print(error)
+            self._print_findings(errors)
             return False
         else:
             if self.verbose:
@@ -603,26 +633,31 @@ class BaseSchemaValidator:
             xml_file, unpacked_dir
         )
 
+        return self._compare_with_original(xml_file, is_valid, current_errors, verbose)
+
+    def _compare_with_original(self, xml_file, is_valid, current_errors, verbose=False):
+        # Errors map each message to the first line it was reported at; lines
+        # move with edits, so only messages are compared with the original.
         if is_valid is None:
-            return None, set()  
+            return None, {}
         elif is_valid:
-            return True, set()  
+            return True, {}
 
         original_errors = self._get_original_file_errors(xml_file)
 
         assert current_errors is not None
-        new_errors = current_errors - original_errors
-
         new_errors = {
-            e for e in new_errors
-            if not any(pattern in e for pattern in self.IGNORED_VALIDATION_ERRORS)
+            message: line
+            for message, line in current_errors.items()
+            if message not in original_errors
+            and not any(pattern in message for pattern in self.IGNORED_VALIDATION_ERRORS)
         }
 
         if new_errors:
             if verbose:
-                relative_path = xml_file.relative_to(unpacked_dir)
+                relative_path = xml_file.relative_to(self.unpacked_dir)
                 print(f"FAILED - {relative_path}: {len(new_errors)} new error(s)")
-                for error in list(new_errors)[:3]:
+                for error in sorted(new_errors)[:3]:
                     truncated = error[:250] + "..." if len(error) > 250 else error
                     print(f"  - {truncated}")
             return False, new_errors
@@ -631,7 +666,38 @@ class BaseSchemaValidator:
                 print(
                     f"PASSED - No new errors (original had {len(current_errors)} errors)"
                 )
-            return True, set()
+            return True, {}
+
+    def compare_structure(self):
+        label, pattern, feature = self.STRUCTURE_SUMMARY
+
+        try:
+            modified = StructuralFingerprint.of(
+                self.package, self.STORY_PATTERNS, self.STRUCTURE_FEATURES
+            )
+        except Exception as e:
+            print(f"Error reading structure of unpacked document: {e}")
+            modified = StructuralFingerprint(self.STRUCTURE_FEATURES)
+
+        original = None
+        if self.original_file is not None:
+            try:
+                original = StructuralFingerprint.of_file(
+                    self.original_file, self.STORY_PATTERNS, self.STRUCTURE_FEATURES
+                )
+            except Exception as e:
+                print(f"Error reading structure of original document: {e}")
+
+        original_total = original.total(pattern, feature) if original else 0
+        new_total = modified.total(pattern, feature)
+        print(
+            f"\n{label}: {original_total} → {new_total} "
+            f"({signed(new_total - original_total)})"
+        )
+
+        if original is not None:
+            for line in modified.diff(original):
+                print(line)
 
     def validate_against_xsd(self):
         new_errors = []
@@ -639,11 +705,35 @@ class BaseSchemaValidator:
         valid_count = 0
         skipped_count = 0
 
+        results = {}
+        pending = []
+        for xml_file in self.xml_files:
+            cached = None
+            if self.manifest is not None:
+                cached = self.manifest.get(xml_file, "xsd")
+            if cached is None:
+                pending.append(xml_file)
+            else:
+                results[xml_file] = (cached[0], dict(cached[1]))
+
+        if self.jobs > 1 and len(pending) > 1:
+            computed = self._validate_files_against_xsd_parallel(pending)
+        else:
+            computed = [
+                self.validate_file_against_xsd(xml_file, verbose=False)
+                for xml_file in pending
+            ]
+
+        for xml_file, (is_valid, new_file_errors) in zip(pending, computed):
+            results[xml_file] = (is_valid, new_file_errors)
+            if self.manifest is not None:
+                self.manifest.put(
+                    xml_file, "xsd", [is_valid, sorted(new_file_errors.items())]
+                )
+
         for xml_file in self.xml_files:
+            is_valid, new_file_errors = results[xml_file]
             relative_path = str(xml_file.relative_to(self.unpacked_dir))
-            is_valid, new_file_errors = self.validate_file_against_xsd(
-                xml_file, verbose=False
-            )
 
             if is_valid is None:
                 skipped_count += 1
@@ -657,10 +747,12 @@ class BaseSchemaValidator:
                 continue
 
             new_errors.append(f"  {relative_path}: {len(new_file_errors)} new error(s)")
-            for error in list(new_file_errors)[:3]:  
+            for error in sorted(new_file_errors)[:3]:  
                 new_errors.append(
                     f"    - {error[:250]}..." if len(error) > 250 else f"    - {error}"
                 )
+            for error, line in sorted(new_file_errors.items()):
+                self._add_finding(error, self._relative(xml_file), line)
 
         if self.verbose:
             print(f"Validated {len(self.xml_files)} files:")
@@ -672,6 +764,9 @@ class BaseSchemaValidator:
                 f"  - With NEW errors: {len(new_errors) > 0 and len([e for e in new_errors if not e.startswith('    ')]) or 0}"
             )
 
+        if self._baseline is not None:
+            self._baseline.close()
+
         if new_errors:
             print("\nFAILED - Found NEW validation errors:")
             for error in new_errors:
@@ -682,6 +777,42 @@ class BaseSchemaValidator:
                 print("\nPASSED - No new XSD validation errors introduced")
             return True
 
+    def _validate_files_against_xsd_parallel(self, xml_files):
+        xml_files = [xml_file.resolve() for xml_file in xml_files]
+        chunksize = max(1, len(xml_files) // (self.jobs * 4))
+        # Workers open the package again, so they are sent the parts repaired
+        # in memory and validate the same bytes as this process.
+        written = {
+            path.relative_to(self.package.root_dir).as_posix(): data
+            for path, data in self.package.store.written().items()
+        }
+
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_xsd_worker,
+            initargs=(type(self), self.unpacked_dir, self.original_file, written),
+        ) as pool:
+            current = list(
+                pool.map(_validate_part_in_worker, xml_files, chunksize=chunksize)
+            )
+
+            if self.baseline is not None:
+                missing = [
+                    xml_file.relative_to(self.unpacked_dir).as_posix()
+                    for xml_file, (is_valid, _) in zip(xml_files, current)
+                    if is_valid is False
+                ]
+                missing = [part for part in missing if not self.baseline.has(part)]
+                for part, errors in zip(
+                    missing, pool.map(_original_part_errors_in_worker, missing)
+                ):
+                    self.baseline.record(part, errors)
+
+        return [
+            self._compare_with_original(xml_file, is_valid, current_errors)
+            for xml_file, (is_valid, current_errors) in zip(xml_files, current)
+        ]
+
     def _get_schema_path(self, xml_file):
         if xml_file.name in self.SCHEMA_MAPPINGS:
             return self.schemas_dir / self.SCHEMA_MAPPINGS[xml_file.name]
@@ -700,44 +831,24 @@ class BaseSchemaValidator:
 
         return None
 
-    def _clean_ignorable_namespaces(self, xml_doc):
-        xml_string = lxml.etree.tostring(xml_doc, encoding="unicode")
-        xml_copy = lxml.etree.fromstring(xml_string)
-
-        for elem in xml_copy.iter():
-            attrs_to_remove = []
-
-            for attr in elem.attrib:
-                if "{" in attr:
-                    ns = attr.split("}")[0][1:]
-                    if ns not in self.OOXML_NAMESPACES:
-                        attrs_to_remove.append(attr)
-
-            for attr in attrs_to_remove:
-                del elem.attrib[attr]
-
-        self._remove_ignorable_elements(xml_copy)
-
-        return lxml.etree.ElementTree(xml_copy)
-
-    def _remove_ignorable_elements(self, root):
-        elements_to_remove = []
-
-        for elem in list(root):
-            if not hasattr(elem, "tag") or callable(elem.tag):
-                continue
-
-            tag_str = str(elem.tag)
-            if tag_str.startswith("{"):
-                ns = tag_str.split("}")[0][1:]
-                if ns not in self.OOXML_NAMESPACES:
-                    elements_to_remove.append(elem)
-                    continue
-
-            self._remove_ignorable_elements(elem)
+    def _declared_namespaces(self, source):
+        return {
+            uri.decode("utf-8", "replace")
+            for uri in set(NAMESPACE_DECLARATION_PATTERN.findall(source))
+        }
 
-        for elem in elements_to_remove:
-            root.remove(elem)
+    def _clean_ignorable_namespaces(self, xml_doc, namespaces):
+        # Every namespaced element or attribute needs a declaration, so the
+        # declared namespaces bound what has to be stripped.
+        wildcards = [
+            f"{{{ns}}}*"
+            for ns in sorted(namespaces)
+            if ns and ns not in self.OOXML_NAMESPACES
+        ]
+        if wildcards:
+            lxml.etree.strip_elements(xml_doc, *wildcards)
+            lxml.etree.strip_attributes(xml_doc, *wildcards)
+        return xml_doc
 
     def _preprocess_for_mc_ignorable(self, xml_doc):
         root = xml_doc.getroot()
@@ -748,99 +859,115 @@ class BaseSchemaValidator:
         return xml_doc
 
     def _validate_single_file_xsd(self, xml_file, base_path):
-        schema_path = self._get_schema_path(xml_file)
+        relative_path = Path(xml_file).relative_to(base_path)
+        if not self._get_schema_path(relative_path):
+            return None, None  
+
+        try:
+            if Path(base_path) == self.unpacked_dir:
+                source = self.package.read_bytes(xml_file)
+            else:
+                source = Path(xml_file).read_bytes()
+        except (KeyError, OSError) as e:
+            return False, {str(e): None}
+
+        return self._validate_part_xsd(relative_path, source)
+
+    def _validate_part_xsd(self, relative_path, source):
+        schema_path = self._get_schema_path(relative_path)
         if not schema_path:
             return None, None  
 
         try:
-            with open(schema_path, "rb") as xsd_file:
-                parser = lxml.etree.XMLParser()
-                xsd_doc = lxml.etree.parse(
-                    xsd_file, parser=parser, base_url=str(schema_path)
-                )
-                schema = lxml.etree.XMLSchema(xsd_doc)
+            schema = load_schema(schema_path)
 
-            with open(xml_file, "r") as f:
-                xml_doc = lxml.etree.parse(f)
+            # The part is parsed into a private tree, so the filters below
+            # edit it in place instead of serializing and re-parsing copies.
+            xml_doc = lxml.etree.parse(io.BytesIO(source))
 
             xml_doc, _ = self._remove_template_tags_from_text_nodes(xml_doc)
             xml_doc = self._preprocess_for_mc_ignorable(xml_doc)
 
-            relative_path = xml_file.relative_to(base_path)
             if (
                 relative_path.parts
                 and relative_path.parts[0] in self.MAIN_CONTENT_FOLDERS
             ):
-                xml_doc = self._clean_ignorable_namespaces(xml_doc)
+                xml_doc = self._clean_ignorable_namespaces(
+                    xml_doc, self._declared_namespaces(source)
+                )
 
             if schema.validate(xml_doc):
-                return True, set()
+                return True, {}
             else:
-                errors = set()
+                errors = {}
                 for error in schema.error_log:
-                    errors.add(error.message)
+                    errors.setdefault(error.message, error.line)
                 return False, errors
 
         except Exception as e:
-            return False, {str(e)}
+            return False, {str(e): None}
+
+    @property
+    def baseline(self):
+        if self._baseline is None and self.original_file is not None:
+            self._baseline = BaselineIndex(self.original_file, self._validate_part_xsd)
+        return self._baseline
 
     def _get_original_file_errors(self, xml_file):
         if self.original_file is None:
             return set()
 
-        import tempfile
-        import zipfile
-
         xml_file = Path(xml_file).resolve()
-        unpacked_dir = self.unpacked_dir.resolve()
-        relative_path = xml_file.relative_to(unpacked_dir)
+        relative_path = xml_file.relative_to(self.unpacked_dir.resolve())
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-
-            with zipfile.ZipFile(self.original_file, "r") as zip_ref:
-                zip_ref.extractall(temp_path)
-
-            original_xml_file = temp_path / relative_path
-
-            if not original_xml_file.exists():
-                return set()
-
-            is_valid, errors = self._validate_single_file_xsd(
-                original_xml_file, temp_path
-            )
-            return errors if errors else set()
+        return self.baseline.errors_for(relative_path.as_posix())
 
     def _remove_template_tags_from_text_nodes(self, xml_doc):
         warnings = []
-        template_pattern = re.compile(r"\{\{[^}]*\}\}")
-
-        xml_string = lxml.etree.tostring(xml_doc, encoding="unicode")
-        xml_copy = lxml.etree.fromstring(xml_string)
-
-        def process_text_content(text, content_type):
-            if not text:
-                return text
-            matches = list(template_pattern.finditer(text))
-            if matches:
-                for match in matches:
-                    warnings.append(
-                        f"Found template tag in {content_type}: {match.group()}"
-                    )
-                return template_pattern.sub("", text)
-            return text
 
-        for elem in xml_copy.iter():
-            if not hasattr(elem, "tag") or callable(elem.tag):
+        for text in TEMPLATE_TEXT_XPATH(xml_doc):
+            owner = text.getparent()
+            if not isinstance(owner.tag, str):
                 continue
-            tag_str = str(elem.tag)
-            if tag_str.endswith("}t") or tag_str == "t":
+            if owner.tag.endswith("}t") or owner.tag == "t":
                 continue
 
-            elem.text = process_text_content(elem.text, "text content")
-            elem.tail = process_text_content(elem.tail, "tail content")
+            content_type = "tail content" if text.is_tail else "text content"
+            matches = list(TEMPLATE_PATTERN.finditer(text))
+            if not matches:
+                continue
+            for match in matches:
+                warnings.append(f"Found template tag in {content_type}: {match.group()}")
+
+            cleaned = TEMPLATE_PATTERN.sub("", text)
+            if text.is_tail:
+                owner.tail = cleaned
+            else:
+                owner.text = cleaned
+
+        return xml_doc, warnings
+
+
+_worker_validator = None
+
+
+def _init_xsd_worker(validator_class, unpacked_dir, original_file, written):
+    global _worker_validator
+    _worker_validator = validator_class(unpacked_dir, original_file)
+    package = _worker_validator.package
+    package.memory_budget = 0
+    for name, data in written.items():
+        package.write_bytes(package.root_dir / name, data)
+
+
+def _validate_part_in_worker(xml_file):
+    return _worker_validator._validate_single_file_xsd(
+        xml_file, _worker_validator.unpacked_dir
+    )
+
 
-        return lxml.etree.ElementTree(xml_copy), warnings
+def _original_part_errors_in_worker(part_name):
+    return _worker_validator.baseline.errors_for(part_name)
 
 
 if __name__ == "__main__":
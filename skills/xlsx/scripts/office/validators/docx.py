@@ -3,297 +3,291 @@ Validator for Word document XML files against XSD schemas.
 """
 
 import random
-import re
-import tempfile
-import zipfile
 
-import defusedxml.minidom
 import lxml.etree
 
 from .base import BaseSchemaValidator
+from .fingerprint import DOCX_FEATURES, DOCX_STORY_PATTERNS
+from .repairs import Repair, RepairEngine, WhitespacePreservationRepair
+from .rules import NamespaceRule, Rule, UniqueIdRule
 
 
-class DOCXSchemaValidator(BaseSchemaValidator):
+def _preview(text):
+    return repr(text)[:50] + "..." if len(repr(text)) > 50 else repr(text)
 
-    WORD_2006_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
-    W14_NAMESPACE = "http://schemas.microsoft.com/office/word/2010/wordml"
-    W16CID_NAMESPACE = "http://schemas.microsoft.com/office/word/2016/wordml/cid"
 
-    ELEMENT_RELATIONSHIP_TYPES = {}
-
-    def validate(self):
-        if not self.validate_xml():
-            return False
+class WhitespacePreservationRule(Rule):
 
-        all_valid = True
-        if not self.validate_namespaces():
-            all_valid = False
+    name = "whitespace_preservation"
 
-        if not self.validate_unique_ids():
-            all_valid = False
+    FAILURE = "FAILED - Found {count} whitespace preservation violations:"
+    SUCCESS = "PASSED - All whitespace is properly preserved"
 
-        if not self.validate_file_references():
-            all_valid = False
+    def __init__(self, validator):
+        super().__init__(validator)
+        self.END_TAGS = frozenset({f"{{{validator.WORD_2006_NAMESPACE}}}t"})
+        self.xml_space_attr = f"{{{validator.XML_NAMESPACE}}}space"
 
-        if not self.validate_content_types():
-            all_valid = False
+    def applies_to(self, part):
+        return part.name == "document.xml"
 
-        if not self.validate_against_xsd():
-            all_valid = False
-
-        if not self.validate_whitespace_preservation():
-            all_valid = False
+    def end(self, elem):
+        text = elem.text
+        if text and (text[0] in " \t\n\r" or text[-1] in " \t\n\r"):
+            if elem.get(self.xml_space_attr) != "preserve":
+                self.errors.append(
+                    (
+                        self.file,
+                        elem.sourceline,
+                        f"w:t element with whitespace missing xml:space='preserve': {_preview(text)}",
+                    )
+                )
 
-        if not self.validate_deletions():
-            all_valid = False
 
-        if not self.validate_insertions():
-            all_valid = False
+class DeletionRule(Rule):
+
+    name = "deletions"
+
+    FAILURE = "FAILED - Found {count} deletion validation violations:"
+    SUCCESS = "PASSED - No w:t elements found within w:del elements"
+
+    def __init__(self, validator):
+        super().__init__(validator)
+        w = validator.WORD_2006_NAMESPACE
+        self.del_tag = f"{{{w}}}del"
+        self.t_tag = f"{{{w}}}t"
+        self.instr_tag = f"{{{w}}}instrText"
+        self.START_TAGS = frozenset({self.del_tag})
+        self.END_TAGS = frozenset({self.del_tag, self.t_tag, self.instr_tag})
+
+    def applies_to(self, part):
+        return part.name == "document.xml"
+
+    def begin_part(self, path):
+        super().begin_part(path)
+        self.del_depth = 0
+        self.text_errors = []
+        self.instr_errors = []
+
+    def start(self, elem):
+        self.del_depth += 1
+
+    def end(self, elem):
+        tag = elem.tag
+        if tag == self.del_tag:
+            self.del_depth -= 1
+        elif not self.del_depth:
+            return
+        elif tag == self.t_tag:
+            if elem.text:
+                self.text_errors.append(
+                    (
+                        self.file,
+                        elem.sourceline,
+                        f"<w:t> found within <w:del>: {_preview(elem.text)}",
+                    )
+                )
+        else:
+            self.instr_errors.append(
+                (
+                    self.file,
+                    elem.sourceline,
+                    f"<w:instrText> found within <w:del> (use <w:delInstrText>): {_preview(elem.text or '')}",
+                )
+            )
 
-        if not self.validate_all_relationship_ids():
-            all_valid = False
+    def end_part(self):
+        self.errors.extend(self.text_errors + self.instr_errors)
 
-        if not self.validate_id_constraints():
-            all_valid = False
 
-        if not self.validate_comment_markers():
-            all_valid = False
+class InsertionRule(Rule):
 
-        self.compare_paragraph_counts()
+    name = "insertions"
 
-        return all_valid
+    FAILURE = "FAILED - Found {count} insertion validation violations:"
+    SUCCESS = "PASSED - No w:delText elements within w:ins elements"
 
-    def validate_whitespace_preservation(self):
-        errors = []
+    def __init__(self, validator):
+        super().__init__(validator)
+        w = validator.WORD_2006_NAMESPACE
+        self.ins_tag = f"{{{w}}}ins"
+        self.del_tag = f"{{{w}}}del"
+        self.del_text_tag = f"{{{w}}}delText"
+        self.START_TAGS = frozenset({self.ins_tag, self.del_tag})
+        self.END_TAGS = frozenset({self.ins_tag, self.del_tag, self.del_text_tag})
 
-        for xml_file in self.xml_files:
-            if xml_file.name != "document.xml":
-                continue
+    def applies_to(self, part):
+        return part.name == "document.xml"
 
-            try:
-                root = lxml.etree.parse(str(xml_file)).getroot()
-
-                for elem in root.iter(f"{{{self.WORD_2006_NAMESPACE}}}t"):
-                    if elem.text:
-                        text = elem.text
-                        if re.search(r"^[ \t\n\r]", text) or re.search(
-                            r"[ \t\n\r]$", text
-                        ):
-                            xml_space_attr = f"{{{self.XML_NAMESPACE}}}space"
-                            if (
-                                xml_space_attr not in elem.attrib
-                                or elem.attrib[xml_space_attr] != "preserve"
-                            ):
-                                text_preview = (
-                                    repr(text)[:50] + "..."
-                                    if len(repr(text)) > 50
-                                    else repr(text)
-                                )
-                                errors.append(
-                                    f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                                    f"Line {elem.sourceline}: w:t element with whitespace missing xml:space='preserve': {text_preview}"
-                                )
-
-            except (lxml.etree.XMLSyntaxError, Exception) as e:
-                errors.append(
-                    f"  {xml_file.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
+    def begin_part(self, path):
+        super().begin_part(path)
+        self.ins_depth = 0
+        self.del_depth = 0
 
-        if errors:
-            print(f"FAILED - Found {len(errors)} whitespace preservation violations:")
-            for error in errors:
-                print(error)
-            return False
+    def start(self, elem):
+        if elem.tag == self.ins_tag:
+            self.ins_depth += 1
         else:
-            if self.verbose:
-                print("PASSED - All whitespace is properly preserved")
-            return True
-
-    def validate_deletions(self):
-        errors = []
+            self.del_depth += 1
+
+    def end(self, elem):
+        tag = elem.tag
+        if tag == self.ins_tag:
+            self.ins_depth -= 1
+        elif tag == self.del_tag:
+            self.del_depth -= 1
+        elif self.ins_depth and not self.del_depth:
+            self.errors.append(
+                (
+                    self.file,
+                    elem.sourceline,
+                    f"<w:delText> within <w:ins>: {_preview(elem.text or '')}",
+                )
+            )
 
-        for xml_file in self.xml_files:
-            if xml_file.name != "document.xml":
-                continue
 
-            try:
-                root = lxml.etree.parse(str(xml_file)).getroot()
-                namespaces = {"w": self.WORD_2006_NAMESPACE}
-
-                for t_elem in root.xpath(".//w:del//w:t", namespaces=namespaces):
-                    if t_elem.text:
-                        text_preview = (
-                            repr(t_elem.text)[:50] + "..."
-                            if len(repr(t_elem.text)) > 50
-                            else repr(t_elem.text)
-                        )
-                        errors.append(
-                            f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                            f"Line {t_elem.sourceline}: <w:t> found within <w:del>: {text_preview}"
-                        )
+class IdConstraintRule(Rule):
 
-                for instr_elem in root.xpath(
-                    ".//w:del//w:instrText", namespaces=namespaces
-                ):
-                    text_preview = (
-                        repr(instr_elem.text or "")[:50] + "..."
-                        if len(repr(instr_elem.text or "")) > 50
-                        else repr(instr_elem.text or "")
-                    )
-                    errors.append(
-                        f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                        f"Line {instr_elem.sourceline}: <w:instrText> found within <w:del> (use <w:delInstrText>): {text_preview}"
-                    )
+    name = "id_constraints"
 
-            except (lxml.etree.XMLSyntaxError, Exception) as e:
-                errors.append(
-                    f"  {xml_file.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
+    FAILURE = "FAILED - {count} ID constraint violations:"
+    SUCCESS = "PASSED - All paraId/durableId values within constraints"
 
-        if errors:
-            print(f"FAILED - Found {len(errors)} deletion validation violations:")
-            for error in errors:
-                print(error)
-            return False
-        else:
-            if self.verbose:
-                print("PASSED - No w:t elements found within w:del elements")
-            return True
+    def __init__(self, validator):
+        super().__init__(validator)
+        self.para_id_attr = f"{{{validator.W14_NAMESPACE}}}paraId"
+        self.durable_id_attr = f"{{{validator.W16CID_NAMESPACE}}}durableId"
+        self.ATTRIBUTES = frozenset({self.para_id_attr, self.durable_id_attr})
 
-    def count_paragraphs_in_unpacked(self):
-        count = 0
+    def part_error(self, path, error):
+        pass
 
-        for xml_file in self.xml_files:
-            if xml_file.name != "document.xml":
-                continue
+    def attribute(self, elem, name, val):
+        parse_id_value = self.validator._parse_id_value
+        file_name = self.path.name
 
+        if name == self.para_id_attr:
+            if parse_id_value(val, base=16) >= 0x80000000:
+                self.errors.append(
+                    (self.file, elem.sourceline, f"paraId={val} >= 0x80000000")
+                )
+        elif file_name == "numbering.xml":
             try:
-                root = lxml.etree.parse(str(xml_file)).getroot()
-                paragraphs = root.findall(f".//{{{self.WORD_2006_NAMESPACE}}}p")
-                count = len(paragraphs)
-            except Exception as e:
-                print(f"Error counting paragraphs in unpacked document: {e}")
+                if parse_id_value(val, base=10) >= 0x7FFFFFFF:
+                    self.errors.append(
+                        (self.file, elem.sourceline, f"durableId={val} >= 0x7FFFFFFF")
+                    )
+            except ValueError:
+                self.errors.append(
+                    (
+                        self.file,
+                        elem.sourceline,
+                        f"durableId={val} must be decimal in numbering.xml",
+                    )
+                )
+        elif parse_id_value(val, base=16) >= 0x7FFFFFFF:
+            self.errors.append(
+                (self.file, elem.sourceline, f"durableId={val} >= 0x7FFFFFFF")
+            )
 
-        return count
 
-    def count_paragraphs_in_original(self):
-        original = self.original_file
-        if original is None:
-            return 0
+class DurableIdRepair(Repair):
 
-        count = 0
+    name = "durable_id"
 
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                with zipfile.ZipFile(original, "r") as zip_ref:
-                    zip_ref.extractall(temp_dir)
+    def __init__(self, validator):
+        super().__init__(validator)
+        self.durable_id_attr = f"{{{validator.W16CID_NAMESPACE}}}durableId"
 
-                doc_xml_path = temp_dir + "/word/document.xml"
-                root = lxml.etree.parse(doc_xml_path).getroot()
+    def element(self, part, elem):
+        durable_id = elem.get(self.durable_id_attr)
+        if durable_id is None:
+            return None
 
-                paragraphs = root.findall(f".//{{{self.WORD_2006_NAMESPACE}}}p")
-                count = len(paragraphs)
-
-        except Exception as e:
-            print(f"Error counting paragraphs in original document: {e}")
+        base = 10 if part.name == "numbering.xml" else 16
+        try:
+            needs_repair = (
+                self.validator._parse_id_value(durable_id, base=base) >= 0x7FFFFFFF
+            )
+        except ValueError:
+            needs_repair = True
+        if not needs_repair:
+            return None
 
-        return count
+        value = random.randint(1, 0x7FFFFFFE)
+        new_id = str(value) if base == 10 else f"{value:08X}"
+        elem.set(self.durable_id_attr, new_id)
+        return f"durableId {durable_id} → {new_id}"
 
-    def validate_insertions(self):
-        errors = []
 
-        for xml_file in self.xml_files:
-            if xml_file.name != "document.xml":
-                continue
+class DOCXSchemaValidator(BaseSchemaValidator):
 
-            try:
-                root = lxml.etree.parse(str(xml_file)).getroot()
-                namespaces = {"w": self.WORD_2006_NAMESPACE}
+    WORD_2006_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    W14_NAMESPACE = "http://schemas.microsoft.com/office/word/2010/wordml"
+    W16CID_NAMESPACE = "http://schemas.microsoft.com/office/word/2016/wordml/cid"
 
-                invalid_elements = root.xpath(
-                    ".//w:ins//w:delText[not(ancestor::w:del)]", namespaces=namespaces
-                )
+    ELEMENT_RELATIONSHIP_TYPES = {}
 
-                for elem in invalid_elements:
-                    text_preview = (
-                        repr(elem.text or "")[:50] + "..."
-                        if len(repr(elem.text or "")) > 50
-                        else repr(elem.text or "")
-                    )
-                    errors.append(
-                        f"  {xml_file.relative_to(self.unpacked_dir)}: "
-                        f"Line {elem.sourceline}: <w:delText> within <w:ins>: {text_preview}"
-                    )
+    CHECKS = [
+        "validate_namespaces",
+        "validate_unique_ids",
+        "validate_file_references",
+        "validate_content_types",
+        "validate_against_xsd",
+        "validate_whitespace_preservation",
+        "validate_deletions",
+        "validate_insertions",
+        "validate_all_relationship_ids",
+        "validate_id_constraints",
+        "validate_comment_markers",
+    ]
+
+    REPORTS = ["compare_structure"]
+
+    STORY_PATTERNS = DOCX_STORY_PATTERNS
+
+    STRUCTURE_FEATURES = DOCX_FEATURES
+
+    STRUCTURE_SUMMARY = ("Paragraphs", "word/document.xml", "paragraphs")
+
+    RULES = [
+        NamespaceRule,
+        UniqueIdRule,
+        WhitespacePreservationRule,
+        DeletionRule,
+        InsertionRule,
+        IdConstraintRule,
+    ]
+
+    REPAIRS = [WhitespacePreservationRepair, DurableIdRepair]
+
+    CHECK_INPUTS = {
+        **BaseSchemaValidator.CHECK_INPUTS,
+        "validate_comment_markers": "_comment_marker_inputs",
+        "compare_structure": "_structure_inputs",
+    }
 
-            except (lxml.etree.XMLSyntaxError, Exception) as e:
-                errors.append(
-                    f"  {xml_file.relative_to(self.unpacked_dir)}: Error: {e}"
-                )
+    def validate_whitespace_preservation(self):
+        return self._check_rule(WhitespacePreservationRule)
 
-        if errors:
-            print(f"FAILED - Found {len(errors)} insertion validation violations:")
-            for error in errors:
-                print(error)
-            return False
-        else:
-            if self.verbose:
-                print("PASSED - No w:delText elements within w:ins elements")
-            return True
+    def validate_deletions(self):
+        return self._check_rule(DeletionRule)
 
-    def compare_paragraph_counts(self):
-        original_count = self.count_paragraphs_in_original()
-        new_count = self.count_paragraphs_in_unpacked()
+    def _comment_marker_inputs(self):
+        return [
+            f
+            for f in self.xml_files
+            if f.name == "comments.xml" or (f.name == "document.xml" and "word" in str(f))
+        ]
 
-        diff = new_count - original_count
-        diff_str = f"+{diff}" if diff > 0 else str(diff)
-        print(f"\nParagraphs: {original_count} → {new_count} ({diff_str})")
+    def validate_insertions(self):
+        return self._check_rule(InsertionRule)
 
     def _parse_id_value(self, val: str, base: int = 16) -> int:
         return int(val, base)
 
     def validate_id_constraints(self):
-        errors = []
-        para_id_attr = f"{{{self.W14_NAMESPACE}}}paraId"
-        durable_id_attr = f"{{{self.W16CID_NAMESPACE}}}durableId"
-
-        for xml_file in self.xml_files:
-            try:
-                for elem in lxml.etree.parse(str(xml_file)).iter():
-                    if val := elem.get(para_id_attr):
-                        if self._parse_id_value(val, base=16) >= 0x80000000:
-                            errors.append(
-                                f"  {xml_file.name}:{elem.sourceline}: paraId={val} >= 0x80000000"
-                            )
-
-                    if val := elem.get(durable_id_attr):
-                        if xml_file.name == "numbering.xml":
-                            try:
-                                if self._parse_id_value(val, base=10) >= 0x7FFFFFFF:
-                                    errors.append(
-                                        f"  {xml_file.name}:{elem.sourceline}: "
-                                        f"durableId={val} >= 0x7FFFFFFF"
-                                    )
-                            except ValueError:
-                                errors.append(
-                                    f"  {xml_file.name}:{elem.sourceline}: "
-                                    f"durableId={val} must be decimal in numbering.xml"
-                                )
-                        else:
-                            if self._parse_id_value(val, base=16) >= 0x7FFFFFFF:
-                                errors.append(
-                                    f"  {xml_file.name}:{elem.sourceline}: "
-                                    f"durableId={val} >= 0x7FFFFFFF"
-                                )
-            except Exception:
-                pass
-
-        if errors:
-            print(f"FAILED - {len(errors)} ID constraint violations:")
-            for e in errors:
-                print(e)
-        elif self.verbose:
-            print("PASSED - All paraId/durableId values within constraints")
-        return not errors
+        return self._check_rule(IdConstraintRule)
 
     def validate_comment_markers(self):
         errors = []
@@ -311,8 +305,10 @@ class DOCXSchemaValidator(BaseSchemaValidator):
                 print("PASSED - No document.xml found (skipping comment validation)")
             return True
 
+        document_path = self._relative(document_xml)
+
         try:
-            doc_root = lxml.etree.parse(str(document_xml)).getroot()
+            doc_root = self.package.root(document_xml)
             namespaces = {"w": self.WORD_2006_NAMESPACE}
 
             range_starts = {
@@ -339,7 +335,7 @@ class DOCXSchemaValidator(BaseSchemaValidator):
                 orphaned_ends, key=lambda x: int(x) if x and x.isdigit() else 0
             ):
                 errors.append(
-                    f'  document.xml: commentRangeEnd id="{comment_id}" has no matching commentRangeStart'
+                    (document_path, None, f'commentRangeEnd id="{comment_id}" has no matching commentRangeStart')
                 )
 
             orphaned_starts = range_starts - range_ends
@@ -347,12 +343,12 @@ class DOCXSchemaValidator(BaseSchemaValidator):
                 orphaned_starts, key=lambda x: int(x) if x and x.isdigit() else 0
             ):
                 errors.append(
-                    f'  document.xml: commentRangeStart id="{comment_id}" has no matching commentRangeEnd'
+                    (document_path, None, f'commentRangeStart id="{comment_id}" has no matching commentRangeEnd')
                 )
 
             comment_ids = set()
-            if comments_xml and comments_xml.exists():
-                comments_root = lxml.etree.parse(str(comments_xml)).getroot()
+            if comments_xml and self.package.exists(comments_xml):
+                comments_root = self.package.root(comments_xml)
                 comment_ids = {
                     elem.get(f"{{{self.WORD_2006_NAMESPACE}}}id")
                     for elem in comments_root.xpath(
@@ -367,80 +363,27 @@ class DOCXSchemaValidator(BaseSchemaValidator):
                 ):
                     if comment_id:  
                         errors.append(
-                            f'  document.xml: marker id="{comment_id}" references non-existent comment'
+                            (
+                                document_path,
+                                None,
+                                f'marker id="{comment_id}" references non-existent comment',
+                            )
                         )
 
         except (lxml.etree.XMLSyntaxError, Exception) as e:
-            errors.append(f"  Error parsing XML: {e}")
+            errors.append((None, None, f"Error parsing XML: {e}"))
 
         if errors:
             print(f"FAILED - {len(errors)} comment marker violations:")
-            for error in errors:
-                print(error)
+            self._print_findings(errors)
             return False
         else:
             if self.verbose:
                 print("PASSED - All comment markers properly paired")
             return True
 
-    def repair(self) -> int:
-        repairs = super().repair()
-        repairs += self.repair_durableId()
-        return repairs
-
-    def repair_durableId(self) -> int:
-        repairs = 0
-
-        for xml_file in self.xml_files:
-            try:
-                content = xml_file.read_text(encoding="utf-8")
-                dom = defusedxml.minidom.parseString(content)
-                modified = False
-
-                for elem in dom.getElementsByTagName("*"):
-                    if not elem.hasAttribute("w16cid:durableId"):
-                        continue
-
-                    durable_id = elem.getAttribute("w16cid:durableId")
-                    needs_repair = False
-
-                    if xml_file.name == "numbering.xml":
-                        try:
-                            needs_repair = (
-                                self._parse_id_value(durable_id, base=10) >= 0x7FFFFFFF
-                            )
-                        except ValueError:
-                            needs_repair = True
-                    else:
-                        try:
-                            needs_repair = (
-                                self._parse_id_value(durable_id, base=16) >= 0x7FFFFFFF
-                            )
-                        except ValueError:
-                            needs_repair = True
-
-                    if needs_repair:
-                        value = random.randint(1, 0x7FFFFFFE)
-                        if xml_file.name == "numbering.xml":
-                            new_id = str(value)  
-                        else:
-                            new_id = f"{value:08X}"  
-
-                        elem.setAttribute("w16cid:durableId", new_id)
-                        print(
-                            f"  Repaired: {xml_file.name}: durableId {durable_id} → {new_id}"
-                        )
-                        repairs += 1
-                        modified = True
-
-                if modified:
-                    xml_file.write_bytes(dom.toxml(encoding="UTF-8"))
-
-            except Exception:
-                pass
-
-        return repairs
-
+    def repair_durableId(self, dry_run=False) -> int:
+        return RepairEngine(self, [DurableIdRepair(self)], dry_run).run()
 
 if __name__ == "__main__":
     raise RuntimeError("This module should not be run directly.")
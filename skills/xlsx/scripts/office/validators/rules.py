@@ -0,0 +1,394 @@
+"""
+Single-traversal rule engine for element-level checks.
+
+Each rule registers the element tags and attributes it handles. The engine
+walks every part once and dispatches start/end and attribute events to all
+interested rules, so adding a rule does not cost another full traversal.
+Time spent in each rule is recorded for reporting.
+
+With a validation manifest, the findings of each rule are recorded per part
+and replayed for unchanged parts instead of walking them again.
+
+Parts too large for the package's memory budget are streamed with iterparse
+instead of walked as a tree. Elements are cleared once their end event has
+been dispatched, so rules see attributes on start and text on end, but not
+the children of a finished element; a rule that needs them sets
+STREAMING = False.
+"""
+
+import time
+
+import lxml.etree
+
+ANY_ATTRIBUTE = frozenset({"*"})
+
+
+class Rule:
+
+    name = None
+
+    START_TAGS = frozenset()
+    END_TAGS = frozenset()
+    ATTRIBUTES = frozenset()
+
+    FAILURE = "FAILED - Found {count} violations:"
+    SUCCESS = "PASSED"
+
+    STREAMING = True
+
+    def __init__(self, validator):
+        self.validator = validator
+        # Findings as (file, line, message) triples.
+        self.errors = []
+        self.elapsed = 0.0
+        self.path = None
+        self.file = None
+        self._part_start = 0
+
+    def applies_to(self, part):
+        return True
+
+    def manifest_key(self):
+        # Rules whose findings also depend on other parts include them here,
+        # so cached per-part findings are not replayed once those change.
+        return f"rule:{self.name}"
+
+    def handles_start(self, tag):
+        return tag in self.START_TAGS
+
+    def handles_end(self, tag):
+        return tag in self.END_TAGS
+
+    def handles_attribute(self, name):
+        return self.ATTRIBUTES is ANY_ATTRIBUTE or name in self.ATTRIBUTES
+
+    def begin_part(self, path):
+        self.path = path
+        self.file = path.as_posix()
+        self._part_start = len(self.errors)
+
+    def root(self, elem):
+        pass
+
+    def start(self, elem):
+        pass
+
+    def end(self, elem):
+        pass
+
+    def attribute(self, elem, name, value):
+        pass
+
+    def end_part(self):
+        pass
+
+    def part_record(self):
+        return self.errors[self._part_start:]
+
+    def restore_part(self, path, record):
+        self.errors.extend(record)
+
+    def part_error(self, path, error):
+        self.errors.append((path.as_posix(), None, f"Error: {error}"))
+
+    def finish(self):
+        pass
+
+    def report(self, verbose=False):
+        if self.errors:
+            print(self.FAILURE.format(count=len(self.errors)))
+            self.validator._print_findings(self.errors)
+            return False
+        if verbose:
+            print(self.SUCCESS)
+        return True
+
+
+class RuleEngine:
+
+    def __init__(self, package, rules, manifest=None):
+        self.package = package
+        self.rules = rules
+        self.manifest = manifest
+        self.elapsed = 0.0
+        self.parts_visited = 0
+        self.parts_replayed = 0
+        self.parts_streamed = 0
+
+    def run(self):
+        started = time.perf_counter()
+
+        for part in self.package.parts:
+            rules = [rule for rule in self.rules if rule.applies_to(part)]
+            if self.manifest is not None:
+                rules = self._replay_part(part, rules)
+            if rules:
+                self._run_part(part, rules)
+
+        for rule in self.rules:
+            rule.finish()
+
+        self.elapsed = time.perf_counter() - started
+
+    def print_timings(self):
+        rule_timings = ", ".join(
+            f"{rule.name} {rule.elapsed * 1000:.1f} ms" for rule in self.rules
+        )
+        replayed = f", {self.parts_replayed} replayed" if self.parts_replayed else ""
+        streamed = f", {self.parts_streamed} streamed" if self.parts_streamed else ""
+        print(
+            f"Rule engine: {self.parts_visited} parts{replayed}{streamed}"
+            f" in {self.elapsed * 1000:.1f} ms ({rule_timings})"
+        )
+
+    def _replay_part(self, part, rules):
+        path = part.relative_to(self.package.root_dir)
+        pending = []
+        for rule in rules:
+            record = self.manifest.get(part, rule.manifest_key())
+            if record is None:
+                pending.append(rule)
+            else:
+                rule.restore_part(path, record)
+        if not pending:
+            self.parts_replayed += 1
+        return pending
+
+    def _run_part(self, part, rules):
+        path = part.relative_to(self.package.root_dir)
+
+        streaming = self.package.streams(part) and all(
+            rule.STREAMING for rule in rules
+        )
+        try:
+            if streaming:
+                events = self.package.iterparse(part)
+                self.parts_streamed += 1
+            else:
+                events = lxml.etree.iterwalk(
+                    self.package.tree(part), events=("start", "end")
+                )
+        except Exception as e:
+            for rule in rules:
+                rule.part_error(path, e)
+            return
+
+        self.parts_visited += 1
+        for rule in rules:
+            rule.begin_part(path)
+
+        failed = set()
+
+        def dispatch(handlers, method, *args):
+            for rule in handlers:
+                if failed and rule in failed:
+                    continue
+                started = time.perf_counter()
+                try:
+                    getattr(rule, method)(*args)
+                except Exception as e:
+                    # A failing rule stops for the rest of this part only.
+                    rule.part_error(path, e)
+                    failed.add(rule)
+                rule.elapsed += time.perf_counter() - started
+
+        try:
+            self._dispatch_events(events, rules, dispatch)
+        except (lxml.etree.XMLSyntaxError, OSError) as e:
+            for rule in rules:
+                if rule not in failed:
+                    rule.part_error(path, e)
+                    failed.add(rule)
+
+        for rule in rules:
+            rule.end_part()
+
+        if self.manifest is not None:
+            for rule in rules:
+                if rule not in failed:
+                    self.manifest.put(part, rule.manifest_key(), rule.part_record())
+
+    def _dispatch_events(self, events, rules, dispatch):
+        start_dispatch = {}
+        end_dispatch = {}
+        attribute_dispatch = {}
+        attribute_rules = [rule for rule in rules if rule.ATTRIBUTES]
+        at_root = True
+
+        for event, elem in events:
+            tag = elem.tag
+
+            if event == "start":
+                if at_root:
+                    dispatch(rules, "root", elem)
+                    at_root = False
+
+                handlers = start_dispatch.get(tag)
+                if handlers is None:
+                    handlers = start_dispatch[tag] = [
+                        rule for rule in rules if rule.handles_start(tag)
+                    ]
+                if handlers:
+                    dispatch(handlers, "start", elem)
+
+                if attribute_rules:
+                    for name, value in elem.items():
+                        handlers = attribute_dispatch.get(name)
+                        if handlers is None:
+                            handlers = attribute_dispatch[name] = [
+                                rule
+                                for rule in attribute_rules
+                                if rule.handles_attribute(name)
+                            ]
+                        if handlers:
+                            dispatch(handlers, "attribute", elem, name, value)
+            else:
+                handlers = end_dispatch.get(tag)
+                if handlers is None:
+                    handlers = end_dispatch[tag] = [
+                        rule for rule in rules if rule.handles_end(tag)
+                    ]
+                if handlers:
+                    dispatch(handlers, "end", elem)
+
+
+class NamespaceRule(Rule):
+
+    name = "namespaces"
+
+    FAILURE = "FAILED - {count} namespace issues:"
+    SUCCESS = "PASSED - All namespace prefixes properly declared"
+
+    def part_error(self, path, error):
+        pass
+
+    def root(self, elem):
+        declared = set(elem.nsmap.keys()) - {None}
+
+        for attr_val in [v for k, v in elem.attrib.items() if k.endswith("Ignorable")]:
+            undeclared = set(attr_val.split()) - declared
+            self.errors.extend(
+                (self.file, None, f"Namespace '{ns}' in Ignorable but not declared")
+                for ns in undeclared
+            )
+
+
+class UniqueIdRule(Rule):
+
+    name = "unique_ids"
+
+    FAILURE = "FAILED - Found {count} ID uniqueness violations:"
+    SUCCESS = "PASSED - All required IDs are unique"
+
+    def __init__(self, validator):
+        super().__init__(validator)
+        self.requirements = validator.UNIQUE_ID_REQUIREMENTS
+        self.excluded_containers = validator.EXCLUDED_ID_CONTAINERS
+        self.alternate_content_tag = f"{{{validator.MC_NAMESPACE}}}AlternateContent"
+        self.parts = []
+        self._local_names = {}
+
+    def _local_name(self, tag):
+        local = self._local_names.get(tag)
+        if local is None:
+            local = self._local_names[tag] = tag.split("}")[-1].lower()
+        return local
+
+    def handles_start(self, tag):
+        local = self._local_name(tag)
+        return (
+            tag == self.alternate_content_tag
+            or local in self.requirements
+            or local in self.excluded_containers
+        )
+
+    handles_end = handles_start
+
+    def begin_part(self, path):
+        super().begin_part(path)
+        self.file_ids = {}
+        self.skip_depth = 0
+        self.excluded_depth = 0
+        # File-scope findings and global-scope occurrences (dicts) in document
+        # order; global duplicates span parts and are resolved in finish().
+        self.entries = []
+        self.parts.append((path, self.entries))
+
+    def part_record(self):
+        return self.entries
+
+    def restore_part(self, path, record):
+        self.parts.append((path, record))
+
+    def part_error(self, path, error):
+        self.parts.append((path, [(path.as_posix(), None, f"Error: {error}")]))
+
+    def finish(self):
+        global_ids = {}
+        for path, entries in self.parts:
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    self.errors.append(tuple(entry))
+                    continue
+
+                id_value, line, local = entry["id"], entry["line"], entry["tag"]
+                if id_value in global_ids:
+                    prev_file, prev_line, prev_tag = global_ids[id_value]
+                    self.errors.append(
+                        (
+                            path.as_posix(),
+                            line,
+                            f"Global ID '{id_value}' in <{local}> "
+                            f"already used in {prev_file} at line {prev_line} in <{prev_tag}>",
+                        )
+                    )
+                else:
+                    global_ids[id_value] = (path, line, local)
+
+    def start(self, elem):
+        tag = elem.tag
+        if tag == self.alternate_content_tag:
+            self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+
+        local = self._local_name(tag)
+        if local in self.excluded_containers:
+            self.excluded_depth += 1
+        if local not in self.requirements or self.excluded_depth:
+            return
+
+        attr_name, scope = self.requirements[local]
+
+        id_value = None
+        for attr, value in elem.items():
+            if self._local_name(attr) == attr_name:
+                id_value = value
+                break
+
+        if id_value is None:
+            return
+
+        if scope == "global":
+            self.entries.append({"id": id_value, "line": elem.sourceline, "tag": local})
+        elif scope == "file":
+            ids = self.file_ids.setdefault((local, attr_name), {})
+            if id_value in ids:
+                self.entries.append(
+                    (
+                        self.file,
+                        elem.sourceline,
+                        f"Duplicate {attr_name}='{id_value}' in <{local}> "
+                        f"(first occurrence at line {ids[id_value]})",
+                    )
+                )
+            else:
+                ids[id_value] = elem.sourceline
+
+    def end(self, elem):
+        tag = elem.tag
+        if tag == self.alternate_content_tag:
+            self.skip_depth -= 1
+        elif not self.skip_depth and self._local_name(tag) in self.excluded_containers:
+            self.excluded_depth -= 1
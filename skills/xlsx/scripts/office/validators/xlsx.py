@@ -0,0 +1,435 @@
+"""
+Validator for Excel workbook XML files against XSD schemas.
+
+Worksheets can be far larger than any other Office part, so the
+worksheet checks are rules of the single-traversal rule engine: parts over
+the package's memory budget are streamed with finished rows cleared, and
+every check looks only at the attributes and text of the current cell.
+sheetId uniqueness is covered by the unique ID rule.
+"""
+
+import fnmatch
+import re
+
+import lxml.etree
+
+from .base import BaseSchemaValidator
+from .fingerprint import XLSX_FEATURES, XLSX_STORY_PATTERNS
+from .repairs import WhitespacePreservationRepair
+from .rules import NamespaceRule, Rule, UniqueIdRule
+
+S = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+ROW = f"{{{S}}}row"
+CELL = f"{{{S}}}c"
+COLUMN = f"{{{S}}}col"
+VALUE = f"{{{S}}}v"
+
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+
+# Findings kept per worksheet and rule; a broken generator can otherwise
+# produce one finding for each of millions of cells.
+MAX_SHEET_ERRORS = 20
+
+CELL_REFERENCE = re.compile(r"([A-Z]{1,3})([1-9][0-9]{0,6})")
+
+INVALID_SHEET_NAME_CHARACTERS = set("[]:*?/\\")
+
+
+def column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+class SheetRule(Rule):
+
+    WORKSHEET_PATTERN = "xl/worksheets/*.xml"
+
+    def applies_to(self, part):
+        name = part.relative_to(self.validator.package.root_dir).as_posix()
+        return fnmatch.fnmatch(name, self.WORKSHEET_PATTERN)
+
+    def begin_part(self, path):
+        super().begin_part(path)
+        self.part_errors = 0
+
+    def error(self, elem, message):
+        self.part_errors += 1
+        if self.part_errors <= MAX_SHEET_ERRORS:
+            self.errors.append((self.file, elem.sourceline, message))
+
+    def end_part(self):
+        if self.part_errors > MAX_SHEET_ERRORS:
+            self.errors.append(
+                (self.file, None, f"... and {self.part_errors - MAX_SHEET_ERRORS} more")
+            )
+
+
+class CellReferenceRule(SheetRule):
+
+    name = "cell_references"
+
+    START_TAGS = frozenset({ROW, CELL})
+
+    FAILURE = "FAILED - Found {count} cell reference errors:"
+    SUCCESS = "PASSED - All rows and cells are in order and unique"
+
+    def __init__(self, validator):
+        super().__init__(validator)
+        self._columns = {}
+
+    def begin_part(self, path):
+        super().begin_part(path)
+        self.last_row = 0
+        self.row = 0
+        self.last_column = 0
+
+    def start(self, elem):
+        if elem.tag == ROW:
+            self._row(elem)
+        else:
+            self._cell(elem)
+
+    def _row(self, elem):
+        self.last_column = 0
+        value = elem.get("r")
+        if value is None:
+            self.row = self.last_row + 1
+        else:
+            try:
+                self.row = int(value)
+            except ValueError:
+                self.error(elem, f"Invalid row number r='{value}'")
+                self.row = self.last_row + 1
+            else:
+                if not 1 <= self.row <= MAX_ROWS:
+                    self.error(elem, f"Row {self.row} is outside 1-{MAX_ROWS}")
+                elif self.row == self.last_row:
+                    self.error(elem, f"Duplicate row {self.row}")
+                elif self.row < self.last_row:
+                    self.error(elem, f"Row {self.row} is out of order (after row {self.last_row})")
+        self.last_row = max(self.last_row, self.row)
+
+    def _cell(self, elem):
+        ref = elem.get("r")
+        if ref is None:
+            self.last_column += 1
+            return
+
+        match = CELL_REFERENCE.fullmatch(ref)
+        if match is None:
+            self.error(elem, f"Invalid cell reference r='{ref}'")
+            return
+
+        letters, row = match.groups()
+        column = self._columns.get(letters)
+        if column is None:
+            column = self._columns[letters] = column_number(letters)
+
+        if column > MAX_COLUMNS:
+            self.error(elem, f"Cell {ref} is outside columns A-XFD")
+        elif int(row) != self.row:
+            self.error(elem, f"Cell {ref} does not belong to row {self.row}")
+        elif column == self.last_column:
+            self.error(elem, f"Duplicate cell {ref}")
+        elif column < self.last_column:
+            self.error(elem, f"Cell {ref} is out of order within row {self.row}")
+        self.last_column = max(self.last_column, column)
+
+
+class SharedStringIndexRule(SheetRule):
+
+    name = "shared_string_indexes"
+
+    START_TAGS = frozenset({CELL})
+    END_TAGS = frozenset({CELL, VALUE})
+
+    FAILURE = "FAILED - Found {count} shared string index errors:"
+    SUCCESS = "PASSED - All shared string indexes are in range"
+
+    def __init__(self, validator):
+        super().__init__(validator)
+        self.cell = None
+        self._count = None
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = self.validator.shared_string_count()
+        return self._count
+
+    def manifest_key(self):
+        return f"rule:{self.name}:{self.count}"
+
+    def start(self, elem):
+        self.cell = elem.get("r", "?") if elem.get("t") == "s" else None
+
+    def end(self, elem):
+        if elem.tag == CELL:
+            self.cell = None
+            return
+        if self.cell is None:
+            return
+
+        try:
+            index = int(elem.text)
+        except (TypeError, ValueError):
+            self.error(elem, f"Cell {self.cell}: Shared string index '{elem.text}' is not a number")
+            return
+
+        if self.count == 0:
+            self.error(elem, f"Cell {self.cell}: Shared string index {index} but the workbook has no shared strings")
+        elif not 0 <= index < self.count:
+            self.error(
+                elem,
+                f"Cell {self.cell}: Shared string index {index} is out of range "
+                f"(the workbook has {self.count} shared strings)",
+            )
+
+
+class StyleIndexRule(SheetRule):
+
+    name = "style_indexes"
+
+    START_TAGS = frozenset({ROW, CELL, COLUMN})
+
+    FAILURE = "FAILED - Found {count} style index errors:"
+    SUCCESS = "PASSED - All style indexes refer to cell formats in styles.xml"
+
+    ATTRIBUTE_NAMES = {ROW: "s", CELL: "s", COLUMN: "style"}
+
+    def __init__(self, validator):
+        super().__init__(validator)
+        self._count = None
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = self.validator.cell_format_count()
+        return self._count
+
+    def manifest_key(self):
+        return f"rule:{self.name}:{self.count}"
+
+    def start(self, elem):
+        name = self.ATTRIBUTE_NAMES[elem.tag]
+        value = elem.get(name)
+        if value is None or value == "0":
+            return
+
+        try:
+            index = int(value)
+        except ValueError:
+            self.error(elem, f"Style index {name}='{value}' is not a number")
+            return
+
+        if not 0 <= index < max(self.count, 1):
+            local = elem.tag.split("}")[-1]
+            label = f"Cell {elem.get('r')}" if elem.tag == CELL else f"<{local}>"
+            self.error(
+                elem,
+                f"{label}: Style index {index} is out of range "
+                f"(styles.xml has {self.count} cell formats)",
+            )
+
+
+class SpreadsheetWhitespaceRepair(WhitespacePreservationRepair):
+
+    def applies_to(self, part):
+        # Repairs edit a parsed tree, so parts too large to parse in memory
+        # are left alone.
+        return not self.validator.package.streams(part)
+
+
+class XLSXSchemaValidator(BaseSchemaValidator):
+
+    SPREADSHEETML_NAMESPACE = S
+
+    CHECKS = [
+        "validate_namespaces",
+        "validate_unique_ids",
+        "validate_file_references",
+        "validate_content_types",
+        "validate_against_xsd",
+        "validate_all_relationship_ids",
+        "validate_workbook_names",
+        "validate_cell_references",
+        "validate_shared_string_indexes",
+        "validate_style_indexes",
+    ]
+
+    REPORTS = ["compare_structure"]
+
+    STORY_PATTERNS = XLSX_STORY_PATTERNS
+
+    STRUCTURE_FEATURES = XLSX_FEATURES
+
+    STRUCTURE_SUMMARY = ("Sheets", "xl/worksheets/*.xml", None)
+
+    RULES = [
+        NamespaceRule,
+        UniqueIdRule,
+        CellReferenceRule,
+        SharedStringIndexRule,
+        StyleIndexRule,
+    ]
+
+    REPAIRS = [SpreadsheetWhitespaceRepair]
+
+    CHECK_INPUTS = {
+        **BaseSchemaValidator.CHECK_INPUTS,
+        "validate_workbook_names": "_workbook_inputs",
+        "compare_structure": "_structure_inputs",
+    }
+
+    def validate_cell_references(self):
+        return self._check_rule(CellReferenceRule)
+
+    def validate_shared_string_indexes(self):
+        return self._check_rule(SharedStringIndexRule)
+
+    def validate_style_indexes(self):
+        return self._check_rule(StyleIndexRule)
+
+    def workbook_part(self):
+        package_rels = self.unpacked_dir / "_rels" / ".rels"
+        try:
+            for rel in self.graph.relationships_in(package_rels):
+                if rel.type_name == "officeDocument" and rel.target_part is not None:
+                    return rel.target_part
+        except (lxml.etree.XMLSyntaxError, OSError):
+            pass
+
+        default = self.unpacked_dir / "xl" / "workbook.xml"
+        return default if self.package.exists(default) else None
+
+    def workbook_related_part(self, type_name):
+        workbook = self.workbook_part()
+        if workbook is None:
+            return None
+        try:
+            for rel in self.graph.relationships_of(workbook):
+                if rel.type_name == type_name and rel.target_part is not None:
+                    if self.package.exists(rel.target_part):
+                        return rel.target_part
+        except (lxml.etree.XMLSyntaxError, OSError):
+            pass
+        return None
+
+    def shared_string_count(self):
+        part = self.workbook_related_part("sharedStrings")
+        if part is None:
+            return 0
+        return self.package.tag_counts(part)[f"{{{S}}}si"]
+
+    def cell_format_count(self):
+        part = self.workbook_related_part("styles")
+        if part is None:
+            return 0
+        cell_formats = self.package.root(part).find(f"{{{S}}}cellXfs")
+        if cell_formats is None:
+            return 0
+        return len(cell_formats.findall(f"{{{S}}}xf"))
+
+    def _workbook_inputs(self):
+        package_rels = self.unpacked_dir / "_rels" / ".rels"
+        return [package_rels, *filter(None, [self.workbook_part()])]
+
+    def validate_workbook_names(self):
+        errors = []
+
+        workbook = self.workbook_part()
+        if workbook is None:
+            self._fail("No workbook part found")
+            return False
+
+        workbook_path = self._relative(workbook)
+
+        try:
+            root = self.package.root(workbook)
+        except (lxml.etree.XMLSyntaxError, OSError) as e:
+            self._fail(f"Could not read {workbook_path}: {e}", workbook_path)
+            return False
+
+        sheets = root.findall(f"{{{S}}}sheets/{{{S}}}sheet")
+        sheet_names = {}
+        for sheet in sheets:
+            name = sheet.get("name", "")
+            if not name or len(name) > 31:
+                errors.append(
+                    (
+                        workbook_path,
+                        sheet.sourceline,
+                        f"Sheet name '{name}' must be 1-31 characters long",
+                    )
+                )
+            elif INVALID_SHEET_NAME_CHARACTERS & set(name) or name[0] == "'" or name[-1] == "'":
+                errors.append(
+                    (
+                        workbook_path,
+                        sheet.sourceline,
+                        f"Sheet name '{name}' contains characters not allowed in sheet names",
+                    )
+                )
+
+            key = name.lower()
+            if key in sheet_names:
+                errors.append(
+                    (
+                        workbook_path,
+                        sheet.sourceline,
+                        f"Duplicate sheet name '{name}' (first used at line {sheet_names[key]})",
+                    )
+                )
+            else:
+                sheet_names[key] = sheet.sourceline
+
+        defined_names = {}
+        for defined_name in root.findall(f"{{{S}}}definedNames/{{{S}}}definedName"):
+            name = defined_name.get("name", "")
+            scope = defined_name.get("localSheetId")
+
+            if scope is not None:
+                try:
+                    sheet_index = int(scope)
+                except ValueError:
+                    sheet_index = -1
+                if not 0 <= sheet_index < len(sheets):
+                    errors.append(
+                        (
+                            workbook_path,
+                            defined_name.sourceline,
+                            f"definedName '{name}' has localSheetId='{scope}' "
+                            f"but the workbook has {len(sheets)} sheets",
+                        )
+                    )
+
+            key = (name.lower(), scope)
+            if key in defined_names:
+                scope_label = "workbook" if scope is None else f"sheet {scope}"
+                errors.append(
+                    (
+                        workbook_path,
+                        defined_name.sourceline,
+                        f"Duplicate definedName '{name}' in {scope_label} scope "
+                        f"(first defined at line {defined_names[key]})",
+                    )
+                )
+            else:
+                defined_names[key] = defined_name.sourceline
+
+        if errors:
+            print(f"FAILED - Found {len(errors)} sheet and defined name errors:")
+            self._print_findings(errors)
+            return False
+        else:
+            if self.verbose:
+                print("PASSED - All sheet names and defined names are valid and unique")
+            return True
+
+
+if __name__ == "__main__":
+    raise RuntimeError("This module should not be run directly.")